@@ -1,4 +1,4 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, BackgroundTasks
 from pathlib import Path
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -6,6 +6,8 @@ import aiofiles
 import asyncio
 from sqlalchemy.orm import Session
 from core.database import SessionLocal
+from core.config import Config
+from core.job_queue import PRIORITIES
 
 from app.dto.MXFDetailResponse import MXFDetailResponse
 from app.dto.AudioTrackResponse import AudioTrackResponse
@@ -51,16 +53,21 @@ async def save_upload(file: UploadFile, save_path: Path):
 async def upload_mxf(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    priority: str = Form(None),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Salva arquivo, cria registro MXF, agenda background task.
+    priority: high, normal ou low (padrão JOB_DEFAULT_PRIORITY)
     """
     if not file.filename.lower().endswith(".mxf"):
         raise HTTPException(status_code=400, detail="Arquivo precisa ser .mxf")
+    if priority is not None and priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"Prioridade precisa ser uma de: {', '.join(PRIORITIES)}")
 
     import shutil
-    save_path = Path("uploads") / file.filename
+    # Caminho absoluto: o worker que processar o job pode ter outro diretório de trabalho
+    save_path = (Config().UPLOAD_DIR / file.filename).resolve()
     save_path.parent.mkdir(parents=True, exist_ok=True)
     with open(save_path, "wb") as f:
         shutil.copyfileobj(file.file, f)
@@ -70,7 +77,7 @@ async def upload_mxf(
         
         service.logger.info(f"MXF record created: id={mxf.id}")
 
-        background_tasks.add_task(service.process_file_in_background, async_session, mxf.id, str(save_path))
+        background_tasks.add_task(service.process_file_in_background, async_session, mxf.id, str(save_path), priority)
 
         return UploadResponse(id=mxf.id, message=f"Arquivo '{file.filename}' recebido.")
     
@@ -79,6 +86,69 @@ async def upload_mxf(
         raise HTTPException(status_code=500, detail=f"Erro ao processar arquivo: {e}")
 
 
+@router.get("/jobs/metrics", summary="Métricas da fila de processamento")
+def get_job_metrics():
+    """
+    Profundidade da fila, jobs em execução e espera/latência recentes por prioridade.
+    """
+    return service.jobs.metrics()
+
+
+class CancelResponse(BaseModel):
+    id: int
+    status: str
+
+
+@router.post("/{mxf_id}/cancel", response_model=CancelResponse, status_code=202, summary="Cancela o processamento")
+def cancel_mxf(mxf_id: int):
+    """
+    Cancela um job pendente ou em processamento: sai da fila ou, se já está
+    rodando, tem os processos (ffmpeg/Demucs) mortos e os arquivos parciais removidos.
+    status: 'cancelled' (saiu da fila) ou 'cancelling' (sendo interrompido).
+    """
+    db = None
+    try:
+        db = SessionLocal()
+        mxf = repository.get_by_id_sync(db, mxf_id)
+        if not mxf:
+            raise HTTPException(status_code=404, detail="MXF não encontrado")
+        if mxf.status not in ("pending", "processing"):
+            raise HTTPException(status_code=409, detail=f"Job não pode ser cancelado (status '{mxf.status}')")
+    finally:
+        if db:
+            db.close()
+
+    return CancelResponse(id=mxf_id, status=service.cancel_job(mxf_id))
+
+
+class EstimateRequest(BaseModel):
+    paths: list[str] = []
+
+
+@router.post("/estimate", summary="Estimativa prévia de custo de um lote")
+def estimate_batch(request: EstimateRequest):
+    """
+    Tempo previsto (por etapa, por arquivo e de parede para o lote) e chamadas ao
+    Shazam para os MXFs dos caminhos (arquivos ou pastas dentro da entrada do
+    watchfolder ou dos uploads; relativos à entrada). Sem caminhos: a entrada inteira.
+    """
+    from features.pipeline.cost_estimator import CostEstimator
+
+    config = Config()
+    roots = [config.WATCHFOLDER_INPUT.resolve(), config.UPLOAD_DIR.resolve()]
+    paths = []
+    for raw in request.paths or [str(config.WATCHFOLDER_INPUT.resolve())]:
+        path = Path(raw)
+        path = (path if path.is_absolute() else config.WATCHFOLDER_INPUT / path).resolve()
+        if not any(path == root or root in path.parents for root in roots):
+            raise HTTPException(status_code=400, detail=f"Caminho fora das pastas de entrada: {raw}")
+        paths.append(path)
+
+    if not CostEstimator.expand(paths):
+        raise HTTPException(status_code=404, detail="Nenhum arquivo .mxf encontrado")
+    return CostEstimator().estimate(paths)
+
+
 def ms_to_hms(ms: int) -> str:
     seconds, milliseconds = divmod(ms, 1000)
     minutes, seconds = divmod(seconds, 60)
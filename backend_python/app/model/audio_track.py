@@ -7,7 +7,7 @@ class AudioTrack(Base):
     __tablename__ = "audio_track"
 
     id = Column(Integer, primary_key=True, index=True)
-    mxf_id = Column(Integer, ForeignKey("mxf.id", ondelete="CASCADE"), nullable=False)
+    mxf_id = Column(Integer, ForeignKey("mxf.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String, nullable=False)
     album = Column(String)
     year = Column(String)
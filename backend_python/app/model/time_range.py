@@ -7,7 +7,7 @@ class TimeRange(Base):
     __tablename__ = "time_range"
 
     id = Column(Integer, primary_key=True, index=True)
-    audio_track_id = Column(Integer, ForeignKey("audio_track.id", ondelete="CASCADE"), nullable=False)
+    audio_track_id = Column(Integer, ForeignKey("audio_track.id", ondelete="CASCADE"), nullable=False, index=True)
     start_time = Column(Integer, nullable=False)
     end_time = Column(Integer, nullable=False)
 
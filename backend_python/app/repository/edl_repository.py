@@ -3,6 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from core.logger import Logger
 from app.model.edl import EDLEntry
 from app.model.time_range import TimeRange
+from app.model.audio_track import AudioTrack
 from sqlalchemy import select
 
 class EDLRepository:
@@ -112,8 +113,6 @@ class EDLRepository:
             result = await db.execute(stmt)
             rows = result.all()
             self.logger.debug(f"get_all_timestamps: fetched {len(rows)} rows")
-            for i, r in enumerate(rows):
-                self.logger.debug(f" get_all_timestamps row[{i}] = {r}")
             return [
                 {
                     "id": r[0],
@@ -127,6 +126,39 @@ class EDLRepository:
             self.logger.error(f"Erro ao buscar todos os timestamps: {e}")
             return []
 
+    async def get_timestamps_by_mxf(self, db: AsyncSession, mxf_id: int):
+        """
+        time_range das faixas de um MXF (join com audio_track), no mesmo formato
+        de get_all_timestamps. Usa os índices de audio_track.mxf_id e
+        time_range.audio_track_id: o custo depende do job, não do histórico.
+        """
+        try:
+            stmt = (
+                select(
+                    TimeRange.id,
+                    TimeRange.audio_track_id,
+                    TimeRange.start_time,
+                    TimeRange.end_time
+                )
+                .join(AudioTrack, AudioTrack.id == TimeRange.audio_track_id)
+                .where(AudioTrack.mxf_id == mxf_id)
+                .order_by(TimeRange.id)
+            )
+            rows = (await db.execute(stmt)).all()
+            self.logger.debug(f"get_timestamps_by_mxf({mxf_id}): fetched {len(rows)} rows")
+            return [
+                {
+                    "id": r[0],
+                    "audio_track_id": r[1],
+                    "start_time": r[2],
+                    "end_time": r[3],
+                }
+                for r in rows
+            ]
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar timestamps do mxf_id={mxf_id}: {e}")
+            return []
+
     async def get_timestamp_by_audio_track_id(self, db: AsyncSession, audio_track_id: int):
         self.logger.debug(f"get_timestamp_by_audio_track_id: entry audio_track_id={audio_track_id}")
         """
@@ -152,10 +184,11 @@ class EDLRepository:
     def save_edl_record_sync(
         self, db: Session, process_id, edl_name, path=None, blob=None,
         frame_rate=29.97, drop_frame=False, total_events=0,
-        validation_status="pending", validation_errors=None
+        validation_status="pending", validation_errors=None, commit: bool = True
     ):
         """
         Versão síncrona de save_edl_record para rodar em threads de background.
+        commit=False só faz flush (para obter o id): o commit fica com a transação do chamador.
         """
         edl = EDLEntry(
             process_id=process_id,
@@ -169,8 +202,11 @@ class EDLRepository:
             validation_errors=",".join(validation_errors) if validation_errors else None
         )
         db.add(edl)
-        db.commit()
-        db.refresh(edl)
+        if commit:
+            db.commit()
+            db.refresh(edl)
+        else:
+            db.flush()
         return edl.id
 
     def update_status_sync(
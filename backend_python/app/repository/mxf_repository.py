@@ -1,6 +1,6 @@
 import logging
 from fastapi import logger
-from sqlalchemy import select, update
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
 
 from app.model.audio_track import AudioTrack
@@ -13,6 +13,45 @@ from app.model.time_range import TimeRange
 
 logger = logging.getLogger(__name__)
 
+
+def _insert_tracks():
+    """INSERT em lote das faixas devolvendo os ids na mesma ordem das linhas enviadas"""
+    return insert(AudioTrack).returning(AudioTrack.id, sort_by_parameter_order=True)
+
+
+def _track_rows(mxf_id: int, results: list) -> list:
+    """Uma linha de audio_track por resultado de reconhecimento"""
+    return [
+        {
+            'mxf_id': mxf_id,
+            'name': r.get("title") or r.get("track", {}).get("title"),
+            'album': r.get("album"),
+            'year': r.get("release_date"),
+            'authors': [r.get("artist")] if r.get("artist") else [],
+            'genres': [r.get("genre_primary")] if r.get("genre_primary") else [],
+            'isrc': r.get("isrc"),
+            'gmusic': r.get("google_music_url") or None,
+            'image_url': r.get("cover_art") or r.get("cover_art_hq"),
+        }
+        for r in results
+    ]
+
+
+def _time_range_rows(track_ids: list, results: list) -> list:
+    """Linhas de time_range (uma por match do Shazam) ligadas aos ids das faixas já inseridas"""
+    rows = []
+    for track_id, r in zip(track_ids, results):
+        shazam_data = r.get("shazam_data") or {}
+        for m in shazam_data.get("matches", []):
+            start_time = r.get("segment_start", 0) + int(m.get("offset", 0) * 1000)
+            rows.append({
+                'audio_track_id': track_id,
+                'start_time': start_time,
+                'end_time': start_time + r.get("segment_duration", 0),
+            })
+    return rows
+
+
 class MXFRepository:
 
     async def save_file_record(self, db: AsyncSession, file_name: str, file_path: str):
@@ -39,30 +78,16 @@ class MXFRepository:
             raise RuntimeError(f"Erro ao atualizar status do MXFFile: {e}") from e
 
     async def save_audio_tracks(self, db: AsyncSession, mxf: MXFFile, results: list):
-        for r in results:
-            track = AudioTrack(
-                mxf_id=mxf.id,
-                name=r.get("title") or r.get("track", {}).get("title"),
-                album=r.get("album"),
-                year=r.get("release_date"),
-                authors=[r.get("artist")] if r.get("artist") else [],
-                genres=[r.get("genre_primary")] if r.get("genre_primary") else [],
-                isrc=r.get("isrc"),
-                gmusic=r.get("google_music_url") or None,
-                image_url=r.get("cover_art") or r.get("cover_art_hq")
-            )
-            db.add(track)
-            await db.flush()
-
-            shazam_data = r.get("shazam_data") or {}
-            matches = shazam_data.get("matches", [])
-            for m in matches:
-                tr = TimeRange(
-                    audio_track_id=track.id,
-                    start_time=int(m.get("offset", 0) * 1000),
-                    end_time=int(m.get("offset", 0) * 1000) + r.get("segment_duration", 0)
-                )
-                db.add(tr)
+        """
+        Persiste as faixas e ocorrências em lote: um INSERT ... RETURNING com
+        todas as faixas (ids na ordem dos resultados) e um INSERT com todas as
+        ocorrências, em vez de um flush por faixa.
+        """
+        if results:
+            track_ids = (await db.execute(_insert_tracks(), _track_rows(mxf.id, results))).scalars().all()
+            occurrences = _time_range_rows(track_ids, results)
+            if occurrences:
+                await db.execute(insert(TimeRange), occurrences)
         
         await db.commit()
 
@@ -104,51 +129,42 @@ class MXFRepository:
         mxf = result.scalars().first()
         return mxf
     
-    def update_status_sync(self, db: Session, file_id: int, status: str):
+    def update_status_sync(self, db: Session, file_id: int, status: str, commit: bool = True):
         try:
             mxf = db.get(MXFFile, file_id)
             if not mxf:
                 return False
             mxf.status = status
-            db.commit()
-            db.refresh(mxf)
+            if commit:
+                db.commit()
+                db.refresh(mxf)
             return True
         except Exception as e:
             db.rollback()
             raise RuntimeError(f"Erro ao atualizar status do MXFFile: {e}") from e
     
-    def save_audio_tracks_sync(self, db: Session, mxf: MXFFile, results: list):
+    def save_audio_tracks_sync(self, db: Session, mxf: MXFFile, results: list, commit: bool = True):
         """
         Versão síncrona de save_audio_tracks para uso em threads.
+        commit=False deixa o commit com a transação do chamador (finalização do job).
         """
-        for r in results:
-            track = AudioTrack(
-                mxf_id=mxf.id,
-                name=r.get("title") or r.get("track", {}).get("title"),
-                album=r.get("album"),
-                year=r.get("release_date"),
-                authors=[r.get("artist")] if r.get("artist") else [],
-                genres=[r.get("genre_primary")] if r.get("genre_primary") else [],
-                isrc=r.get("isrc"),
-                gmusic=r.get("google_music_url") or None,
-                image_url=r.get("cover_art") or r.get("cover_art_hq")
-            )
-            db.add(track)
-            db.flush()
-
-            shazam_data = r.get("shazam_data") or {}
-            matches = shazam_data.get("matches", [])
-            for m in matches:
-                tr = TimeRange(
-                    audio_track_id=track.id,
-                    start_time=int(m.get("offset", 0) * 1000),
-                    end_time=int(m.get("offset", 0) * 1000) + r.get("segment_duration", 0)
-                )
-                db.add(tr)
+        if results:
+            track_ids = db.execute(_insert_tracks(), _track_rows(mxf.id, results)).scalars().all()
+            occurrences = _time_range_rows(track_ids, results)
+            if occurrences:
+                db.execute(insert(TimeRange), occurrences)
         
-        db.commit()
+        if commit:
+            db.commit()
 
-    def update_edl_id_sync(self, db: Session, mxf_id: int, edl_id: int) -> bool:
+    def list_by_status_sync(self, db: Session, statuses: list) -> list:
+        """
+        (id, path) dos MXFs nos status informados, do mais antigo para o mais novo.
+        """
+        stmt = select(MXFFile.id, MXFFile.path).where(MXFFile.status.in_(statuses)).order_by(MXFFile.id)
+        return [tuple(row) for row in db.execute(stmt)]
+
+    def update_edl_id_sync(self, db: Session, mxf_id: int, edl_id: int, commit: bool = True) -> bool:
         """
         Atualiza o campo edl_id do MXF.
         """
@@ -157,7 +173,8 @@ class MXFRepository:
             if not mxf:
                 return False
             mxf.edl_id = edl_id
-            db.commit()
+            if commit:
+                db.commit()
             return True
         except Exception as e:
             db.rollback()
@@ -24,11 +24,12 @@ class EDLService:
         edl_path = self.config.WATCHFOLDER_OUTPUT / edl_name
 
         self.logger.debug("create_and_store_edl: entry")
-        self.logger.debug(f"create_and_store_edl: calling repository.get_all_timestamps for db")
-        timestamps = await self.repository.get_all_timestamps(db)
+        # Só as ocorrências do job: sem mxf_id (chamada avulsa) cai na tabela inteira
+        if mxf_id is not None:
+            timestamps = await self.repository.get_timestamps_by_mxf(db, mxf_id)
+        else:
+            timestamps = await self.repository.get_all_timestamps(db)
         self.logger.debug(f"create_and_store_edl: got timestamps count={len(timestamps)}")
-        for i, t in enumerate(timestamps):
-            self.logger.debug(f" timestamp[{i}] = {t}")
 
         timestamps_by_track = {t["audio_track_id"]: t for t in (timestamps or []) if t.get("audio_track_id") is not None}
         self.logger.debug(f"timestamps_by_track mapping keys: {list(timestamps_by_track.keys())}")
@@ -263,9 +264,11 @@ class EDLService:
             self.logger.error(f"Erro ao salvar EDL: {e}")
             return False
         
-    def create_and_store_edl_sync(self, source_file: str, timestamp_table, recognition_results, mxf_id: int | None = None):
+    def store_edl_sync(self, db: Session, source_file: str, timestamp_table, recognition_results) -> int:
         """
-        Versão síncrona: salva EDL e retorna o id do registro (int) ou None em caso de falha.
+        Gera o EDL, grava o arquivo e insere o registro na sessão do chamador, sem
+        commit (só flush para obter o id): entra na transação de finalização do job.
+        O status de validação já é o final ('error' se o arquivo não foi gravado).
         """
         edl_name = f"{Path(source_file).stem}.edl"
         edl_path = self.config.WATCHFOLDER_OUTPUT / edl_name
@@ -276,76 +279,43 @@ class EDLService:
         validation_errors = [] if total_events > 0 else ["No music recognized"]
         edl_content = self.generate_edl(recognition_results, source_file, timestamp_table)
 
-        try:
-            self.save_edl(edl_content, edl_path)
-        except Exception:
-            pass
+        if not self.save_edl(edl_content, edl_path):
+            validation_status = "error"
+            validation_errors = ["Failed to save EDL file"]
+
+        return self.repository.save_edl_record_sync(
+            db,
+            process_id=Path(source_file).stem,
+            edl_name=edl_name,
+            path=str(edl_path),
+            blob=edl_content,
+            total_events=total_events,
+            validation_status=validation_status,
+            validation_errors=validation_errors,
+            commit=False
+        )
 
+    def create_and_store_edl_sync(self, source_file: str, timestamp_table, recognition_results, mxf_id: int | None = None):
+        """
+        Versão síncrona: salva EDL (e o vínculo com o MXF) numa transação própria
+        e retorna o id do registro (int) ou None em caso de falha.
+        """
         db = None
-        edl_id = None
         try:
             db = SessionLocal()
-        except Exception as e:
-            self.logger.error(f"Não foi possível abrir sessão sync: {e}")
-            return None
-
-        try:
-            edl_id = self.repository.save_edl_record_sync(
-                db,
-                process_id=Path(source_file).stem,
-                edl_name=edl_name,
-                path=str(edl_path),
-                blob=edl_content,
-                total_events=total_events,
-                validation_status=validation_status,
-                validation_errors=validation_errors
-            )
-            saved_file = True
-            try:
-                saved_file = self.save_edl(edl_content, edl_path)
-            except Exception:
-                saved_file = False
-
-            if not saved_file:
-                try:
-                    self.repository.update_status_sync(db, edl_id, "error", ["Failed to save EDL file"])
-                    validation_status = "error"
-                except Exception:
-                    pass
-            else:
-                try:
-                    self.repository.update_status_sync(db, edl_id, validation_status, validation_errors if validation_errors else None)
-                except Exception:
-                    pass
-
-            if mxf_id and edl_id:
-                try:
-                    db2 = SessionLocal()
-                    try:
-                        updated = MXFRepository().update_edl_id_sync(db2, mxf_id, edl_id)
-                        if updated:
-                            self.logger.info(f"MXF id={mxf_id} vinculado ao EDL id={edl_id}")
-                        else:
-                            self.logger.warning(f"Nenhum MXF encontrado para id={mxf_id} ao tentar vincular EDL id={edl_id}")
-                    finally:
-                        db2.close()
-                except Exception as e:
-                    self.logger.error(f"Erro ao atualizar MXF.edl_id (sync flow): {e}")
-
+            edl_id = self.store_edl_sync(db, source_file, timestamp_table, recognition_results)
+            if mxf_id and not MXFRepository().update_edl_id_sync(db, mxf_id, edl_id, commit=False):
+                self.logger.warning(f"Nenhum MXF encontrado para id={mxf_id} ao tentar vincular EDL id={edl_id}")
+            db.commit()
             return edl_id
         except Exception as e:
             self.logger.error(f"Erro ao salvar EDL sync no repository: {e}")
-            try:
+            if db:
                 db.rollback()
-            except Exception:
-                pass
             return None
         finally:
-            try:
-                if db:
-                    db.close()
-            except Exception:
-                pass
+            if db:
+                db.close()
     
     def get_timestamp(self, db):
         return self.repository.get_timestamp(db)
\ No newline at end of file
@@ -1,71 +1,148 @@
 from pathlib import Path
 from sqlalchemy.ext.asyncio import AsyncSession
-from core.file_processor import MXFProcessor
 from core.logger import Logger
-from features.workflows.unmixed_audio import UnmixedAudioWorkflow
-from features.workflows.mixed_audio import MixedAudioWorkflow
+from features.pipeline.mxf_pipeline import MXFPipeline
 from app.repository.mxf_repository import MXFRepository
 from app.repository.edl_repository import EDLRepository
 from app.service.edl_service import EDLService
 import asyncio
 import threading
+from core.cancellation import CancelToken, JobCancelled, DeadlineExceeded
+from core.config import Config
 from core.database import SessionLocal
+from core.file_processor import MXFProcessor
+from core.executor import JobExecutor
+from features.worker.job_stream import JobStream
 from app.model.mxf import MXFFile
 from app.model.audio_track import AudioTrack
 
+# Status finais: um pedido de cancelamento pendente para o job deixa de valer
+TERMINAL_STATUSES = ("processed", "error", "cancelled")
+
+
 class MXFService:
     def __init__(self, repository: MXFRepository, edl_service: EDLService = None):
         self.repository = repository
         self.logger = Logger()
-        self.workflows = [UnmixedAudioWorkflow(), MixedAudioWorkflow()]
+        self.config = Config()
+        self.pipeline = MXFPipeline()
         self.edl_service = edl_service or EDLService(EDLRepository())
+        # Jobs em execução neste processo (mxf_id -> CancelToken), para o cancelamento
+        self._tokens = {}
+        self._tokens_lock = threading.Lock()
+        self._cancel_requested = set()
+        if self.config.JOB_BACKEND == "redis":
+            # Jobs publicados no Redis e processados pelos workers (python main.py --worker)
+            self.jobs = JobStream()
+        else:
+            self.jobs = JobExecutor(self._process_file_worker, self.config.JOB_WORKERS, name="mxf")
 
     async def create_mxf_record(self, db: AsyncSession, file_name: str, file_path: str):
         return await self.repository.save_file_record(db, file_name, file_path)
 
-    async def run_workflow_with_edl(self, db, file_path: Path, mxf_id: int | None = None):
-        """Executa o workflow e retorna results (não gera EDL aqui)."""
-        processor = MXFProcessor()
-        streams = processor.get_streams(file_path)
-
-        workflow = next((wf for wf in self.workflows if wf.can_handle(streams)), None)
-        if not workflow:
+    async def run_workflow_with_edl(self, db, file_path: Path, mxf_id: int | None = None, token: CancelToken = None):
+        """Executa o plano de workflow e retorna results (não gera EDL aqui)."""
+        try:
+            return await self.pipeline.process_file(file_path, token)
+        except ValueError as e:
+            self.logger.warning(f"⚠️ {e}")
             return []
 
-        results = await workflow.process(file_path)
-        return results
-
-    async def process_file_in_background(self, db_session_factory, mxf_id: int, file_path):
+    async def process_file_in_background(self, db_session_factory, mxf_id: int, file_path, priority: str = None):
         """
-        Agenda processamento em thread separada (não bloqueia event loop do FastAPI).
+        Enfileira o processamento no executor de jobs (não bloqueia event loop do FastAPI).
+        A duração do MXF (ffprobe) ordena os jobs dentro da prioridade: arquivos curtos primeiro.
+        O caminho do arquivo é lido do registro quando o job começa.
         """
-        self.logger.info(f"Agendando processamento em thread separada para mxf_id={mxf_id}")
-        
-        threading.Thread(
-            target=self._run_in_new_loop,
-            args=(mxf_id, file_path),
-            daemon=False
-        ).start()
-
-    def _run_in_new_loop(self, mxf_id: int, file_path):
+        duration = await asyncio.to_thread(MXFProcessor().get_duration, Path(file_path))
+        if not self.jobs.submit(mxf_id, priority or self.config.JOB_DEFAULT_PRIORITY, duration):
+            # Encerrando: o registro continua 'pending' e é retomado no próximo início
+            self.logger.warning(f"⚠️ Executor encerrando; mxf_id={mxf_id} fica pendente")
+
+    def recover_pending_jobs(self):
         """
-        Cria nova event loop e executa o worker nela (thread separada).
+        Reenfileira os MXFs pendentes ou interrompidos no meio do processamento
+        (o status no banco é a fila persistente). Chamado no início da API.
+        Com JOB_BACKEND=redis não há o que fazer: os jobs continuam no stream.
         """
+        if self.config.JOB_BACKEND == "redis":
+            return 0
+        db_sync = None
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(
-                self._process_file_worker(mxf_id, file_path)
-            )
+            db_sync = SessionLocal()
+            pending = self.repository.list_by_status_sync(db_sync, ["pending", "processing"])
+            processor = MXFProcessor()
+            # A prioridade do upload não é persistida: jobs retomados voltam com a padrão
+            for mxf_id, file_path in pending:
+                self.jobs.submit(mxf_id, self.config.JOB_DEFAULT_PRIORITY, processor.get_duration(Path(file_path)))
+            if pending:
+                self.logger.info(f"♻️ {len(pending)} jobs pendentes reenfileirados")
+            return len(pending)
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao recuperar jobs pendentes: {e}")
+            return 0
         finally:
-            loop.close()
+            if db_sync:
+                db_sync.close()
+
+    def shutdown(self, timeout: float = None) -> bool:
+        """Para de aceitar jobs e espera os que estão em execução (os da fila continuam pendentes)"""
+        return self.jobs.shutdown(timeout)
 
-    async def _process_file_worker(self, mxf_id: int, file_path):
+    async def process_job(self, mxf_id: int):
         """
-        Worker real que executa o processamento (rodando em thread separada com event loop própria).
+        Processa um job já enfileirado (usado pelos workers da fila distribuída).
+        Erros que podem passar numa nova tentativa (banco, Shazam, ffmpeg...) são
+        propagados para o StreamWorker repetir a entrega ou mandar para a
+        dead-letter; registro inexistente, cancelamento e prazo esgotado terminam o job.
+        """
+        await self._process_file_worker(mxf_id, raise_errors=True)
+
+    def cancel_job(self, mxf_id: int) -> str:
+        """
+        Cancela o job: se ainda está na fila sai dela ('cancelled'); se está
+        rodando neste processo, os processos filhos são mortos e o reconhecimento
+        em andamento é interrompido ('cancelling' até o worker limpar os
+        artefatos). Com JOB_BACKEND=redis o pedido vai para o stream e o worker
+        que pegar (ou estiver com) o job o cancela.
+        """
+        if self.config.JOB_BACKEND == "redis":
+            self.jobs.cancel(mxf_id)
+            return "cancelling"
+        if self.jobs.cancel(mxf_id):
+            self._update_status_sync(mxf_id, "cancelled")
+            return "cancelled"
+        self.cancel_running(mxf_id)
+        return "cancelling"
+
+    def cancel_running(self, mxf_id: int) -> bool:
+        """Cancela o job se ele está em execução neste processo"""
+        with self._tokens_lock:
+            token = self._tokens.get(mxf_id)
+            if token is None:
+                # Ainda não começou (saiu da fila agora): o worker cancela ao registrar o token
+                self._cancel_requested.add(mxf_id)
+                return False
+        token.cancel("cancelado pela API")
+        self.logger.info(f"🛑 Cancelamento solicitado para mxf_id={mxf_id}")
+        return True
+
+    def mark_cancelled(self, mxf_id: int):
+        """Marca o MXF como cancelado (ex.: cancelado antes de um worker pegá-lo)"""
+        self._update_status_sync(mxf_id, "cancelled")
+
+    def mark_failed(self, mxf_id: int):
+        """Marca o MXF como erro (ex.: job enviado para a dead-letter)"""
+        self._update_status_sync(mxf_id, "error")
+
+    async def _process_file_worker(self, mxf_id: int, raise_errors: bool = False):
+        """
+        Worker real que executa o processamento (rodando num worker do executor, com event loop própria).
         Usa SessionLocal (síncrono) para evitar problemas com AsyncSession em thread diferente.
+        raise_errors: depois de marcar 'error', propaga erros inesperados (nova tentativa pela fila).
         """
         db_sync = None
+        token = None
         try:
             db_sync = SessionLocal()
             
@@ -75,41 +152,61 @@ class MXFService:
                 self.logger.error(f"MXF id={mxf_id} não encontrado")
                 return
 
-            results = await self.run_workflow_with_edl(db_sync, Path(file_path), mxf.id)
+            file_path = mxf.path
+            self._update_status_sync(mxf_id, "processing", db_sync)
 
-            try:
-                self.repository.save_audio_tracks_sync(db_sync, mxf, results)
-                self.logger.info(f"Audio tracks salvos para mxf_id={mxf_id}")
-            except Exception as e:
-                db_sync.rollback()
-                self.logger.error(f"Erro ao salvar audio_tracks: {e}")
-                self._update_status_sync(mxf_id, "error", db_sync)
-                return
+            token = CancelToken(mxf_id, self.config.JOB_TIMEOUT)
+            with self._tokens_lock:
+                self._tokens[mxf_id] = token
+                if mxf_id in self._cancel_requested:
+                    self._cancel_requested.discard(mxf_id)
+                    token.cancel("cancelado pela API")
+            results = await self.run_workflow_with_edl(db_sync, Path(file_path), mxf.id, token)
 
-            try:
-                edl_id = self.edl_service.create_and_store_edl_sync(
-                    source_file=Path(file_path).name,
-                    timestamp_table=None,
-                    recognition_results=results,
-                    mxf_id=mxf.id
-                )
-                self.logger.info(f"EDL gerado para mxf_id={mxf_id}, edl_id={edl_id}")
-                
-                if edl_id:
-                    self.repository.update_edl_id_sync(db_sync, mxf_id, edl_id)
-            except Exception as e:
-                self.logger.error(f"Erro ao criar EDL: {e}")
-
-            self._update_status_sync(mxf_id, "processed", db_sync)
-            self.logger.info(f"Processamento concluído para mxf_id={mxf_id}")
+            self._finalize_job_sync(db_sync, mxf, results)
 
+        except JobCancelled as e:
+            # Checagem cooperativa depois do prazo do job também chega aqui: conta como erro
+            timed_out = token is not None and token.timed_out
+            self.logger.warning(f"🛑 Processamento cancelado para mxf_id={mxf_id}: {e.reason}")
+            self._update_status_sync(mxf_id, "error" if timed_out else "cancelled", db_sync)
+        except DeadlineExceeded as e:
+            self.logger.error(f"⏰ Prazo esgotado para mxf_id={mxf_id}: {e}")
+            self._update_status_sync(mxf_id, "error", db_sync)
         except Exception as e:
-            self.logger.error(f"Erro fatal em _process_file_worker: {e}", exc_info=True)
+            self.logger.error(f"Erro fatal em _process_file_worker: {e}")
             self._update_status_sync(mxf_id, "error", db_sync)
+            if raise_errors:
+                raise
         finally:
+            with self._tokens_lock:
+                self._tokens.pop(mxf_id, None)
+                # Pedido que chegou depois do fim do job (ou de outra entrega) não vale para a próxima
+                self._cancel_requested.discard(mxf_id)
             if db_sync:
                 db_sync.close()
 
+    def _finalize_job_sync(self, db, mxf: MXFFile, results: list):
+        """
+        Unidade de trabalho do fim do job: faixas, ocorrências, registro do EDL,
+        vínculo mxf.edl_id e status 'processed' numa única transação. Se algo
+        falhar nada fica gravado (sem job pela metade) e o erro é propagado para
+        _process_file_worker marcar 'error' (e, no worker, tentar de novo).
+        O arquivo .edl é gravado antes do commit; um erro nele só marca o EDL.
+        """
+        mxf_id = mxf.id
+        try:
+            self.repository.save_audio_tracks_sync(db, mxf, results, commit=False)
+            edl_id = self.edl_service.store_edl_sync(db, Path(mxf.path).name, None, results)
+            self.repository.update_edl_id_sync(db, mxf_id, edl_id, commit=False)
+            self.repository.update_status_sync(db, mxf_id, "processed", commit=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            self.logger.error(f"Erro ao finalizar mxf_id={mxf_id}: {e}")
+            raise
+        self.logger.info(f"Processamento concluído para mxf_id={mxf_id}: {len(results)} faixas, EDL id={edl_id}")
+
     def _update_status_sync(self, mxf_id: int, status: str, db = None):
         """
         Atualiza status do MXF usando sessão síncrona.
@@ -122,6 +219,9 @@ class MXFService:
             
             self.repository.update_status_sync(db, mxf_id, status)
             self.logger.info(f"MXF id={mxf_id} status atualizado para '{status}'")
+            if status in TERMINAL_STATUSES:
+                with self._tokens_lock:
+                    self._cancel_requested.discard(mxf_id)
         except Exception as e:
             self.logger.error(f"Erro ao atualizar status sync mxf_id={mxf_id}: {e}")
         finally:
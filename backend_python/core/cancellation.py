@@ -0,0 +1,194 @@
+import asyncio
+import contextvars
+import os
+import signal
+import subprocess
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+_current_token = contextvars.ContextVar('cancel_token', default=None)
+
+
+class JobCancelled(BaseException):
+    """
+    Job cancelado (pela API ou por prazo estourado). Herda de BaseException,
+    como asyncio.CancelledError, para atravessar os `except Exception` que
+    tratam falhas de um segmento/stream e seguem adiante.
+    """
+
+    def __init__(self, reason: str = "cancelado"):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class DeadlineExceeded(TimeoutError):
+    """Uma etapa ou o job inteiro passou do prazo"""
+
+
+class CancelToken:
+    """
+    Estado de cancelamento de um job, compartilhado entre as threads e o event
+    loop que trabalham nele.
+
+    cancel() mata os processos filhos registrados (grupo inteiro: ffmpeg,
+    CLI do Demucs) e cancela as tarefas asyncio registradas (ex.: chamada ao
+    Shazam em andamento). O código cooperativo chama check() entre unidades de
+    trabalho. timeout: prazo do job inteiro, em segundos.
+    """
+
+    def __init__(self, key=None, timeout: float = None):
+        self.key = key
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.reason = None
+        self.timed_out = False
+        self._lock = threading.Lock()
+        self._processes = set()
+        self._tasks = set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def remaining(self):
+        """Segundos até o prazo do job (None = sem prazo)"""
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def cancel(self, reason: str = "cancelado", timed_out: bool = False):
+        with self._lock:
+            if self.reason is not None:
+                return
+            self.reason = reason
+            self.timed_out = timed_out
+            processes, tasks = list(self._processes), list(self._tasks)
+        for process in processes:
+            kill_process_group(process)
+        for loop, task in tasks:
+            loop.call_soon_threadsafe(task.cancel)
+
+    def check(self):
+        """Levanta JobCancelled se o job foi cancelado ou passou do prazo total"""
+        if self.reason is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("prazo do job esgotado", timed_out=True)
+        if self.reason is not None:
+            raise JobCancelled(self.reason)
+
+    @contextmanager
+    def watch_process(self, process):
+        with self._lock:
+            self._processes.add(process)
+            cancelled = self.reason is not None
+        if cancelled:
+            kill_process_group(process)
+        try:
+            yield process
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+
+    @contextmanager
+    def watch_task(self, task):
+        entry = (asyncio.get_running_loop(), task)
+        with self._lock:
+            self._tasks.add(entry)
+            cancelled = self.reason is not None
+        if cancelled:
+            task.cancel()
+        try:
+            yield task
+        finally:
+            with self._lock:
+                self._tasks.discard(entry)
+
+
+def kill_process_group(process):
+    """SIGKILL no grupo do processo (ele e os filhos); o processo precisa ter sido criado com start_new_session"""
+    try:
+        if hasattr(os, 'killpg'):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def current_token():
+    """CancelToken do job em execução neste contexto (thread/tarefa), ou None"""
+    return _current_token.get()
+
+
+def check_cancelled():
+    """Ponto de checagem cooperativo: levanta JobCancelled se o job atual foi cancelado"""
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+@contextmanager
+def use_token(token: CancelToken):
+    """Torna token o job atual deste contexto (herdado por asyncio.to_thread e tarefas criadas aqui)"""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def _limit(timeout, token):
+    remaining = token.remaining() if token is not None else None
+    limits = [value for value in (timeout, remaining) if value is not None]
+    return min(limits) if limits else None
+
+
+def run_command(cmd: list, timeout: float = None, text: bool = True) -> subprocess.CompletedProcess:
+    """
+    Como subprocess.run(capture_output=True, text=text), mas o processo roda em
+    sessão própria e é morto (com os filhos) se o job atual for cancelado ou se
+    o prazo (timeout ou o que resta do job) acabar.
+    """
+    token = current_token()
+    if token is not None:
+        token.check()
+    limit = _limit(timeout, token)
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=text, start_new_session=True)
+    watch = token.watch_process(process) if token is not None else nullcontext(process)
+    with watch:
+        try:
+            stdout, stderr = process.communicate(timeout=limit)
+        except subprocess.TimeoutExpired:
+            kill_process_group(process)
+            process.communicate()
+            raise DeadlineExceeded(f"{os.path.basename(cmd[0])} passou do prazo de {round(limit, 1):g}s")
+    if token is not None:
+        token.check()
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+
+async def with_deadline(awaitable, name: str, timeout: float = None, token: CancelToken = None):
+    """
+    Aguarda awaitable com o prazo da etapa (e o que resta do job). No prazo, o
+    job é cancelado (processos mortos, tarefas canceladas) e DeadlineExceeded
+    é levantada; um cancelamento externo vira JobCancelled.
+    """
+    token = token or current_token()
+    limit = _limit(timeout, token)
+    task = asyncio.ensure_future(awaitable)
+    if token is None:
+        return await asyncio.wait_for(task, limit)
+
+    with token.watch_task(task):
+        done, _ = await asyncio.wait({task}, timeout=limit)
+        if not done:
+            reason = f"etapa '{name}' passou do prazo de {round(limit, 1):g}s"
+            token.cancel(reason, timed_out=True)
+            task.cancel()
+            await asyncio.wait({task})
+            raise DeadlineExceeded(reason)
+    try:
+        if task.cancelled():
+            raise JobCancelled(token.reason or "cancelado")
+        return task.result()
+    except JobCancelled:
+        if token.timed_out:
+            raise DeadlineExceeded(token.reason) from None
+        raise
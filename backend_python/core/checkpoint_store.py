@@ -0,0 +1,131 @@
+import copy
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from core.config import Config
+from core.logger import Logger
+
+# Amostras lidas do MXF para o hash de entrada (início, meio e fim)
+_SAMPLE_BYTES = 4 * 1024 * 1024
+
+
+class JobCheckpoint:
+    """
+    Checkpoints de um job: um JSON por etapa concluída (gravado de forma atômica)
+    e um segments.jsonl só de acréscimo com cada reconhecimento do Shazam.
+    Uma linha cortada no fim do jsonl (queda no meio da escrita) é ignorada.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.key = directory.name
+        self.logger = Logger()
+        self._lock = threading.Lock()
+        self._segments = None
+
+    def get(self, stage: str):
+        """Saída gravada da etapa, ou None se ela ainda não terminou"""
+        path = self.directory / f"{stage}.json"
+        try:
+            return json.loads(path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            self.logger.warning(f"⚠️ Checkpoint '{stage}' ilegível em {self.key}: {e}")
+            return None
+
+    def put(self, stage: str, data):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temp_path = self.directory / f".{stage}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.directory / f"{stage}.json")
+
+    def _load_segments(self):
+        segments = {}
+        try:
+            with open(self.directory / "segments.jsonl", encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    segments[entry['key']] = entry['result']
+        except FileNotFoundError:
+            pass
+        return segments
+
+    def has_segment(self, segment_key: str) -> bool:
+        with self._lock:
+            if self._segments is None:
+                self._segments = self._load_segments()
+            return segment_key in self._segments
+
+    def get_segment(self, segment_key: str):
+        """Resultado salvo do segmento (None também é um resultado: 'sem música')"""
+        with self._lock:
+            if self._segments is None:
+                self._segments = self._load_segments()
+            return copy.deepcopy(self._segments.get(segment_key))
+
+    def put_segment(self, segment_key: str, result):
+        line = json.dumps({'key': segment_key, 'result': result}, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._segments is None:
+                self._segments = self._load_segments()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.directory / "segments.jsonl", 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._segments[segment_key] = json.loads(line)['result']
+
+    def clear(self):
+        """Remove o checkpoint (job concluído)"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        with self._lock:
+            self._segments = None
+
+
+class CheckpointStore:
+    """
+    Checkpoints por job em CHECKPOINT_DIR/<job>-<hash da entrada>/.
+
+    O hash usa o tamanho e amostras do início, meio e fim do MXF (ler o arquivo
+    inteiro custaria tanto quanto extraí-lo), então o mesmo MXF copiado de novo
+    para a entrada retoma do ponto onde parou, e um arquivo diferente com o
+    mesmo nome começa do zero.
+    """
+
+    def __init__(self, root: Path = None):
+        self.config = Config()
+        self.root = Path(root or self.config.CHECKPOINT_DIR)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def input_hash(path: Path) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        size = path.stat().st_size
+        digest.update(f"{size}:".encode())
+        with open(path, 'rb') as f:
+            for offset in sorted({0, max(0, size // 2 - _SAMPLE_BYTES // 2), max(0, size - _SAMPLE_BYTES)}):
+                f.seek(offset)
+                digest.update(f.read(_SAMPLE_BYTES))
+        return digest.hexdigest()
+
+    def job_key(self, mxf_path: Path) -> str:
+        job_id = re.sub(r'[^A-Za-z0-9_.-]', '_', Path(mxf_path).stem)
+        return f"{job_id}-{self.input_hash(Path(mxf_path))}"
+
+    def job(self, key: str) -> JobCheckpoint:
+        return JobCheckpoint(self.root / key)
+
+    def open(self, mxf_path: Path) -> JobCheckpoint:
+        return self.job(self.job_key(mxf_path))
@@ -16,13 +16,151 @@ class Config:
     WATCHFOLDER_INPUT = Path(os.getenv('WATCHFOLDER_INPUT', 'files/input'))
     WATCHFOLDER_OUTPUT = Path(os.getenv('WATCHFOLDER_OUTPUT', 'files/output'))
     WATCHFOLDER_PROCESSED = Path(os.getenv('WATCHFOLDER_PROCESSED', 'files/processed'))
+    WATCHFOLDER_ERROR = Path(os.getenv('WATCHFOLDER_ERROR', str(WATCHFOLDER_INPUT / 'error')))
     WATCHFOLDER_SCHEDULE = os.getenv('WATCHFOLDER_SCHEDULE', '09:00')
+    # Prioridade dos arquivos da entrada e subpastas com prioridade própria (ex.: "urgente=high,arquivo=low")
+    WATCHFOLDER_PRIORITY = os.getenv('WATCHFOLDER_PRIORITY', 'normal')
+    WATCHFOLDER_PRIORITY_DIRS = {
+        name.strip(): priority.strip()
+        for name, priority in (
+            item.split('=') for item in os.getenv('WATCHFOLDER_PRIORITY_DIRS', '').split(',') if '=' in item
+        )
+    }
+    # Modo contínuo (--watch): inotify|polling|auto, intervalo de varredura e tempo sem crescer (s)
+    WATCH_BACKEND = os.getenv('WATCH_BACKEND', 'auto').lower()
+    WATCH_POLL_INTERVAL = float(os.getenv('WATCH_POLL_INTERVAL', '5'))
+    WATCH_STABLE_SECONDS = float(os.getenv('WATCH_STABLE_SECONDS', '10'))
+    # Quantos arquivos podem estar em processamento ao mesmo tempo no lote
+    SCHEDULER_MAX_IN_FLIGHT = int(os.getenv('SCHEDULER_MAX_IN_FLIGHT', str(max(2, os.cpu_count() or 1))))
     
     # Audio Processing
     SILENCE_THRESHOLD = int(os.getenv('SILENCE_THRESHOLD', '-60'))
     MIN_SILENCE_LEN = int(os.getenv('MIN_SILENCE_LEN', '1000'))
     MIN_SEGMENT_DURATION = int(os.getenv('MIN_SEGMENT_DURATION', '5000'))
-    
+
+    # Reconhecimento: arquivos maiores que isso usam trechos representativos em vez do arquivo completo
+    FULL_RECOGNITION_MAX_DURATION = int(os.getenv('FULL_RECOGNITION_MAX_DURATION', '60000'))
+    RECOGNITION_EXCERPTS = [e.strip() for e in os.getenv('RECOGNITION_EXCERPTS', 'start,middle,loudest').split(',') if e.strip()]
+    RECOGNITION_EXCERPT_DURATION = int(os.getenv('RECOGNITION_EXCERPT_DURATION', '15000'))
+    LOUDEST_SCAN_PROBES = int(os.getenv('LOUDEST_SCAN_PROBES', '32'))
+
+    # DSP: acima dessa duração o áudio é processado em blocos a partir do disco
+    DSP_IN_MEMORY_MAX_DURATION = int(os.getenv('DSP_IN_MEMORY_MAX_DURATION', '1200000'))
+    DSP_BLOCK_FRAMES = int(os.getenv('DSP_BLOCK_FRAMES', '262144'))
+    # DSP multi-core em memória compartilhada (0 = número de CPUs, 1 = desativa)
+    DSP_WORKERS = int(os.getenv('DSP_WORKERS', '0'))
+    DSP_PARALLEL_MIN_DURATION = int(os.getenv('DSP_PARALLEL_MIN_DURATION', '60000'))
+
+    # Demucs (modelo carregado uma vez por processo pelo DemucsService)
+    DEMUCS_MODEL = os.getenv('DEMUCS_MODEL', 'htdemucs')
+    DEMUCS_DEVICE = os.getenv('DEMUCS_DEVICE', 'auto')
+    # Separação por trechos: contexto extra de cada lado (ms) e tamanho máximo de cada pedaço
+    DEMUCS_RANGE_PADDING = int(os.getenv('DEMUCS_RANGE_PADDING', '3000'))
+    DEMUCS_MAX_CHUNK_DURATION = int(os.getenv('DEMUCS_MAX_CHUNK_DURATION', '300000'))
+    # Inferência: pedaços de mesmo tamanho de vários jobs são empilhados numa passada só
+    DEMUCS_BATCH_SIZE = int(os.getenv('DEMUCS_BATCH_SIZE', '4'))
+    DEMUCS_CHUNK_SECONDS = float(os.getenv('DEMUCS_CHUNK_SECONDS', '10'))
+    DEMUCS_THREADS = int(os.getenv('DEMUCS_THREADS', '0'))  # 0 = padrão do torch/onnxruntime
+    DEMUCS_QUANTIZE = os.getenv('DEMUCS_QUANTIZE', 'false').lower() == 'true'
+    # Modelo exportado para ONNX Runtime (CPU); vazio = torch
+    DEMUCS_ONNX_PATH = os.getenv('DEMUCS_ONNX_PATH', '')
+    DEMUCS_ONNX_SAMPLERATE = int(os.getenv('DEMUCS_ONNX_SAMPLERATE', '44100'))
+    DEMUCS_ONNX_SOURCES = [s.strip() for s in os.getenv('DEMUCS_ONNX_SOURCES', 'drums,bass,other,vocals').split(',') if s.strip()]
+
+    # Cache de stems separados (chave = hash do áudio + modelo), com cota LRU em disco
+    STEM_CACHE_ENABLED = os.getenv('STEM_CACHE_ENABLED', 'true').lower() == 'true'
+    STEM_CACHE_DIR = Path(os.getenv('STEM_CACHE_DIR', str(PASTA_SAIDA / 'stem_cache')))
+    STEM_CACHE_MAX_GB = float(os.getenv('STEM_CACHE_MAX_GB', '20'))
+
+    # Planejador de workflow: qualidade mínima esperada e modelo de custo por estratégia
+    PLANNER_QUALITY_BAR = float(os.getenv('PLANNER_QUALITY_BAR', '0.8'))
+    PLANNER_MIXED_MAX_STREAMS = int(os.getenv('PLANNER_MIXED_MAX_STREAMS', '2'))
+    PLANNER_MIN_LOUDNESS_DB = float(os.getenv('PLANNER_MIN_LOUDNESS_DB', '-55'))
+    PLANNER_API_CALL_SECONDS = float(os.getenv('PLANNER_API_CALL_SECONDS', '3'))
+    # Segundos de processamento por segundo de áudio (ex.: "direct=0,enhanced=0.01,separated=0.2")
+    PLANNER_STRATEGY_COST = {
+        name.strip(): float(cost)
+        for name, cost in (
+            item.split('=') for item in os.getenv(
+                'PLANNER_STRATEGY_COST', 'direct=0,enhanced=0.01,separated=0.2'
+            ).split(',') if '=' in item
+        )
+    }
+
+    # Tracks duplicadas (mesma mixagem em várias tracks): só uma é reconhecida
+    DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', 'true').lower() == 'true'
+    DEDUP_CORRELATION_THRESHOLD = float(os.getenv('DEDUP_CORRELATION_THRESHOLD', '0.98'))
+
+    # Checkpoints por job: saída de cada etapa, para retomar de onde parou após uma queda
+    CHECKPOINT_ENABLED = os.getenv('CHECKPOINT_ENABLED', 'true').lower() == 'true'
+    CHECKPOINT_DIR = Path(os.getenv('CHECKPOINT_DIR', str(PASTA_SAIDA / 'checkpoints')))
+
+    # Histórico de vazão por etapa (um JSON por job concluído) e quantas medições recentes entram na mediana
+    THROUGHPUT_STATS_PATH = Path(os.getenv('THROUGHPUT_STATS_PATH', str(PASTA_SAIDA / 'stats' / 'throughput.jsonl')))
+    THROUGHPUT_HISTORY = int(os.getenv('THROUGHPUT_HISTORY', '200'))
+    # Estimativa prévia de custo: taxas sem histórico (probe s/arquivo, extract/analyze s por s de áudio,
+    # recognize = fator sobre o custo do planejador), taxa (Hz) e prazo (s) da varredura rápida de silêncio
+    ESTIMATOR_DEFAULT_RATES = {
+        name.strip(): float(rate)
+        for name, rate in (
+            item.split('=') for item in os.getenv(
+                'ESTIMATOR_DEFAULT_RATES', 'probe=1,extract=0.02,analyze=0.01,recognize=1'
+            ).split(',') if '=' in item
+        )
+    }
+    ESTIMATOR_SCAN_RATE = int(os.getenv('ESTIMATOR_SCAN_RATE', '2000'))
+    ESTIMATOR_SCAN_TIMEOUT = float(os.getenv('ESTIMATOR_SCAN_TIMEOUT', '600'))
+
+    # Pipeline por etapas: tamanho das filas entre etapas e workers por etapa
+    PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '2'))
+    PIPELINE_STAGE_WORKERS = {
+        name.strip(): int(count)
+        for name, count in (
+            item.split('=') for item in os.getenv(
+                'PIPELINE_STAGE_WORKERS', 'download=2,probe=2,extract=2,analyze=2,recognize=8'
+            ).split(',') if '=' in item
+        )
+    }
+    # Prazos (s) por etapa e por job inteiro (0 = sem prazo); no prazo o job é cancelado e os filhos mortos
+    PIPELINE_STAGE_TIMEOUTS = {
+        name.strip(): float(seconds)
+        for name, seconds in (
+            item.split('=') for item in os.getenv(
+                'PIPELINE_STAGE_TIMEOUTS', 'download=1800,probe=120,extract=3600,analyze=1800,recognize=7200'
+            ).split(',') if '=' in item
+        )
+    }
+    JOB_TIMEOUT = float(os.getenv('JOB_TIMEOUT', '14400'))
+    SHAZAM_TIMEOUT = float(os.getenv('SHAZAM_TIMEOUT', '60'))
+    FFPROBE_TIMEOUT = float(os.getenv('FFPROBE_TIMEOUT', '120'))
+    DEMUCS_CLI_TIMEOUT = float(os.getenv('DEMUCS_CLI_TIMEOUT', '3600'))
+
+    # Uploads da API: os workers abrem o caminho gravado no registro, então fica no
+    # volume compartilhado (temp/ = /app/temp no docker-compose) e é gravado absoluto
+    UPLOAD_DIR = Path(os.getenv('UPLOAD_DIR', 'temp/uploads'))
+
+    # Jobs disparados pela API: workers do executor e prazo (s) para terminar os jobs em execução no shutdown
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+    JOB_DRAIN_TIMEOUT = float(os.getenv('JOB_DRAIN_TIMEOUT', '300'))
+    # Escalonamento: prioridade (high|normal|low), menor duração primeiro e promoção a cada JOB_AGING_SECONDS de espera
+    JOB_AGING_SECONDS = float(os.getenv('JOB_AGING_SECONDS', '600'))
+    JOB_DEFAULT_PRIORITY = os.getenv('JOB_DEFAULT_PRIORITY', 'normal')
+    # Onde os jobs da API rodam: local (executor no processo da API) ou redis (workers: python main.py --worker)
+    JOB_BACKEND = os.getenv('JOB_BACKEND', 'local').lower()
+
+    # Fila distribuída (Redis Streams): streams JOB_STREAM:<prioridade> e JOB_STREAM:dead, um grupo para todos os workers
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+    JOB_STREAM_BACKEND = os.getenv('JOB_STREAM_BACKEND', 'redis').lower()  # fake = em memória, só para testes
+    JOB_STREAM = os.getenv('JOB_STREAM', 'globo_sonar:mxf')
+    JOB_STREAM_GROUP = os.getenv('JOB_STREAM_GROUP', 'mxf-workers')
+    # Consumidores por worker, entregas antes da dead-letter, ociosidade (ms) para outro worker assumir e espera por mensagens (ms)
+    WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', '1'))
+    WORKER_MAX_DELIVERIES = int(os.getenv('WORKER_MAX_DELIVERIES', '3'))
+    WORKER_CLAIM_IDLE_MS = int(os.getenv('WORKER_CLAIM_IDLE_MS', '300000'))
+    WORKER_BLOCK_MS = int(os.getenv('WORKER_BLOCK_MS', '5000'))
+    # Intervalo (s) em que o worker confere se o job em andamento foi cancelado pela API
+    WORKER_CANCEL_POLL_SECONDS = float(os.getenv('WORKER_CANCEL_POLL_SECONDS', '2'))
+
     # SharePoint
     SHAREPOINT_CLIENT_ID = os.getenv('SHAREPOINT_CLIENT_ID')
     SHAREPOINT_CLIENT_SECRET = os.getenv('SHAREPOINT_CLIENT_SECRET')
@@ -41,4 +179,6 @@ class Config:
         self.LOGS_PATH.mkdir(parents=True, exist_ok=True)
         self.WATCHFOLDER_INPUT.mkdir(parents=True, exist_ok=True)
         self.WATCHFOLDER_OUTPUT.mkdir(parents=True, exist_ok=True)
-        self.WATCHFOLDER_PROCESSED.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
+        self.WATCHFOLDER_PROCESSED.mkdir(parents=True, exist_ok=True)
+        for name in self.WATCHFOLDER_PRIORITY_DIRS:
+            (self.WATCHFOLDER_INPUT / name).mkdir(parents=True, exist_ok=True)
\ No newline at end of file
@@ -27,6 +27,17 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+def create_schema():
+    """
+    Cria as tabelas que faltam e os índices dos modelos. create_all não altera
+    tabelas que já existem, então os índices são criados um a um (se não existirem).
+    """
+    Base.metadata.create_all(bind=engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=True)
 async_session = sessionmaker(
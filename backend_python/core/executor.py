@@ -1,3 +1,140 @@
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+from collections import deque
+from core.cancellation import JobCancelled
+from core.job_queue import JobQueue, DEFAULT_PRIORITY
+from core.logger import Logger
 
-executor = ThreadPoolExecutor(max_workers=4)
+# Quantas medições recentes entram na média de execução
+_METRICS_WINDOW = 200
+# Intervalo (s) em que um worker ocioso confere se o executor está encerrando
+_IDLE_CHECK = 0.5
+
+
+class JobExecutor:
+    """
+    Pool limitado de workers para os jobs disparados pela API.
+
+    Cada worker é uma thread com um event loop próprio, reaproveitado entre os
+    jobs (em vez de uma thread e um loop novos por upload). Os jobs saem de uma
+    JobQueue (prioridade, menor-job-primeiro e envelhecimento). A fila em
+    memória guarda só os ids: a fila persistente é o status no banco, e quem
+    usa o executor reenfileira no início os jobs que ficaram pendentes.
+
+    shutdown() para de aceitar jobs, descarta a fila em memória (os jobs
+    continuam pendentes no banco) e espera os que estão rodando terminarem.
+    """
+
+    def __init__(self, handler, workers: int, name: str = "jobs", queue: JobQueue = None):
+        """handler: função assíncrona handler(job_id), executada no loop do worker"""
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.name = name
+        self.logger = Logger()
+        self._queue = queue or JobQueue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._accepting = True
+        self._running = set()
+        self._completed = 0
+        self._failed = 0
+        self._run_times = deque(maxlen=_METRICS_WINDOW)
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"{self.name}-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self.logger.info(f"🧵 Executor '{self.name}' iniciado com {self.workers} workers")
+
+    def submit(self, job_id, priority: str = DEFAULT_PRIORITY, cost: float = None) -> bool:
+        """
+        Enfileira o job; False se o executor está encerrando. Ids já na fila ou rodando são ignorados.
+        cost: duração prevista em segundos (menor primeiro dentro da prioridade), None se desconhecida.
+        """
+        with self._lock:
+            if not self._accepting:
+                return False
+            if job_id in self._running or not self._queue.put(job_id, priority, cost):
+                return True
+            self._ensure_started()
+        self.logger.info(f"📥 Job {job_id} na fila (prioridade {priority}, {self.queue_depth} aguardando)")
+        return True
+
+    def cancel(self, job_id) -> bool:
+        """Tira o job da fila; False se ele não está esperando (já começou ou não existe)"""
+        return self._queue.remove(job_id)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def metrics(self) -> dict:
+        """Profundidade da fila, jobs em execução, tempo de execução recente e latência por prioridade (s)"""
+        with self._lock:
+            run_times = list(self._run_times)
+            summary = {
+                'workers': self.workers,
+                'accepting': self._accepting,
+                'queue_depth': len(self._queue),
+                'running': len(self._running),
+                'completed': self._completed,
+                'failed': self._failed,
+                'avg_run_seconds': round(sum(run_times) / len(run_times), 3) if run_times else 0.0,
+            }
+        summary['priorities'] = self._queue.metrics()
+        return summary
+
+    def _worker(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            while self._accepting or len(self._queue):
+                job = self._queue.get(timeout=_IDLE_CHECK)
+                if job is None:
+                    continue
+                with self._lock:
+                    self._running.add(job.job_id)
+
+                ok = False
+                try:
+                    loop.run_until_complete(self.handler(job.job_id))
+                    ok = True
+                except (Exception, JobCancelled) as e:
+                    self.logger.error(f"❌ Job {job.job_id} falhou: {e}")
+                finally:
+                    self._queue.finished(job)
+                    with self._lock:
+                        self._running.discard(job.job_id)
+                        self._run_times.append(time.monotonic() - job.started_at)
+                        if ok:
+                            self._completed += 1
+                        else:
+                            self._failed += 1
+        finally:
+            loop.close()
+
+    def shutdown(self, timeout: float = None) -> bool:
+        """
+        Encerramento gracioso: não aceita novos jobs, tira da fila os que não
+        começaram e espera os em execução por até timeout segundos.
+        Retorna True se todos terminaram dentro do prazo.
+        """
+        with self._lock:
+            self._accepting = False
+            dropped = len(self._queue.clear())
+            running = len(self._running)
+
+        self.logger.info(f"🛑 Encerrando executor '{self.name}': aguardando {running} jobs em execução"
+                         f" ({dropped} continuam pendentes)")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+        drained = not any(thread.is_alive() for thread in self._threads)
+        if not drained:
+            self.logger.warning(f"⚠️ Executor '{self.name}': prazo de {timeout}s esgotado com jobs em execução")
+        return drained
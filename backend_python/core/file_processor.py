@@ -1,6 +1,6 @@
 from pathlib import Path
 import json
-import subprocess
+from core.cancellation import run_command
 from core.config import Config
 from core.logger import Logger
 
@@ -21,7 +21,7 @@ class MXFProcessor:
             ]
             
             self.logger.info(f"Analisando streams do arquivo: {file_path}")
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = run_command(cmd, self.config.FFPROBE_TIMEOUT)
             
             if result.returncode != 0:
                 raise Exception(f"Erro no ffprobe: {result.stderr}")
@@ -35,6 +35,27 @@ class MXFProcessor:
             self.logger.error(f"Erro ao obter streams: {e}")
             return []
     
+    def get_duration(self, file_path: Path):
+        """Duração do arquivo em segundos (cabeçalho do container), ou None se o ffprobe falhar"""
+        try:
+            cmd = [
+                self.config.FFPROBE_PATH,
+                '-v', 'error',
+                '-show_entries', 'format=duration',
+                '-of', 'json',
+                str(file_path)
+            ]
+            result = run_command(cmd, self.config.FFPROBE_TIMEOUT)
+            
+            if result.returncode != 0:
+                raise Exception(f"Erro no ffprobe: {result.stderr}")
+            
+            return float(json.loads(result.stdout)['format']['duration'])
+            
+        except Exception as e:
+            self.logger.warning(f"Duração desconhecida para {file_path}: {e}")
+            return None
+    
     def extract_audio_stream(self, file_path: Path, stream_index: int, output_path: Path):
         """Extrai um stream de áudio específico"""
         try:
@@ -48,7 +69,8 @@ class MXFProcessor:
             ]
             
             self.logger.info(f"Extraindo stream {stream_index} para: {output_path}")
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            # Morto junto com o job se ele for cancelado ou passar do prazo
+            result = run_command(cmd)
             
             if result.returncode != 0:
                 raise Exception(f"Erro ao extrair stream {stream_index}: {result.stderr}")
@@ -0,0 +1,155 @@
+import math
+import threading
+import time
+from collections import deque
+from itertools import count
+from core.config import Config
+
+# Níveis de prioridade (menor = mais urgente)
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+DEFAULT_PRIORITY = 'normal'
+# Quantas medições recentes entram nas estatísticas de latência de cada prioridade
+_LATENCY_WINDOW = 500
+
+
+def priority_level(priority: str) -> int:
+    """Nível numérico da prioridade; ValueError se o nome não existir"""
+    try:
+        return PRIORITIES[priority]
+    except KeyError:
+        raise ValueError(f"Prioridade inválida '{priority}' (use {', '.join(PRIORITIES)})") from None
+
+
+class QueuedJob:
+    """Job na fila: id, prioridade pedida, custo estimado (duração em segundos) e instantes de entrada/início"""
+
+    __slots__ = ('job_id', 'priority', 'cost', 'enqueued_at', 'started_at', 'seq')
+
+    def __init__(self, job_id, priority: str, cost: float, enqueued_at: float, seq: int):
+        self.job_id = job_id
+        self.priority = priority
+        self.cost = cost
+        self.enqueued_at = enqueued_at
+        self.started_at = None
+        self.seq = seq
+
+
+def _percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class JobQueue:
+    """
+    Fila de jobs por prioridade com menor-job-primeiro dentro de cada nível.
+
+    A ordem é recalculada a cada retirada:
+      1. nível da prioridade, promovido um nível a cada JOB_AGING_SECONDS de espera;
+      2. dentro do nível, jobs que já esperaram JOB_AGING_SECONDS vêm antes dos
+         novos (por ordem de chegada), então um arquivo longo nunca fica para trás
+         para sempre de um fluxo de arquivos curtos;
+      3. os demais pelo custo (duração prevista), desconhecido por último.
+
+    Thread-safe: put/pop podem vir de threads diferentes, get() bloqueia.
+    Também mede espera (entrada → início) e latência (entrada → fim) por prioridade.
+    """
+
+    def __init__(self, aging_seconds: float = None):
+        self.aging_seconds = Config().JOB_AGING_SECONDS if aging_seconds is None else aging_seconds
+        self._jobs = {}
+        self._seq = count()
+        self._condition = threading.Condition()
+        self._stats = {
+            name: {'started': 0, 'finished': 0,
+                   'waits': deque(maxlen=_LATENCY_WINDOW), 'latencies': deque(maxlen=_LATENCY_WINDOW)}
+            for name in PRIORITIES
+        }
+
+    def __len__(self):
+        with self._condition:
+            return len(self._jobs)
+
+    def __contains__(self, job_id):
+        with self._condition:
+            return job_id in self._jobs
+
+    def put(self, job_id, priority: str = DEFAULT_PRIORITY, cost: float = None) -> bool:
+        """Enfileira; False se o id já está na fila"""
+        priority_level(priority)
+        with self._condition:
+            if job_id in self._jobs:
+                return False
+            cost = math.inf if cost is None else float(cost)
+            self._jobs[job_id] = QueuedJob(job_id, priority, cost, time.monotonic(), next(self._seq))
+            self._condition.notify()
+            return True
+
+    def _key(self, job: QueuedJob, now: float):
+        waited = now - job.enqueued_at
+        promotions = int(waited // self.aging_seconds) if self.aging_seconds > 0 else 0
+        level = max(0, PRIORITIES[job.priority] - promotions)
+        if promotions:
+            return (level, 0, job.seq)
+        return (level, 1, job.cost, job.seq)
+
+    def _take(self):
+        if not self._jobs:
+            return None
+        now = time.monotonic()
+        job = min(self._jobs.values(), key=lambda queued: self._key(queued, now))
+        del self._jobs[job.job_id]
+        job.started_at = now
+        stats = self._stats[job.priority]
+        stats['started'] += 1
+        stats['waits'].append(now - job.enqueued_at)
+        return job
+
+    def pop(self):
+        """Próximo job pela ordem de escalonamento, ou None se a fila está vazia"""
+        with self._condition:
+            return self._take()
+
+    def get(self, timeout: float = None):
+        """Como pop(), mas espera até timeout segundos por um job (None = sem limite)"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._jobs, timeout)
+            return self._take()
+
+    def remove(self, job_id) -> bool:
+        """Tira um job da fila sem executá-lo; False se ele não estava na fila"""
+        with self._condition:
+            return self._jobs.pop(job_id, None) is not None
+
+    def clear(self) -> list:
+        """Esvazia a fila e devolve os jobs retirados"""
+        with self._condition:
+            jobs = list(self._jobs.values())
+            self._jobs.clear()
+            return jobs
+
+    def finished(self, job: QueuedJob):
+        """Registra o fim do job (latência total desde a entrada na fila)"""
+        with self._condition:
+            stats = self._stats[job.priority]
+            stats['finished'] += 1
+            stats['latencies'].append(time.monotonic() - job.enqueued_at)
+
+    def metrics(self) -> dict:
+        """Por prioridade: fila atual, espera mais antiga e espera/latência recentes (média, p95, máx; s)"""
+        with self._condition:
+            now = time.monotonic()
+            result = {}
+            for name, stats in self._stats.items():
+                queued = [job for job in self._jobs.values() if job.priority == name]
+                entry = {
+                    'queue_depth': len(queued),
+                    'oldest_wait_seconds': round(max((now - job.enqueued_at for job in queued), default=0.0), 3),
+                    'started': stats['started'],
+                    'finished': stats['finished'],
+                }
+                for label, values in (('wait', list(stats['waits'])), ('latency', list(stats['latencies']))):
+                    entry[f'avg_{label}_seconds'] = round(sum(values) / len(values), 3) if values else 0.0
+                    entry[f'p95_{label}_seconds'] = round(_percentile(values, 0.95), 3) if values else 0.0
+                    entry[f'max_{label}_seconds'] = round(max(values), 3) if values else 0.0
+                result[name] = entry
+            return result
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+import numpy as np
+from pathlib import Path
+from core.config import Config
+from core.logger import Logger
+from utils.wav_io import read_wav_info, iter_frames
+
+_HASH_BLOCK_BYTES = 8 * 1024 * 1024
+# A limpeza desce até esta fração da cota, para não varrer o diretório a cada put
+_EVICT_TARGET = 0.9
+
+
+class StemCache:
+    """
+    Cache de stems separados endereçado pelo conteúdo do áudio.
+
+    A chave é o hash das amostras PCM (mais formato) combinado com o nome e a
+    versão do modelo, então o mesmo áudio com outro nome de arquivo também acerta.
+    Cada entrada é um diretório com os WAVs dos stems, criado de forma atômica
+    (rename de um diretório temporário). O mtime do diretório marca o último uso
+    e as entradas menos usadas são removidas quando o total passa de
+    STEM_CACHE_MAX_GB. O total é varrido uma vez por diretório e processo e
+    depois só somado a cada put; o diretório só é varrido de novo quando a
+    soma passa da cota (a varredura corrige o que outros workers gravaram).
+    """
+
+    # Tamanho estimado de cada raiz de cache (compartilhado entre instâncias do processo)
+    _sizes = {}
+    _sizes_lock = threading.Lock()
+
+    def __init__(self, root: Path = None, max_bytes: int = None):
+        self.logger = Logger()
+        self.config = Config()
+        self.root = Path(root or self.config.STEM_CACHE_DIR)
+        self.max_bytes = int(self.config.STEM_CACHE_MAX_GB * 1024 ** 3) if max_bytes is None else max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def audio_hash(source) -> str:
+        """Hash do conteúdo: amostras PCM de um WAV/AudioBuffer, ou bytes do arquivo para outros formatos"""
+        digest = hashlib.blake2b(digest_size=20)
+
+        if hasattr(source, 'samples'):
+            digest.update(f"pcm:{source.channels}:{source.sample_width}:{source.frame_rate}:".encode())
+            digest.update(memoryview(np.ascontiguousarray(source.samples)).cast('B'))
+            return digest.hexdigest()
+
+        path = Path(source)
+        try:
+            info = read_wav_info(path)
+        except Exception:
+            info = None
+
+        if info is not None:
+            digest.update(f"pcm:{info.channels}:{info.sample_width}:{info.frame_rate}:".encode())
+            block_frames = max(1, _HASH_BLOCK_BYTES // (info.channels * info.sample_width))
+            for frames in iter_frames(path, info, block_frames):
+                digest.update(frames)
+        else:
+            digest.update(b"file:")
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(_HASH_BLOCK_BYTES), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(audio_hash: str, model: str, version: str = "") -> str:
+        return hashlib.blake2b(f"{audio_hash}:{model}:{version}".encode(), digest_size=20).hexdigest()
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str):
+        """{stem: Path} da entrada, ou None. Os arquivos pertencem ao cache: não apague"""
+        entry = self._entry_dir(key)
+        meta_path = entry / "meta.json"
+        if not meta_path.exists():
+            return None
+
+        try:
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+            stems = {name: entry / file_name for name, file_name in meta['stems'].items()}
+            if not all(path.exists() for path in stems.values()):
+                return None
+            os.utime(entry)  # LRU: marca o último uso
+            self.logger.info(f"♻️ Stems em cache ({meta.get('model', '')}): {', '.join(stems)}")
+            return stems
+        except Exception as e:
+            self.logger.warning(f"⚠️ Entrada de cache inválida {key}: {e}")
+            return None
+
+    def put(self, key: str, stems: dict, model: str = "", source_name: str = ""):
+        """
+        Grava {stem: AudioBuffer ou Path} como nova entrada e retorna {stem: Path} no cache.
+        Paths são copiados (o chamador pode apagar os originais).
+        """
+        entry = self._entry_dir(key)
+        temp = self.root / f"tmp-{uuid.uuid4().hex}"
+        temp.mkdir(parents=True)
+        try:
+            files = {}
+            for name, stem in stems.items():
+                target = temp / f"{name}.wav"
+                if isinstance(stem, (str, Path)):
+                    shutil.copyfile(stem, target)
+                else:
+                    stem.export(target)
+                files[name] = target.name
+
+            meta = {'model': model, 'source': source_name, 'stems': files, 'created': time.time()}
+            (temp / "meta.json").write_text(json.dumps(meta), encoding='utf-8')
+
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.rename(temp, entry)
+            except OSError:
+                # Outro worker gravou a mesma entrada antes: fica a dele
+                shutil.rmtree(temp, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(temp, ignore_errors=True)
+            raise
+
+        self._track(entry)
+        return {name: entry / f"{name}.wav" for name in stems}
+
+    def _entries(self):
+        for shard in self.root.iterdir():
+            if not shard.is_dir() or shard.name.startswith("tmp-"):
+                continue
+            for entry in shard.iterdir():
+                if entry.is_dir():
+                    yield entry.stat().st_mtime, self._entry_size(entry), entry
+
+    @staticmethod
+    def _entry_size(entry: Path) -> int:
+        return sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+
+    def _track(self, entry: Path):
+        """Soma a entrada nova ao total estimado e só limpa (varrendo o diretório) quando passa da cota"""
+        root = str(self.root.resolve())
+        with StemCache._sizes_lock:
+            total = StemCache._sizes.get(root)
+            if total is not None:
+                try:
+                    total += self._entry_size(entry)
+                except OSError:
+                    pass
+                StemCache._sizes[root] = total
+        if total is None or total > self.max_bytes:
+            self.evict(keep=entry)
+
+    def evict(self, keep: Path = None):
+        """Remove as entradas usadas há mais tempo até o total caber em _EVICT_TARGET da cota (exceto `keep`)"""
+        root = str(self.root.resolve())
+        with StemCache._sizes_lock:
+            try:
+                entries = sorted(self._entries())
+                total = sum(size for _, size, _ in entries)
+                if total <= self.max_bytes:
+                    StemCache._sizes[root] = total
+                    return
+                for _, size, entry in entries:
+                    if total <= self.max_bytes * _EVICT_TARGET:
+                        break
+                    if entry == keep:
+                        continue
+                    shutil.rmtree(entry, ignore_errors=True)
+                    total -= size
+                    self.logger.info(f"🧹 Cache de stems: entrada removida {entry.name} ({size / 1024 ** 2:.1f} MB)")
+                StemCache._sizes[root] = total
+            except Exception as e:
+                self.logger.warning(f"⚠️ Erro ao limpar cache de stems: {e}")
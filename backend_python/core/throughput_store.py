@@ -0,0 +1,89 @@
+import json
+import os
+import statistics
+import threading
+import time
+from pathlib import Path
+from core.config import Config
+from core.logger import Logger
+
+# Unidade de trabalho de cada etapa: o tempo medido é dividido por ela
+#   job: custo fixo por arquivo; audio_seconds: soma das durações dos streams
+#   de áudio; planned_seconds: custo previsto pelo WorkflowPlanner (a taxa vira
+#   um fator de calibração do modelo do planejador)
+STAGE_UNITS = {
+    'probe': 'job',
+    'extract': 'audio_seconds',
+    'analyze': 'audio_seconds',
+    'recognize': 'planned_seconds',
+}
+
+
+class ThroughputStore:
+    """
+    Histórico de vazão por etapa dos jobs concluídos: uma linha JSON por job
+    (só acréscimo) com o tempo de cada etapa e o tamanho do trabalho. rates()
+    devolve a mediana das últimas THROUGHPUT_HISTORY medições de cada etapa,
+    em segundos por unidade (STAGE_UNITS), usada pelo CostEstimator.
+    """
+
+    def __init__(self, path: Path = None):
+        self.config = Config()
+        self.logger = Logger()
+        self.path = Path(path or self.config.THROUGHPUT_STATS_PATH)
+        self._lock = threading.Lock()
+
+    def record(self, timings: dict, audio_seconds: float, planned_seconds: float = None, api_calls: int = None):
+        """Grava a medição de um job; timings: {etapa: segundos}"""
+        entry = {
+            'at': round(time.time(), 3),
+            'stages': {stage: round(seconds, 3) for stage, seconds in timings.items()},
+            'job': 1,
+            'audio_seconds': round(audio_seconds, 3),
+            'planned_seconds': planned_seconds,
+            'api_calls': api_calls,
+        }
+        try:
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+        except Exception as e:
+            self.logger.warning(f"⚠️ Não foi possível gravar a vazão do job: {e}")
+
+    def samples(self) -> list:
+        """Medições gravadas (linhas ilegíveis são ignoradas)"""
+        samples = []
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        samples.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return samples
+
+    def rates(self) -> dict:
+        """
+        {etapa: {'rate': segundos por unidade, 'unit', 'samples', 'source'}}.
+        Sem histórico a etapa usa ESTIMATOR_DEFAULT_RATES (source 'default').
+        """
+        recent = self.samples()[-self.config.THROUGHPUT_HISTORY:]
+        rates = {}
+        for stage, unit in STAGE_UNITS.items():
+            values = [
+                sample['stages'][stage] / sample[unit]
+                for sample in recent
+                if stage in sample.get('stages', {}) and sample.get(unit)
+            ]
+            if values:
+                rates[stage] = {'rate': statistics.median(values), 'unit': unit,
+                                'samples': len(values), 'source': 'history'}
+            else:
+                rates[stage] = {'rate': self.config.ESTIMATOR_DEFAULT_RATES.get(stage, 0.0), 'unit': unit,
+                                'samples': 0, 'source': 'default'}
+        return rates
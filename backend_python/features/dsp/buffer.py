@@ -0,0 +1,76 @@
+import numpy as np
+from pathlib import Path
+from pydub import AudioSegment
+from utils.wav_io import read_wav_info, read_frames, to_wav_bytes
+
+_DTYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+
+class AudioBuffer:
+    """Áudio PCM em memória: array (frames, canais) + taxa de amostragem"""
+
+    def __init__(self, samples: np.ndarray, frame_rate: int, name: str = "audio"):
+        if samples.ndim == 1:
+            samples = samples[:, np.newaxis]
+        self.samples = samples
+        self.frame_rate = frame_rate
+        self.name = name
+
+    @classmethod
+    def from_frames(cls, frames: bytes, channels: int, sample_width: int, frame_rate: int, name: str = "audio"):
+        dtype = _DTYPES.get(sample_width)
+        if dtype is None:
+            raise ValueError(f"Largura de amostra não suportada: {sample_width} bytes")
+        samples = np.frombuffer(frames, dtype=dtype).reshape(-1, channels)
+        return cls(samples, frame_rate, name)
+
+    @classmethod
+    def from_wav(cls, audio_path: Path):
+        """Lê o WAV inteiro direto do chunk de dados, sem passar pelo pydub"""
+        info = read_wav_info(audio_path)
+        frames = read_frames(audio_path, info, 0, info.n_frames)
+        return cls.from_frames(frames, info.channels, info.sample_width, info.frame_rate, Path(audio_path).stem)
+
+    @classmethod
+    def from_segment(cls, audio_segment: AudioSegment, name: str = "audio"):
+        return cls.from_frames(audio_segment.raw_data, audio_segment.channels,
+                               audio_segment.sample_width, audio_segment.frame_rate, name)
+
+    @property
+    def channels(self) -> int:
+        return self.samples.shape[1]
+
+    @property
+    def sample_width(self) -> int:
+        return self.samples.dtype.itemsize
+
+    @property
+    def duration_ms(self) -> int:
+        return int(len(self.samples) * 1000 / self.frame_rate)
+
+    def slice_ms(self, start_ms: int, duration_ms: int, name: str = None):
+        """Trecho do buffer (view, sem cópia)"""
+        start = int(start_ms * self.frame_rate / 1000)
+        end = start + int(duration_ms * self.frame_rate / 1000)
+        return AudioBuffer(self.samples[start:end], self.frame_rate, name or self.name)
+
+    def with_samples(self, samples: np.ndarray, suffix: str = ""):
+        """Novo buffer com a mesma taxa e nome derivado"""
+        return AudioBuffer(samples, self.frame_rate, f"{self.name}{suffix}")
+
+    def to_segment(self) -> AudioSegment:
+        return AudioSegment(
+            data=np.ascontiguousarray(self.samples).tobytes(),
+            sample_width=self.sample_width,
+            frame_rate=self.frame_rate,
+            channels=self.channels
+        )
+
+    def to_wav_bytes(self) -> bytes:
+        return to_wav_bytes(np.ascontiguousarray(self.samples).tobytes(),
+                            self.channels, self.sample_width, self.frame_rate)
+
+    def export(self, output_path: Path) -> Path:
+        with open(output_path, 'wb') as f:
+            f.write(self.to_wav_bytes())
+        return output_path
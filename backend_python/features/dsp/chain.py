@@ -0,0 +1,135 @@
+import math
+import numpy as np
+from features.dsp.buffer import AudioBuffer
+from features.dsp.filters import FirstOrderFilter, apply_gain
+
+
+class DSPStep:
+    """Etapa de uma DSPChain. Etapas com estado são reiniciadas a cada execução."""
+
+    needs_analysis = False
+
+    def reset(self, frame_rate: int):
+        pass
+
+    def latency(self, frame_rate: int) -> int:
+        """Amostras anteriores que influenciam a saída (memória da etapa)"""
+        return 0
+
+    def observe(self, samples: np.ndarray):
+        """Acumula estatísticas do sinal antes do processamento (ex.: RMS global)"""
+        pass
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class LowPass(DSPStep):
+    def __init__(self, cutoff: float):
+        self.cutoff = cutoff
+
+    def reset(self, frame_rate: int):
+        self._filter = FirstOrderFilter('low', self.cutoff, frame_rate)
+
+    def latency(self, frame_rate: int) -> int:
+        return FirstOrderFilter('low', self.cutoff, frame_rate).latency
+
+    def process(self, samples):
+        return self._filter.process(samples)
+
+
+class HighPass(DSPStep):
+    def __init__(self, cutoff: float):
+        self.cutoff = cutoff
+
+    def reset(self, frame_rate: int):
+        self._filter = FirstOrderFilter('high', self.cutoff, frame_rate)
+
+    def latency(self, frame_rate: int) -> int:
+        return FirstOrderFilter('high', self.cutoff, frame_rate).latency
+
+    def process(self, samples):
+        return self._filter.process(samples)
+
+
+class BandPass(DSPStep):
+    """Passa-baixa em high_freq seguido de passa-alta em low_freq"""
+
+    def __init__(self, low_freq: float, high_freq: float):
+        self.low_freq = low_freq
+        self.high_freq = high_freq
+
+    def reset(self, frame_rate: int):
+        self._low = FirstOrderFilter('low', self.high_freq, frame_rate)
+        self._high = FirstOrderFilter('high', self.low_freq, frame_rate)
+
+    def latency(self, frame_rate: int) -> int:
+        return (FirstOrderFilter('low', self.high_freq, frame_rate).latency
+                + FirstOrderFilter('high', self.low_freq, frame_rate).latency)
+
+    def process(self, samples):
+        return self._high.process(self._low.process(samples))
+
+
+class Gain(DSPStep):
+    def __init__(self, gain_db: float):
+        self.gain_db = gain_db
+
+    def process(self, samples):
+        return apply_gain(samples, self.gain_db)
+
+
+class Normalize(DSPStep):
+    """Leva o RMS global ao nível alvo (limitado a +/- max_change_db), como LightSeparator._normalize_audio"""
+
+    needs_analysis = True
+
+    def __init__(self, target_dbfs: float = -20.0, max_change_db: float = 10.0):
+        self.target_dbfs = target_dbfs
+        self.max_change_db = max_change_db
+
+    def reset(self, frame_rate: int):
+        self._sum_squares = 0.0
+        self._count = 0
+        self._max_amplitude = None
+
+    def observe(self, samples):
+        values = samples.astype(np.float64).ravel()
+        self._sum_squares += float(np.dot(values, values))
+        self._count += values.size
+        self._max_amplitude = float(2 ** (samples.dtype.itemsize * 8 - 1))
+
+    @property
+    def gain_db(self) -> float:
+        rms = int(math.sqrt(self._sum_squares / self._count)) if self._count else 0
+        current = 20 * math.log10(rms / self._max_amplitude) if rms else -float('inf')
+        change = self.target_dbfs - current
+        return max(min(change, self.max_change_db), -self.max_change_db)
+
+    def process(self, samples):
+        return apply_gain(samples, self.gain_db)
+
+
+class DSPChain:
+    """Sequência de etapas DSP aplicadas em memória, sem arquivos intermediários"""
+
+    def __init__(self, name: str, steps: list):
+        self.name = name
+        self.steps = steps
+
+    def reset(self, frame_rate: int):
+        for step in self.steps:
+            step.reset(frame_rate)
+
+    def latency(self, frame_rate: int) -> int:
+        """Memória total da cadeia: quantas amostras anteriores afetam cada saída"""
+        return sum(step.latency(frame_rate) for step in self.steps)
+
+    def run(self, buffer: AudioBuffer) -> AudioBuffer:
+        self.reset(buffer.frame_rate)
+        samples = buffer.samples
+        for step in self.steps:
+            if step.needs_analysis:
+                step.observe(samples)
+            samples = step.process(samples)
+        return buffer.with_samples(samples, f"_{self.name}")
@@ -0,0 +1,53 @@
+import numpy as np
+
+# Janela do envelope usado como impressão digital (ms)
+FINGERPRINT_WINDOW_MS = 100
+
+
+def fingerprint(envelope: np.ndarray) -> np.ndarray:
+    """Envelope em log-energia (float32): ganho vira deslocamento, removido na normalização"""
+    return np.log10(envelope + 1.0).astype(np.float32)
+
+
+def correlation_matrix(fingerprints: list) -> np.ndarray:
+    """
+    Correlação de Pearson entre todas as impressões digitais de uma vez
+    (z-score por linha + um produto de matrizes). Streams do mesmo MXF já
+    estão alinhados, então não há busca de atraso; compara até o menor tamanho.
+    Linhas constantes (silêncio) têm correlação 0 com tudo.
+    """
+    if not fingerprints:
+        return np.zeros((0, 0))
+    length = min(len(f) for f in fingerprints)
+    if length < 2:
+        return np.eye(len(fingerprints))
+
+    matrix = np.stack([np.asarray(f[:length], dtype=np.float64) for f in fingerprints])
+    matrix -= matrix.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+    correlation = matrix @ matrix.T
+    np.fill_diagonal(correlation, 1.0)
+    return correlation
+
+
+def group_duplicates(fingerprints: dict, threshold: float, max_length_diff: float = 0.01) -> dict:
+    """
+    Agrupa streams duplicados/quase duplicados. fingerprints: {chave: array}, na
+    ordem de preferência do representante. Retorna {chave duplicada: (representante, r)}.
+    """
+    keys = list(fingerprints)
+    correlation = correlation_matrix([fingerprints[key] for key in keys])
+    lengths = np.array([len(fingerprints[key]) for key in keys], dtype=np.float64)
+
+    duplicates = {}
+    for i, key in enumerate(keys):
+        if key in duplicates:
+            continue
+        for j in range(i + 1, len(keys)):
+            if keys[j] in duplicates:
+                continue
+            same_length = abs(lengths[i] - lengths[j]) <= max_length_diff * max(lengths[i], lengths[j], 1)
+            if same_length and correlation[i, j] >= threshold:
+                duplicates[keys[j]] = (key, round(float(correlation[i, j]), 4))
+    return duplicates
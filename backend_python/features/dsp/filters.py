@@ -0,0 +1,151 @@
+import math
+import numpy as np
+
+# Resposta ao impulso é truncada quando o polo decai abaixo disso (erro << 1 LSB em int16)
+IMPULSE_TOLERANCE = 1e-7
+
+
+class FirstOrderFilter:
+    """
+    Filtro RC de 1ª ordem com a mesma recorrência dos filtros do pydub,
+    aplicado por convolução FFT (overlap-add) em todos os canais de uma vez.
+
+    É stateful: blocos consecutivos passados a process() produzem o mesmo
+    resultado que o sinal inteiro de uma vez.
+    """
+
+    def __init__(self, kind: str, cutoff: float, frame_rate: int, tolerance: float = IMPULSE_TOLERANCE):
+        rc = 1.0 / (cutoff * 2 * math.pi)
+        dt = 1.0 / frame_rate
+
+        if kind == 'low':
+            alpha = dt / (rc + dt)
+            self.pole = 1.0 - alpha
+            gain = alpha
+        elif kind == 'high':
+            alpha = rc / (rc + dt)
+            self.pole = alpha
+            gain = alpha
+        else:
+            raise ValueError(f"Tipo de filtro inválido: {kind}")
+
+        self.kind = kind
+        length = 1 if self.pole <= 0 else max(1, math.ceil(math.log(tolerance) / math.log(self.pole)))
+        self.taps = gain * self.pole ** np.arange(length)
+
+        self._fft_size = 1 << max(13, (4 * length - 1).bit_length())
+        self._block_size = self._fft_size - length + 1
+        self._spectrum = np.fft.rfft(self.taps, n=self._fft_size)
+        self.reset()
+
+    @property
+    def latency(self) -> int:
+        """Número de amostras de memória do filtro (tamanho da resposta ao impulso)"""
+        return len(self.taps)
+
+    def reset(self):
+        self._carry = None
+        self._first = None
+        self._last_input = None
+        self._position = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Filtra um bloco (frames, canais) de inteiros e retorna o mesmo dtype"""
+        if samples.ndim == 1:
+            samples = samples[:, np.newaxis]
+        if len(samples) == 0:
+            return samples.copy()
+
+        if self._carry is None:
+            self._carry = np.zeros((len(self.taps) - 1, samples.shape[1]))
+            self._first = samples[0].astype(np.float64)
+            self._last_input = self._first.copy()
+
+        x = samples.astype(np.float64)
+        if self.kind == 'low':
+            excitation = x
+        else:
+            excitation = np.diff(x, axis=0, prepend=self._last_input[np.newaxis, :])
+        self._last_input = x[-1].copy()
+
+        if self._position == 0:
+            # O primeiro frame é copiado como estado inicial (igual ao pydub)
+            excitation = excitation.copy()
+            excitation[0] = 0.0
+
+        output = np.empty_like(x)
+        for start in range(0, len(x), self._block_size):
+            output[start:start + self._block_size] = self._convolve_block(excitation[start:start + self._block_size])
+
+        self._add_initial_state(output)
+        self._position += len(x)
+
+        minval, maxval = _limits(samples.dtype)
+        return np.trunc(np.clip(output, minval, maxval)).astype(samples.dtype)
+
+    def _convolve_block(self, block: np.ndarray) -> np.ndarray:
+        n = len(block)
+        spectrum = np.fft.rfft(block, n=self._fft_size, axis=0)
+        full = np.fft.irfft(spectrum * self._spectrum[:, np.newaxis], n=self._fft_size, axis=0)
+        full = full[:n + len(self.taps) - 1]
+
+        carry_len = len(self._carry)
+        full[:carry_len] += self._carry
+        self._carry = full[n:n + carry_len].copy()
+        return full[:n]
+
+    def _add_initial_state(self, output: np.ndarray):
+        """Soma a contribuição decrescente do primeiro frame (pole^n * x[0])"""
+        remaining = len(self.taps) - self._position
+        if remaining <= 0:
+            return
+        count = min(remaining, len(output))
+        decay = self.pole ** np.arange(self._position, self._position + count)
+        output[:count] += decay[:, np.newaxis] * self._first[np.newaxis, :]
+
+
+def _limits(dtype):
+    info = np.iinfo(dtype)
+    return info.min, info.max
+
+
+def low_pass(samples: np.ndarray, frame_rate: int, cutoff: float) -> np.ndarray:
+    """Passa-baixa equivalente a pydub.effects.low_pass_filter"""
+    return FirstOrderFilter('low', cutoff, frame_rate).process(samples)
+
+
+def high_pass(samples: np.ndarray, frame_rate: int, cutoff: float) -> np.ndarray:
+    """Passa-alta equivalente a pydub.effects.high_pass_filter"""
+    return FirstOrderFilter('high', cutoff, frame_rate).process(samples)
+
+
+def band_pass(samples: np.ndarray, frame_rate: int, low_freq: float, high_freq: float) -> np.ndarray:
+    """Passa-baixa em high_freq seguido de passa-alta em low_freq"""
+    return high_pass(low_pass(samples, frame_rate, high_freq), frame_rate, low_freq)
+
+
+def apply_gain(samples: np.ndarray, gain_db: float) -> np.ndarray:
+    """Ganho em dB com saturação, equivalente a AudioSegment.apply_gain"""
+    factor = 10 ** (float(gain_db) / 20)
+    minval, maxval = _limits(samples.dtype)
+    return np.floor(np.clip(samples * factor, minval, maxval)).astype(samples.dtype)
+
+
+def dbfs(samples: np.ndarray) -> float:
+    """Nível RMS em dBFS, equivalente a AudioSegment.dBFS"""
+    if samples.size == 0:
+        return -float('inf')
+    values = samples.astype(np.float64).ravel()
+    rms = int(math.sqrt(np.dot(values, values) / values.size))
+    if not rms:
+        return -float('inf')
+    max_amplitude = float(2 ** (samples.dtype.itemsize * 8 - 1))
+    return 20 * math.log10(rms / max_amplitude)
+
+
+def normalize(samples: np.ndarray, target_dbfs: float = -20.0, max_change_db: float = 10.0) -> np.ndarray:
+    """Leva o RMS ao nível alvo, limitando o ajuste a +/- max_change_db"""
+    change_in_dbfs = target_dbfs - dbfs(samples)
+    change_in_dbfs = max(min(change_in_dbfs, max_change_db), -max_change_db)
+    return apply_gain(samples, change_in_dbfs)
+
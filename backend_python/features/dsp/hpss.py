@@ -0,0 +1,98 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+_EPS = 1e-10
+
+
+def _median_filter(values: np.ndarray, size: int, axis: int) -> np.ndarray:
+    """Mediana móvel centrada ao longo de um eixo (bordas completadas com zero)"""
+    half = size // 2
+    padding = [(0, 0)] * values.ndim
+    padding[axis] = (half, half)
+    windows = sliding_window_view(np.pad(values, padding), size, axis=axis)
+    return np.median(windows, axis=-1)
+
+
+class HPSSMasker:
+    """
+    Separação harmônico/percussiva por filtragem mediana do espectrograma
+    (Fitzgerald, 2010) com máscaras suaves (Wiener), mais uma máscara de vocais:
+    componente harmônica, centralizada no estéreo e dentro da faixa de voz.
+
+    Trabalha em trechos alinhados ao hop com `context` frames de sobra de cada
+    lado, então o resultado não depende de como o sinal é dividido em blocos.
+    """
+
+    STEMS = ('harmonic', 'percussive', 'vocals')
+
+    def __init__(self, frame_rate: int, n_fft: int = 2048, hop: int = 512, time_kernel: int = 17,
+                 freq_kernel: int = 17, power: float = 2.0, vocal_band=(200.0, 5000.0)):
+        if n_fft % hop:
+            raise ValueError(f"n_fft ({n_fft}) deve ser múltiplo do hop ({hop})")
+
+        self.n_fft = n_fft
+        self.hop = hop
+        self.time_kernel = time_kernel
+        self.freq_kernel = freq_kernel
+        self.power = power
+        # Hann periódica: com hop = n_fft/4 a soma das janelas² é constante
+        self.window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+        self.ola_gain = float(np.sum(self.window ** 2) / hop)
+
+        freqs = np.fft.rfftfreq(n_fft, 1.0 / frame_rate)
+        self.vocal_band = ((freqs >= vocal_band[0]) & (freqs <= vocal_band[1])).astype(np.float32)
+
+    @property
+    def context(self) -> int:
+        """Frames de áudio necessários antes e depois de cada trecho (janela + mediana temporal)"""
+        return self.n_fft + (self.time_kernel // 2 + 1) * self.hop
+
+    def _analyze(self, segment: np.ndarray) -> np.ndarray:
+        """STFT (quadros, canais, bins) de um trecho (frames, canais) em float32"""
+        frames = sliding_window_view(segment, self.n_fft, axis=0)[::self.hop]
+        return np.fft.rfft(frames * self.window, axis=-1).astype(np.complex64)
+
+    def _synthesize(self, spectrum: np.ndarray, length: int) -> np.ndarray:
+        """ISTFT por overlap-add vetorizado (um deslocamento por fração de hop da janela)"""
+        count, channels, _ = spectrum.shape
+        frames = (np.fft.irfft(spectrum, n=self.n_fft, axis=-1) * self.window).astype(np.float32)
+        output = np.zeros((max(length, (count - 1) * self.hop + self.n_fft), channels), dtype=np.float32)
+        for part in range(self.n_fft // self.hop):
+            piece = frames[:, :, part * self.hop:(part + 1) * self.hop]
+            offset = part * self.hop
+            output[offset:offset + count * self.hop] += piece.transpose(0, 2, 1).reshape(-1, channels)
+        return output[:length] / self.ola_gain
+
+    def _masks(self, spectrum: np.ndarray, stems) -> dict:
+        mid = spectrum.mean(axis=1)
+        magnitude = np.abs(mid)
+        harmonic = _median_filter(magnitude, self.time_kernel, axis=0) ** self.power
+        percussive = _median_filter(magnitude, self.freq_kernel, axis=1) ** self.power
+        total = harmonic + percussive + _EPS
+
+        masks = {}
+        if 'harmonic' in stems or 'vocals' in stems:
+            masks['harmonic'] = harmonic / total
+        if 'percussive' in stems:
+            masks['percussive'] = percussive / total
+        if 'vocals' in stems:
+            if spectrum.shape[1] > 1:
+                side = np.abs(spectrum[:, 0] - spectrum[:, 1]) / 2
+                centre = magnitude ** 2 / (magnitude ** 2 + side ** 2 + _EPS)
+            else:
+                centre = 1.0
+            masks['vocals'] = masks['harmonic'] * centre * self.vocal_band
+        return {stem: masks[stem] for stem in stems}
+
+    def separate_segment(self, segment: np.ndarray, length: int, stems=STEMS) -> dict:
+        """
+        Separa um trecho que começa `context` frames antes da parte útil, em posição
+        múltipla do hop. Retorna {stem: float32 (length, canais)} da parte útil.
+        """
+        spectrum = self._analyze(segment.astype(np.float32))
+        masks = self._masks(spectrum, stems)
+        context = self.context
+        return {
+            stem: self._synthesize(spectrum * mask[:, np.newaxis, :], context + length)[context:]
+            for stem, mask in masks.items()
+        }
@@ -0,0 +1,193 @@
+import math
+import os
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+from core.config import Config
+from core.logger import Logger
+from features.dsp.buffer import AudioBuffer
+from features.dsp.chain import DSPChain
+from features.dsp.silence import SilenceAnalyzer, _range_energies
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool de processos compartilhado, criado sob demanda e reaproveitado entre chamadas"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # fork: os workers só usam numpy e não reimportam o main.py (create_all, app FastAPI)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context('fork'))
+            _pool_workers = workers
+        return _pool
+
+
+class _SharedArray:
+    """Array numpy sobre um bloco de shared_memory; workers anexam pelo nome, sem cópia nem pickle"""
+
+    def __init__(self, shm: shared_memory.SharedMemory, shape, dtype):
+        self.shm = shm
+        self.array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        self.spec = (shm.name, tuple(shape), np.dtype(dtype).str)
+
+    @classmethod
+    def create(cls, shape, dtype):
+        size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        return cls(shared_memory.SharedMemory(create=True, size=size), shape, dtype)
+
+    @classmethod
+    def attach(cls, spec):
+        name, shape, dtype = spec
+        return cls(shared_memory.SharedMemory(name=name), shape, dtype)
+
+    def close(self, unlink: bool = False):
+        self.array = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _process_chunk(task):
+    """Worker: processa frames [start, end) lendo `warmup` frames antes para aquecer os filtros"""
+    source_spec, target_spec, steps, frame_rate, start, end, warmup = task
+    source = _SharedArray.attach(source_spec)
+    target = _SharedArray.attach(target_spec)
+    try:
+        begin = max(0, start - warmup)
+        for step in steps:
+            if not step.needs_analysis:
+                step.reset(frame_rate)
+
+        block = source.array[begin:end]
+        for step in steps:
+            block = step.process(block)
+        target.array[start:end] = block[start - begin:]
+        del block
+    finally:
+        source.close()
+        target.close()
+
+
+def _energy_chunk(task):
+    """Worker: energia por ms dos milissegundos [start_ms, end_ms)"""
+    source_spec, target_spec, bounds, start_ms, end_ms = task
+    source = _SharedArray.attach(source_spec)
+    target = _SharedArray.attach(target_spec)
+    try:
+        data = source.array[bounds[0]:bounds[-1]].astype(np.int64)
+        target.array[start_ms:end_ms] = _range_energies(data, bounds - bounds[0])
+        del data
+    finally:
+        source.close()
+        target.close()
+
+
+class SharedMemoryDSPExecutor:
+    """
+    Distribui trechos de um AudioBuffer entre processos via memória compartilhada.
+
+    O áudio é copiado uma vez para shared_memory; cada worker recebe apenas o nome
+    do bloco e o intervalo de frames, processa e escreve direto no buffer de saída.
+    Os filtros têm resposta ao impulso finita (FirstOrderFilter.latency), então
+    cada trecho começa `latency` frames antes e o resultado é o mesmo da execução
+    sequencial. Buffers curtos (ou DSP_WORKERS=1) rodam no processo atual.
+    """
+
+    def __init__(self, workers: int = None):
+        self.logger = Logger()
+        self.workers = workers or Config.DSP_WORKERS or os.cpu_count() or 1
+
+    def _should_parallelize(self, audio: AudioBuffer) -> bool:
+        return self.workers > 1 and audio.duration_ms >= Config.DSP_PARALLEL_MIN_DURATION
+
+    def _chunks(self, total: int, minimum: int):
+        """Divide [0, total) em ~2 trechos por worker para equilibrar a carga"""
+        size = max(minimum, math.ceil(total / (self.workers * 2)))
+        return [(start, min(start + size, total)) for start in range(0, total, size)]
+
+    def _share(self, samples: np.ndarray) -> _SharedArray:
+        shared = _SharedArray.create(samples.shape, samples.dtype)
+        shared.array[:] = samples
+        return shared
+
+    def _map(self, function, tasks):
+        # list() propaga a primeira exceção de qualquer worker
+        return list(_get_pool(self.workers).map(function, tasks))
+
+    def _run_steps(self, steps: list, source: _SharedArray, frame_rate: int) -> _SharedArray:
+        """Executa etapas já analisadas sobre o buffer compartilhado, em paralelo"""
+        target = _SharedArray.create(source.array.shape, source.array.dtype)
+        try:
+            warmup = sum(step.latency(frame_rate) for step in steps)
+            tasks = [
+                (source.spec, target.spec, steps, frame_rate, start, end, warmup)
+                for start, end in self._chunks(len(source.array), max(warmup, frame_rate))
+            ]
+            self._map(_process_chunk, tasks)
+            return target
+        except Exception:
+            target.close(unlink=True)
+            raise
+
+    def run_chain(self, chain: DSPChain, audio: AudioBuffer) -> AudioBuffer:
+        """Equivalente a chain.run(audio), distribuído entre os workers quando compensa"""
+        if not self._should_parallelize(audio):
+            return chain.run(audio)
+
+        self.logger.info(f"⚙️ DSP '{chain.name}' em {self.workers} processos: {audio.name}")
+        chain.reset(audio.frame_rate)
+        source = self._share(audio.samples)
+        try:
+            # Etapas de análise (ex.: Normalize) observam a saída das etapas anteriores
+            for index, step in enumerate(chain.steps):
+                if not step.needs_analysis:
+                    continue
+                if index == 0:
+                    step.observe(source.array)
+                    continue
+                partial = self._run_steps(chain.steps[:index], source, audio.frame_rate)
+                try:
+                    step.observe(partial.array)
+                finally:
+                    partial.close(unlink=True)
+
+            target = self._run_steps(chain.steps, source, audio.frame_rate)
+            try:
+                samples = target.array.copy()
+            finally:
+                target.close(unlink=True)
+        finally:
+            source.close(unlink=True)
+
+        return audio.with_samples(samples, f"_{chain.name}")
+
+    def analyze_silence(self, audio: AudioBuffer) -> SilenceAnalyzer:
+        """SilenceAnalyzer do buffer, com a energia por ms calculada em paralelo quando compensa"""
+        analyzer = SilenceAnalyzer(audio.frame_rate, audio.channels, audio.sample_width)
+        if not self._should_parallelize(audio):
+            analyzer.feed(audio.samples)
+            return analyzer
+
+        total_frames = len(audio.samples)
+        duration_ms = round(1000 * total_frames / audio.frame_rate)
+        source = self._share(audio.samples)
+        target = _SharedArray.create((duration_ms,), np.int64)
+        try:
+            tasks = [
+                (source.spec, target.spec, analyzer.ms_bounds(start_ms, end_ms, total_frames), start_ms, end_ms)
+                for start_ms, end_ms in self._chunks(duration_ms, 1000)
+            ]
+            self._map(_energy_chunk, tasks)
+            energy = target.array.copy()
+        finally:
+            source.close(unlink=True)
+            target.close(unlink=True)
+
+        return SilenceAnalyzer.from_energies(energy, audio.frame_rate, audio.channels,
+                                             audio.sample_width, total_frames)
@@ -0,0 +1,15 @@
+import math
+import numpy as np
+
+
+def resample_linear(values: np.ndarray, source_rate: int, target_rate: int, axis: int = -1) -> np.ndarray:
+    """Reamostragem por interpolação linear ao longo de um eixo (float32)"""
+    if source_rate == target_rate:
+        return values
+
+    moved = np.moveaxis(values, axis, -1)
+    length = moved.shape[-1]
+    positions = np.arange(math.ceil(length * target_rate / source_rate)) * source_rate / target_rate
+    flat = moved.reshape(-1, length)
+    resampled = np.stack([np.interp(positions, np.arange(length), row) for row in flat])
+    return np.moveaxis(resampled.reshape(*moved.shape[:-1], len(positions)).astype(np.float32), -1, axis)
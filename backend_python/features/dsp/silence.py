@@ -0,0 +1,156 @@
+import numpy as np
+
+
+class SilenceAnalyzer:
+    """
+    Detecção de silêncio vetorizada e incremental, equivalente a pydub.silence
+    com seek_step=1: energia por milissegundo + somas de janela via prefixos.
+
+    Os blocos podem ser alimentados em qualquer tamanho com feed(); só a energia
+    por ms fica em memória (8 bytes/ms), não o áudio.
+    """
+
+    def __init__(self, frame_rate: int, channels: int, sample_width: int):
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.max_amplitude = float(2 ** (sample_width * 8 - 1))
+        self._energies = []
+        self._pending = np.zeros((0, channels), dtype=np.int64)
+        self._pending_start = 0  # frame global do início de _pending
+        self._next_ms = 0
+        self._total_frames = 0
+        self._finished = None
+
+    @classmethod
+    def from_energies(cls, energy: np.ndarray, frame_rate: int, channels: int, sample_width: int, total_frames: int):
+        """Analisador a partir da energia por ms já calculada (ex.: por SharedMemoryDSPExecutor)"""
+        analyzer = cls(frame_rate, channels, sample_width)
+        analyzer._total_frames = total_frames
+        analyzer._finished = (np.concatenate([[0], np.cumsum(energy)]), round(1000 * total_frames / frame_rate))
+        return analyzer
+
+    def ms_bounds(self, start_ms: int, end_ms: int, total_frames: int) -> np.ndarray:
+        """Fronteiras de frames dos ms [start_ms, end_ms], limitadas ao fim do áudio"""
+        return np.minimum(self._boundary(np.arange(start_ms, end_ms + 1)), total_frames)
+
+    def _boundary(self, ms):
+        """Frame inicial do milissegundo ms (mesma conversão do pydub)"""
+        return (np.asarray(ms, dtype=np.int64) * self.frame_rate) // 1000
+
+    def feed(self, samples: np.ndarray):
+        """Acumula a energia por ms de um bloco (frames, canais)"""
+        if samples.ndim == 1:
+            samples = samples[:, np.newaxis]
+        self._total_frames += len(samples)
+
+        data = np.concatenate([self._pending, samples.astype(np.int64)]) if len(self._pending) else samples.astype(np.int64)
+        end_frame = self._pending_start + len(data)
+
+        # Milissegundos completos disponíveis: [next_ms, last_ms)
+        last_ms = int((end_frame * 1000) // self.frame_rate)
+        if last_ms > self._next_ms:
+            bounds = self._boundary(np.arange(self._next_ms, last_ms + 1)) - self._pending_start
+            self._energies.append(_range_energies(data, bounds))
+            data = data[bounds[-1]:]
+            self._pending_start += int(bounds[-1])
+            self._next_ms = last_ms
+
+        self._pending = data
+        self._finished = None
+
+    def _finish(self):
+        if self._finished is not None:
+            return self._finished
+
+        energies = list(self._energies)
+        duration_ms = round(1000 * self._total_frames / self.frame_rate)
+
+        # Último(s) ms parcial(is): o pydub corta o slice no fim do áudio
+        tail_ms = np.arange(self._next_ms, max(self._next_ms, duration_ms))
+        if len(tail_ms):
+            bounds = np.minimum(self._boundary(np.append(tail_ms, tail_ms[-1] + 1)), self._total_frames) - self._pending_start
+            energies.append(_range_energies(self._pending, bounds))
+
+        energy = np.concatenate(energies) if energies else np.zeros(0, np.int64)
+        prefix = np.concatenate([[0], np.cumsum(energy)])
+        self._finished = (prefix, duration_ms)
+        return self._finished
+
+    @property
+    def duration_ms(self) -> int:
+        return self._finish()[1]
+
+    def envelope(self, window_ms: int = 100) -> np.ndarray:
+        """Energia (soma dos quadrados) por janela de window_ms; a janela parcial do fim é descartada"""
+        prefix, _ = self._finish()
+        edges = np.arange(0, len(prefix), window_ms)
+        return (prefix[edges[1:]] - prefix[edges[:-1]]).astype(np.float64)
+
+    def detect_silence(self, min_silence_len: int = 1000, silence_thresh: float = -16):
+        """Lista de [início, fim] em ms dos trechos silenciosos (como pydub.silence.detect_silence)"""
+        prefix, seg_len = self._finish()
+        if seg_len < min_silence_len:
+            return []
+
+        thresh = (10 ** (silence_thresh / 20)) * self.max_amplitude
+        starts = np.arange(0, seg_len - min_silence_len + 1)
+        ends = starts + min_silence_len
+
+        frame_start = self._boundary(starts)
+        frame_end = np.minimum(self._boundary(ends), self._total_frames)
+        counts = (frame_end - frame_start) * self.channels
+        sums = prefix[np.minimum(ends, len(prefix) - 1)] - prefix[starts]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rms = np.floor(np.sqrt(np.where(counts > 0, sums / np.maximum(counts, 1), 0)))
+        silence_starts = starts[rms <= thresh]
+
+        if not len(silence_starts):
+            return []
+
+        # Junta janelas contíguas/sobrepostas em faixas, como o pydub
+        breaks = np.nonzero(np.diff(silence_starts) > min_silence_len)[0]
+        range_starts = np.concatenate([[silence_starts[0]], silence_starts[breaks + 1]])
+        range_ends = np.concatenate([silence_starts[breaks], [silence_starts[-1]]]) + min_silence_len
+        return [[int(s), int(e)] for s, e in zip(range_starts, range_ends)]
+
+    def detect_nonsilent(self, min_silence_len: int = 1000, silence_thresh: float = -16):
+        """Lista de [início, fim] em ms dos trechos com som"""
+        silent_ranges = self.detect_silence(min_silence_len, silence_thresh)
+        len_seg = self.duration_ms
+
+        if not silent_ranges:
+            return [[0, len_seg]]
+        if silent_ranges[0][0] == 0 and silent_ranges[0][1] == len_seg:
+            return []
+
+        prev_end_i = 0
+        nonsilent_ranges = []
+        for start_i, end_i in silent_ranges:
+            nonsilent_ranges.append([prev_end_i, start_i])
+            prev_end_i = end_i
+        if end_i != len_seg:
+            nonsilent_ranges.append([prev_end_i, len_seg])
+        if nonsilent_ranges[0] == [0, 0]:
+            nonsilent_ranges.pop(0)
+        return nonsilent_ranges
+
+    def split_ranges(self, min_silence_len: int = 1000, silence_thresh: float = -16, keep_silence: int = 100):
+        """Faixas [início, fim] em ms que pydub.silence.split_on_silence retornaria"""
+        output_ranges = [
+            [start - keep_silence, end + keep_silence]
+            for start, end in self.detect_nonsilent(min_silence_len, silence_thresh)
+        ]
+        for range_i, range_ii in zip(output_ranges, output_ranges[1:]):
+            if range_ii[0] < range_i[1]:
+                range_i[1] = (range_i[1] + range_ii[0]) // 2
+                range_ii[0] = range_i[1]
+
+        len_seg = self.duration_ms
+        return [[max(start, 0), min(end, len_seg)] for start, end in output_ranges]
+
+
+def _range_energies(data: np.ndarray, bounds: np.ndarray) -> np.ndarray:
+    """Soma dos quadrados (todos os canais) entre fronteiras consecutivas de frames"""
+    squares = np.einsum('ij,ij->i', data[:bounds[-1]], data[:bounds[-1]])
+    prefix = np.concatenate([[0], np.cumsum(squares)])
+    return prefix[bounds[1:]] - prefix[bounds[:-1]]
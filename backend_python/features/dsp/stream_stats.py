@@ -0,0 +1,64 @@
+import math
+from collections import namedtuple
+import numpy as np
+
+StreamStats = namedtuple('StreamStats', ['duration_ms', 'loudness_db', 'peak_db', 'channel_correlation'])
+
+_FLOOR_DB = -120.0
+
+
+def _to_db(value: float) -> float:
+    return 20 * math.log10(value) if value > 0 else _FLOOR_DB
+
+
+class StreamStatsAccumulator:
+    """
+    Estatísticas baratas de um stream, acumuladas bloco a bloco junto com a
+    análise de silêncio: nível RMS (dBFS), pico e correlação entre os dois
+    primeiros canais (1.0 = mono/centro, ~0 = estéreo largo).
+    """
+
+    def __init__(self, frame_rate: int, channels: int, sample_width: int):
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.max_amplitude = float(2 ** (sample_width * 8 - 1))
+        self._frames = 0
+        self._sum_squares = 0.0
+        self._peak = 0.0
+        # Somas para a correlação de Pearson entre os canais 0 e 1
+        self._sums = np.zeros(5)
+
+    def feed(self, samples: np.ndarray):
+        if samples.ndim == 1:
+            samples = samples[:, np.newaxis]
+        if not len(samples):
+            return
+        values = samples.astype(np.float64)
+        self._frames += len(values)
+        self._sum_squares += float(np.einsum('ij,ij->', values, values))
+        self._peak = max(self._peak, float(np.abs(values).max()))
+        if values.shape[1] >= 2:
+            left, right = values[:, 0], values[:, 1]
+            self._sums += (left.sum(), right.sum(), left @ left, right @ right, left @ right)
+
+    def result(self) -> StreamStats:
+        duration_ms = round(1000 * self._frames / self.frame_rate) if self.frame_rate else 0
+        if not self._frames:
+            return StreamStats(0, _FLOOR_DB, _FLOOR_DB, 1.0)
+
+        rms = math.sqrt(self._sum_squares / (self._frames * self.channels))
+        correlation = 1.0
+        if self.channels >= 2:
+            n = self._frames
+            sum_l, sum_r, sum_ll, sum_rr, sum_lr = self._sums
+            var_l = sum_ll - sum_l * sum_l / n
+            var_r = sum_rr - sum_r * sum_r / n
+            if var_l > 0 and var_r > 0:
+                correlation = float((sum_lr - sum_l * sum_r / n) / math.sqrt(var_l * var_r))
+
+        return StreamStats(
+            duration_ms,
+            round(_to_db(rms / self.max_amplitude), 2),
+            round(_to_db(self._peak / self.max_amplitude), 2),
+            round(correlation, 4)
+        )
@@ -0,0 +1,67 @@
+from pathlib import Path
+from core.config import Config
+from features.dsp.buffer import AudioBuffer
+from features.dsp.chain import DSPChain
+from utils.wav_io import read_wav_info, iter_frames, WavWriter
+
+
+class StreamingDSPRunner:
+    """
+    Executa uma DSPChain sobre um WAV em blocos de tamanho fixo lidos do disco.
+
+    Os filtros guardam estado entre blocos (overlap-add), então o resultado é o
+    mesmo da execução em memória; o pico de memória depende só do tamanho do
+    bloco, não da duração do programa.
+    """
+
+    def __init__(self, chain: DSPChain, block_frames: int = None):
+        self.chain = chain
+        self.block_frames = block_frames or Config.DSP_BLOCK_FRAMES
+
+    def _blocks(self, audio_path: Path, info):
+        for frames in iter_frames(audio_path, info, self.block_frames):
+            yield AudioBuffer.from_frames(frames, info.channels, info.sample_width, info.frame_rate).samples
+
+    def _analyze(self, audio_path: Path, info):
+        """Passadas prévias para etapas que precisam de estatísticas globais (ex.: Normalize)"""
+        steps = self.chain.steps
+        for index, step in enumerate(steps):
+            if not step.needs_analysis:
+                continue
+
+            for previous in steps[:index]:
+                if not previous.needs_analysis:
+                    previous.reset(info.frame_rate)
+
+            for block in self._blocks(audio_path, info):
+                for previous in steps[:index]:
+                    block = previous.process(block)
+                step.observe(block)
+
+        for step in steps:
+            if not step.needs_analysis:
+                step.reset(info.frame_rate)
+
+    def run(self, audio_path: Path):
+        """Gera os blocos processados em ordem, à medida que ficam prontos"""
+        info = read_wav_info(audio_path)
+        self.chain.reset(info.frame_rate)
+        self._analyze(audio_path, info)
+
+        for block in self._blocks(audio_path, info):
+            for step in self.chain.steps:
+                block = step.process(block)
+            yield block
+
+    def run_to_file(self, audio_path: Path, output_path: Path, observers=()) -> Path:
+        """
+        Processa o WAV inteiro gravando a saída incrementalmente.
+        Cada observer recebe os blocos de saída (ex.: SilenceAnalyzer.feed).
+        """
+        info = read_wav_info(audio_path)
+        with WavWriter(output_path, info.channels, info.sample_width, info.frame_rate) as writer:
+            for block in self.run(audio_path):
+                writer.write(block.tobytes())
+                for observer in observers:
+                    observer(block)
+        return output_path
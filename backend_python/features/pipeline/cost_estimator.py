@@ -0,0 +1,172 @@
+import time
+from pathlib import Path
+from core.cancellation import run_command
+from core.config import Config
+from core.file_processor import MXFProcessor
+from core.logger import Logger
+from core.throughput_store import ThroughputStore, STAGE_UNITS
+from features.dsp.buffer import AudioBuffer
+from features.dsp.correlation import fingerprint, group_duplicates, FINGERPRINT_WINDOW_MS
+from features.dsp.silence import SilenceAnalyzer
+from features.dsp.stream_stats import StreamStatsAccumulator
+from features.workflows.planner import WorkflowPlanner, SKIP, DUPLICATE
+
+# Amostras de 16 bits na varredura rápida
+_SCAN_SAMPLE_WIDTH = 2
+
+
+class CostEstimator:
+    """
+    Estimativa prévia de tempo e de chamadas ao Shazam para um lote de MXFs,
+    sem extrair nem reconhecer nada.
+
+    Por arquivo: probe (streams e duração), uma varredura rápida de cada stream
+    de áudio decodificado em baixa taxa (ESTIMATOR_SCAN_RATE) para silêncio,
+    segmentos, nível e duplicatas, e o mesmo WorkflowPlanner do pipeline para
+    a estratégia e as chamadas de cada stream. O tempo de cada etapa vem da
+    vazão histórica dos nossos jobs (ThroughputStore), ou de
+    ESTIMATOR_DEFAULT_RATES enquanto não há histórico.
+
+    No lote, o tempo de parede considera as etapas sobrepostas do pipeline: a
+    etapa mais carregada (soma dos tempos / PIPELINE_STAGE_WORKERS) limita o
+    lote, e nenhum lote termina antes do seu arquivo mais demorado.
+    """
+
+    def __init__(self, throughput: ThroughputStore = None):
+        self.config = Config()
+        self.logger = Logger()
+        self.processor = MXFProcessor()
+        self.throughput = throughput or ThroughputStore()
+        self.planner = WorkflowPlanner()
+
+    @staticmethod
+    def expand(paths) -> list:
+        """Arquivos .mxf dos caminhos (diretórios são varridos recursivamente), sem repetição"""
+        files = []
+        for path in map(Path, paths):
+            candidates = sorted(path.rglob('*')) if path.is_dir() else [path]
+            files.extend(p for p in candidates if p.is_file() and p.suffix.lower() == '.mxf')
+        return list(dict.fromkeys(files))
+
+    def _scan_stream(self, mxf_path: Path, stream: dict):
+        """Decodifica o stream em baixa taxa e devolve (segmentos, StreamStats, fingerprint, proporção de silêncio)"""
+        from features.processors.music_recognizer import MusicRecognizer
+
+        rate = self.config.ESTIMATOR_SCAN_RATE
+        channels = min(2, int(stream.get('channels') or 1))
+        cmd = [
+            self.config.FFMPEG_PATH, '-v', 'error',
+            '-i', str(mxf_path),
+            '-map', f"0:{stream['index']}",
+            '-ac', str(channels), '-ar', str(rate),
+            '-f', 's16le', '-acodec', 'pcm_s16le', '-'
+        ]
+        result = run_command(cmd, self.config.ESTIMATOR_SCAN_TIMEOUT, text=False)
+        if result.returncode != 0:
+            raise Exception(f"Erro ao varrer stream {stream['index']}: {result.stderr.decode(errors='replace')}")
+
+        analyzer = SilenceAnalyzer(rate, channels, _SCAN_SAMPLE_WIDTH)
+        stats = StreamStatsAccumulator(rate, channels, _SCAN_SAMPLE_WIDTH)
+        block_bytes = self.config.DSP_BLOCK_FRAMES * channels * _SCAN_SAMPLE_WIDTH
+        data = memoryview(result.stdout)
+        for offset in range(0, len(data) - len(data) % (channels * _SCAN_SAMPLE_WIDTH), block_bytes):
+            samples = AudioBuffer.from_frames(bytes(data[offset:offset + block_bytes]), channels,
+                                              _SCAN_SAMPLE_WIDTH, rate).samples
+            analyzer.feed(samples)
+            stats.feed(samples)
+
+        duration_ms = analyzer.duration_ms
+        sound_ms = sum(end - start for start, end in
+                       analyzer.detect_nonsilent(self.config.MIN_SILENCE_LEN, self.config.SILENCE_THRESHOLD))
+        silence_ratio = round(1 - sound_ms / duration_ms, 3) if duration_ms else 1.0
+        ranges = MusicRecognizer().valid_ranges(analyzer)
+        return ranges, stats.result(), fingerprint(analyzer.envelope(FINGERPRINT_WINDOW_MS)), silence_ratio
+
+    def estimate_file(self, mxf_path: Path, rates: dict = None) -> dict:
+        """Previsão de um MXF: estratégia e chamadas por stream, segundos por etapa e total"""
+        rates = rates or self.throughput.rates()
+        mxf_path = Path(mxf_path)
+        started = time.monotonic()
+
+        streams = self.processor.get_streams(mxf_path)
+        audio_streams = [s for s in streams if s.get('codec_type') == 'audio']
+        if not audio_streams:
+            raise ValueError(f"Nenhum stream de áudio encontrado em {mxf_path.name}")
+
+        files, stats, segment_ranges, fingerprints, silence = [], {}, {}, {}, {}
+        for stream in audio_streams:
+            key = f"{mxf_path.name}#{stream['index']}"
+            segment_ranges[key], stream_stats, fingerprints[key], silence[key] = self._scan_stream(mxf_path, stream)
+            stats[key] = list(stream_stats)
+            files.append({'path': key, 'stream_index': stream['index']})
+
+        duplicates = group_duplicates(fingerprints, self.config.DEDUP_CORRELATION_THRESHOLD) \
+            if self.config.DEDUP_ENABLED else {}
+        plan = self.planner.plan(streams, files, stats, segment_ranges, duplicates)
+
+        units = {
+            'job': 1,
+            'audio_seconds': sum(values[0] for values in stats.values()) / 1000,
+            'planned_seconds': plan.predicted_seconds,
+        }
+        stages = {stage: round(rates[stage]['rate'] * units[unit], 1) for stage, unit in STAGE_UNITS.items()}
+        sound_ms = sum(values[0] * (1 - silence[key]) for key, values in stats.items())
+
+        return {
+            'file': str(mxf_path),
+            'duration_seconds': self.processor.get_duration(mxf_path),
+            'audio_streams': len(audio_streams),
+            'audio_seconds': round(units['audio_seconds'], 1),
+            'silence_ratio': round(1 - sound_ms / (units['audio_seconds'] * 1000), 3) if units['audio_seconds'] else 1.0,
+            'streams': [
+                {
+                    'stream_index': stream_plan.stream_index,
+                    'strategy': stream_plan.strategy,
+                    'api_calls': stream_plan.api_calls,
+                    'segments': len(segment_ranges[stream_plan.path]),
+                    'silence_ratio': silence[stream_plan.path],
+                    'reason': stream_plan.reason,
+                }
+                for stream_plan in plan.streams
+            ],
+            'recognized_streams': len(plan.active),
+            'skipped_streams': sum(1 for p in plan.streams if p.strategy in (SKIP, DUPLICATE)),
+            'api_calls': plan.api_calls,
+            'stages': stages,
+            'predicted_seconds': round(sum(stages.values()), 1),
+            'scan_seconds': round(time.monotonic() - started, 1),
+        }
+
+    def estimate(self, paths) -> dict:
+        """
+        Previsão do lote: por arquivo (estimate_file ou o erro) e totais
+        (chamadas, tempo somado e tempo de parede com as etapas em paralelo).
+        """
+        rates = self.throughput.rates()
+        files = []
+        for mxf_path in self.expand(paths):
+            try:
+                files.append(self.estimate_file(mxf_path, rates))
+            except Exception as e:
+                self.logger.error(f"❌ Estimativa falhou para {mxf_path.name}: {e}")
+                files.append({'file': str(mxf_path), 'error': str(e)})
+
+        estimated = [f for f in files if 'error' not in f]
+        stage_totals = {stage: round(sum(f['stages'][stage] for f in estimated), 1) for stage in STAGE_UNITS}
+        workers = self.config.PIPELINE_STAGE_WORKERS
+        bottleneck = max((total / max(1, workers.get(stage, 1)) for stage, total in stage_totals.items()), default=0.0)
+        wall_seconds = max([bottleneck] + [f['predicted_seconds'] for f in estimated])
+
+        batch = {
+            'files': len(files),
+            'estimated_files': len(estimated),
+            'failed_files': len(files) - len(estimated),
+            'audio_seconds': round(sum(f['audio_seconds'] for f in estimated), 1),
+            'api_calls': sum(f['api_calls'] for f in estimated),
+            'stages': stage_totals,
+            'serial_seconds': round(sum(f['predicted_seconds'] for f in estimated), 1),
+            'wall_seconds': round(wall_seconds, 1),
+        }
+        self.logger.info(f"📐 Estimativa: {batch['estimated_files']} arquivos, ~{batch['wall_seconds']}s de parede,"
+                         f" {batch['api_calls']} chamadas ao Shazam")
+        return {'rates': rates, 'files': files, 'batch': batch}
@@ -0,0 +1,188 @@
+import asyncio
+import contextvars
+import inspect
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from core.cancellation import CancelToken, DeadlineExceeded, JobCancelled, use_token, with_deadline
+from core.logger import Logger
+
+
+class Stage:
+    """
+    Etapa do pipeline: uma função aplicada a cada item, com N workers.
+
+    kind:
+      - 'io': coroutine (ou função rápida) executada no event loop (Shazam, HTTP)
+      - 'thread': função bloqueante em thread (ffprobe/ffmpeg, banco, disco)
+      - 'cpu': função em processo separado; precisa ser picklable (função de módulo)
+
+    timeout: prazo da etapa por item (s). No prazo o job do item é cancelado:
+    processos filhos morrem e o item segue com DeadlineExceeded.
+    """
+
+    IO = 'io'
+    THREAD = 'thread'
+    CPU = 'cpu'
+
+    def __init__(self, name: str, func, kind: str = IO, workers: int = 1, timeout: float = None):
+        if kind not in (self.IO, self.THREAD, self.CPU):
+            raise ValueError(f"Tipo de etapa inválido: {kind}")
+        self.name = name
+        self.func = func
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.timeout = timeout or None
+
+
+class PipelineItem:
+    """Envelope de um item: valor atual, erro (se alguma etapa falhou), tempos por etapa e o CancelToken do job"""
+
+    def __init__(self, key, value, token: CancelToken = None):
+        self.key = key
+        self.value = value
+        self.token = token or CancelToken(key)
+        self.error = None
+        self.failed_stage = None
+        self.timings = {}
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class PipelineEngine:
+    """
+    Executa itens por uma sequência de etapas ligadas por filas limitadas.
+
+    Cada etapa tem seus próprios workers, então arquivos diferentes ocupam etapas
+    diferentes ao mesmo tempo (um extrai enquanto outro vai ao Shazam). As filas
+    têm tamanho máximo: quando uma etapa atrasa, as anteriores esperam
+    (backpressure) e a memória fica limitada a ~queue_size itens por etapa.
+    Falhas ficam no item (error/failed_stage) e ele pula as etapas seguintes.
+    """
+
+    def __init__(self, stages: list, queue_size: int = 2, job_timeout: float = None):
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.job_timeout = job_timeout or None
+        self.logger = Logger()
+
+    async def _call(self, stage: Stage, value, pools: dict):
+        if stage.kind == Stage.IO:
+            result = stage.func(value)
+            return await result if inspect.isawaitable(result) else result
+
+        loop = asyncio.get_running_loop()
+        if stage.kind == Stage.THREAD:
+            # A thread herda o CancelToken do item (ffmpeg registrado para ser morto no cancelamento)
+            return await loop.run_in_executor(pools[stage.kind], contextvars.copy_context().run, stage.func, value)
+        return await loop.run_in_executor(pools[stage.kind], stage.func, value)
+
+    def _make_pools(self):
+        pools = {}
+        thread_workers = sum(s.workers for s in self.stages if s.kind == Stage.THREAD)
+        cpu_workers = sum(s.workers for s in self.stages if s.kind == Stage.CPU)
+        if thread_workers:
+            pools[Stage.THREAD] = ThreadPoolExecutor(max_workers=thread_workers, thread_name_prefix="pipeline")
+        if cpu_workers:
+            # fork: não reimporta o main.py nos workers
+            pools[Stage.CPU] = ProcessPoolExecutor(max_workers=cpu_workers, mp_context=get_context('fork'))
+        return pools
+
+    @staticmethod
+    async def _iterate(inputs):
+        """Aceita iteráveis comuns e assíncronos (ex.: fluxo infinito do modo watch)"""
+        if hasattr(inputs, '__aiter__'):
+            async for entry in inputs:
+                yield entry
+        else:
+            for entry in inputs:
+                yield entry
+
+    async def run(self, inputs, on_result=None, max_in_flight: int = None) -> list:
+        """
+        Processa (chave, valor) de `inputs` (iterável ou iterável assíncrono).
+        on_result(item) é chamado (e aguardado, se coroutine) um item por vez, na ordem de saída;
+        sem on_result, os PipelineItem são devolvidos na ordem de conclusão. Com on_result ou
+        entrada assíncrona (fluxo possivelmente infinito) nada é acumulado e a lista volta vazia.
+        max_in_flight limita quantos itens estão entre a entrada e o fim do on_result.
+        """
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        pools = self._make_pools()
+        in_flight = asyncio.Semaphore(max_in_flight) if max_in_flight and max_in_flight > 0 else None
+        finished = []
+        keep_finished = on_result is None and not hasattr(inputs, '__aiter__')
+
+        async def feed():
+            # A vaga é reservada antes de pedir a próxima entrada: uma fonte que
+            # escalona (prioridade, menor primeiro) decide só quando há capacidade
+            entries = self._iterate(inputs).__aiter__()
+            while True:
+                if in_flight is not None:
+                    await in_flight.acquire()
+                try:
+                    key, value = await entries.__anext__()
+                except StopAsyncIteration:
+                    break
+                await queues[0].put(PipelineItem(key, value, CancelToken(key, self.job_timeout)))
+            for _ in range(self.stages[0].workers):
+                await queues[0].put(None)
+
+        async def work(index: int, stage: Stage):
+            while True:
+                item = await queues[index].get()
+                if item is None:
+                    return
+                if item.ok:
+                    started = time.monotonic()
+                    try:
+                        try:
+                            item.token.check()
+                        except JobCancelled:
+                            # Prazo do job esgotado enquanto o item esperava na fila: como em with_deadline
+                            if item.token.timed_out:
+                                raise DeadlineExceeded(item.token.reason) from None
+                            raise
+                        with use_token(item.token):
+                            item.value = await with_deadline(self._call(stage, item.value, pools),
+                                                             stage.name, stage.timeout, item.token)
+                    except (Exception, JobCancelled) as e:
+                        item.error = e
+                        item.failed_stage = stage.name
+                        self.logger.error(f"❌ Etapa '{stage.name}' falhou para {item.key}: {e}")
+                    item.timings[stage.name] = time.monotonic() - started
+                await queues[index + 1].put(item)
+
+        async def run_stage(index: int, stage: Stage):
+            await asyncio.gather(*(work(index, stage) for _ in range(stage.workers)))
+            # Fecha a próxima etapa só depois que todos os workers desta terminaram
+            next_workers = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+            for _ in range(next_workers):
+                await queues[index + 1].put(None)
+
+        async def collect():
+            while True:
+                item = await queues[-1].get()
+                if item is None:
+                    return
+                try:
+                    if on_result is not None:
+                        result = on_result(item)
+                        if inspect.isawaitable(result):
+                            await result
+                except (Exception, JobCancelled) as e:
+                    # Um item cancelado não derruba o lote (nem o modo residente)
+                    self.logger.error(f"❌ Erro finalizando {item.key}: {e}")
+                finally:
+                    if in_flight is not None:
+                        in_flight.release()
+                if keep_finished:
+                    finished.append(item)
+
+        try:
+            await asyncio.gather(feed(), collect(), *(run_stage(i, s) for i, s in enumerate(self.stages)))
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True)
+        return finished
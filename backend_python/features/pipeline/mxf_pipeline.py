@@ -0,0 +1,266 @@
+import asyncio
+import inspect
+import shutil
+import time
+from pathlib import Path
+from core.cancellation import CancelToken, JobCancelled, DeadlineExceeded, use_token, with_deadline
+from core.config import Config
+from core.logger import Logger
+from core.checkpoint_store import CheckpointStore
+from core.throughput_store import ThroughputStore
+from core.file_processor import MXFProcessor
+from features.pipeline.engine import PipelineEngine, Stage
+from features.processors.audio_extractor import AudioExtractor
+from features.dsp.correlation import group_duplicates
+from features.workflows.base_workflow import BaseWorkflow
+from features.workflows.planner import ExecutionPlan, WorkflowPlanner, SKIP, DUPLICATE
+from features.workflows.unmixed_audio import UnmixedAudioWorkflow
+from features.workflows.mixed_audio import MixedAudioWorkflow
+
+
+def analyze_segments(job: dict) -> dict:
+    """
+    Etapa de CPU (roda no pool de processos): uma leitura de cada áudio extraído
+    para fronteiras de silêncio e estatísticas, seguida do plano de execução.
+    Recebe e devolve só dados simples.
+    """
+    from features.processors.music_recognizer import MusicRecognizer
+
+    checkpoint = CheckpointStore().job(job['checkpoint_key']) if job.get('checkpoint_key') else None
+    saved = checkpoint.get('analyze') if checkpoint else None
+    if saved is not None and 'plan' in saved:
+        job['segment_ranges'] = {path: [tuple(r) for r in ranges] for path, ranges in saved['segment_ranges'].items()}
+        job['stream_stats'] = saved['stream_stats']
+        job['plan'] = saved['plan']
+        return job
+
+    recognizer = MusicRecognizer()
+    job['segment_ranges'], job['stream_stats'] = {}, {}
+    fingerprints = {}
+    for file_info in job['extracted_files']:
+        key = str(file_info['path'])
+        job['segment_ranges'][key], stats, fingerprints[key] = recognizer.analyze_stream(Path(file_info['path']))
+        job['stream_stats'][key] = list(stats)
+
+    config = Config()
+    duplicates = group_duplicates(fingerprints, config.DEDUP_CORRELATION_THRESHOLD) if config.DEDUP_ENABLED else {}
+    plan = WorkflowPlanner(job.get('workflow_strategies')).plan(
+        job['streams'], job['extracted_files'], job['stream_stats'], job['segment_ranges'], duplicates
+    )
+    job['plan'] = plan.to_dict()
+    if checkpoint:
+        checkpoint.put('analyze', {key: job[key] for key in ('segment_ranges', 'stream_stats', 'plan')})
+    return job
+
+
+class MXFPipeline:
+    """
+    Pipeline por etapas para muitos MXFs ao mesmo tempo:
+    probe (thread) → extract (thread) → analyze + plano (processo) → recognize (asyncio).
+
+    O WorkflowPlanner escolhe a estratégia de cada stream (direct, enhanced,
+    separated ou skip) e o workflow que a executa. Tracks com a mesma mixagem
+    (DEDUP_ENABLED) são reconhecidas uma vez e os resultados copiados para as demais.
+    A persistência/EDL fica no on_result do chamador, executado um arquivo por vez.
+    Workers por etapa vêm de PIPELINE_STAGE_WORKERS (ex.: "probe=2,recognize=8").
+    prepare (opcional) é uma etapa em thread antes do probe, ex.: download do SharePoint.
+
+    Com CHECKPOINT_ENABLED, a saída de cada etapa (e cada reconhecimento do Shazam)
+    fica gravada por job; um MXF reprocessado depois de uma queda retoma na
+    primeira etapa incompleta. complete(item) descarta o checkpoint no fim.
+
+    Cada etapa tem prazo (PIPELINE_STAGE_TIMEOUTS) e o job inteiro JOB_TIMEOUT.
+    Um job cancelado ou fora do prazo tem os processos filhos mortos e os
+    artefatos parciais (WAVs extraídos e intermediários) removidos.
+
+    O tempo de cada etapa dos jobs concluídos vai para o ThroughputStore
+    (vazão histórica usada pelo CostEstimator); jobs retomados de checkpoint
+    não entram, porque as etapas puladas distorceriam as taxas.
+    """
+
+    def __init__(self, workflows: list = None, prepare: Stage = None):
+        self.config = Config()
+        self.logger = Logger()
+        workflows = workflows or [UnmixedAudioWorkflow(), MixedAudioWorkflow()]
+        self.workflows = {workflow.get_workflow_name(): workflow for workflow in workflows}
+        self.prepare = prepare
+        self.checkpoints = CheckpointStore() if self.config.CHECKPOINT_ENABLED else None
+        self.throughput = ThroughputStore()
+
+    def _checkpoint(self, job: dict):
+        if self.checkpoints is None or not job.get('checkpoint_key'):
+            return None
+        return self.checkpoints.job(job['checkpoint_key'])
+
+    def _probe(self, job: dict) -> dict:
+        mxf_path = job['mxf_path']
+        job['workflow_strategies'] = {name: workflow.STRATEGIES for name, workflow in self.workflows.items()}
+        if self.checkpoints is not None:
+            job['checkpoint_key'] = self.checkpoints.job_key(mxf_path)
+            saved = self._checkpoint(job).get('probe')
+            if saved is not None:
+                self.logger.info(f"♻️ {mxf_path.name}: retomando do checkpoint {job['checkpoint_key']}")
+                job['streams'] = saved['streams']
+                job['resumed'] = True
+                return job
+
+        streams = MXFProcessor().get_streams(mxf_path)
+        if not any(s.get('codec_type') == 'audio' for s in streams or []):
+            raise ValueError(f"Nenhum stream de áudio encontrado em {mxf_path.name}")
+
+        job['streams'] = streams
+        checkpoint = self._checkpoint(job)
+        if checkpoint:
+            checkpoint.put('probe', {'streams': streams})
+        return job
+
+    def _extract(self, job: dict) -> dict:
+        checkpoint = self._checkpoint(job)
+        saved = checkpoint.get('extract') if checkpoint else None
+        # Os WAVs são apagados depois do reconhecimento: só reaproveita se ainda existirem
+        if saved is not None and all(Path(f['path']).exists() for f in saved):
+            extracted_files = [{**f, 'path': Path(f['path'])} for f in saved]
+        else:
+            extracted_files = AudioExtractor().extract_all_audio_streams(job['mxf_path'])
+            if not extracted_files:
+                raise ValueError(f"Nenhum áudio extraído de {job['mxf_path'].name}")
+            if checkpoint:
+                checkpoint.put('extract', [{**f, 'path': str(f['path'])} for f in extracted_files])
+
+        job['extracted_files'] = extracted_files
+        return job
+
+    async def _recognize(self, job: dict) -> dict:
+        plan = ExecutionPlan.from_dict(job['plan'])
+        files = {str(f['path']): f for f in job['extracted_files']}
+        checkpoint = self._checkpoint(job)
+
+        results_by_path = {}
+        for stream_plan in plan.active:
+            workflow = self.workflows[stream_plan.workflow]
+            results_by_path[stream_plan.path] = await workflow.recognize_stream(
+                job['mxf_path'], files[stream_plan.path], stream_plan.strategy,
+                job['segment_ranges'].get(stream_plan.path), checkpoint
+            )
+
+        results = []
+        for stream_plan in plan.streams:
+            if stream_plan.strategy == SKIP:
+                self.logger.info(f"⏭️ Stream {stream_plan.stream_index} ignorado: {stream_plan.reason}")
+            elif stream_plan.strategy == DUPLICATE:
+                results.extend(BaseWorkflow.fan_out(results_by_path.get(stream_plan.duplicate_of, []),
+                                                    files[stream_plan.path]))
+            else:
+                results.extend(results_by_path[stream_plan.path])
+
+        job['results'] = results
+        return job
+
+    def complete(self, item):
+        """Descarta o checkpoint de um job finalizado (EDL gravado, MXF movido)"""
+        self.complete_job(item.value)
+
+    def record_throughput(self, job: dict, timings: dict):
+        """Grava o tempo de cada etapa de um job concluído no histórico de vazão"""
+        if job.get('resumed') or 'plan' not in job:
+            return
+        plan = ExecutionPlan.from_dict(job['plan'])
+        audio_seconds = sum(stats[0] for stats in job.get('stream_stats', {}).values()) / 1000
+        self.throughput.record(timings, audio_seconds, plan.predicted_seconds, plan.api_calls)
+
+    def complete_job(self, job: dict):
+        """Mesmo que complete(), a partir do dicionário do job"""
+        checkpoint = self._checkpoint(job)
+        if checkpoint:
+            checkpoint.clear()
+
+    def cleanup_job(self, job: dict, discard_checkpoint: bool = True):
+        """
+        Remove os artefatos de um job interrompido: WAVs extraídos (inclusive os
+        que o ffmpeg deixou pela metade), intermediários derivados deles e, se
+        pedido, o checkpoint. Num prazo estourado o checkpoint pode ser mantido
+        para a próxima tentativa reaproveitar os reconhecimentos já feitos.
+        """
+        try:
+            wavs = {Path(f['path']) for f in job.get('extracted_files') or []}
+            wavs |= {AudioExtractor.output_path(self.config.PASTA_SAIDA, job['mxf_path'], stream)
+                     for stream in job.get('streams') or [] if stream.get('codec_type') == 'audio'}
+            removed = 0
+            for wav in wavs:
+                for path in [wav, *wav.parent.glob(f"{wav.stem}_*.wav")]:
+                    if path.exists():
+                        path.unlink()
+                        removed += 1
+                for directory in (self.config.PASTA_SAIDA / "demucs_separated").glob(f"*/{wav.stem}"):
+                    shutil.rmtree(directory, ignore_errors=True)
+            if discard_checkpoint:
+                self.complete_job(job)
+            self.logger.info(f"🧹 {job['mxf_path'].name}: {removed} arquivos parciais removidos")
+        except Exception as e:
+            self.logger.warning(f"⚠️ Limpeza incompleta de {job['mxf_path'].name}: {e}")
+
+    def build_stages(self) -> list:
+        workers = self.config.PIPELINE_STAGE_WORKERS
+        timeouts = self.config.PIPELINE_STAGE_TIMEOUTS
+        stages = [self.prepare] if self.prepare else []
+        return stages + [
+            Stage('probe', self._probe, Stage.THREAD, workers.get('probe', 1), timeouts.get('probe')),
+            Stage('extract', self._extract, Stage.THREAD, workers.get('extract', 1), timeouts.get('extract')),
+            Stage('analyze', analyze_segments, Stage.CPU, workers.get('analyze', 1), timeouts.get('analyze')),
+            Stage('recognize', self._recognize, Stage.IO, workers.get('recognize', 4), timeouts.get('recognize')),
+        ]
+
+    async def process_file(self, mxf_path: Path, token: CancelToken = None) -> list:
+        """
+        Um único MXF, etapa por etapa no processo atual (sem pools), para quem já
+        roda em thread própria como a API. Retorna os resultados do reconhecimento.
+        token: para cancelar o job de fora (CancelToken.cancel); prazos como no run().
+        Levanta JobCancelled/DeadlineExceeded depois de limpar os artefatos parciais.
+        """
+        token = token or CancelToken(Path(mxf_path).name, self.config.JOB_TIMEOUT)
+        job = {'mxf_path': Path(mxf_path)}
+        timings = {}
+        try:
+            with use_token(token):
+                for stage in self.build_stages():
+                    if stage is self.prepare:
+                        continue
+                    token.check()
+                    started = time.monotonic()
+                    step = stage.func(job) if stage.kind == Stage.IO else asyncio.to_thread(stage.func, job)
+                    job = await with_deadline(step, stage.name, stage.timeout, token)
+                    timings[stage.name] = time.monotonic() - started
+        except (JobCancelled, DeadlineExceeded):
+            self.cleanup_job(job, discard_checkpoint=not token.timed_out)
+            raise
+        self.record_throughput(job, timings)
+        self.complete_job(job)
+        return job['results']
+
+    async def run(self, mxf_paths, on_result=None, max_in_flight: int = None) -> list:
+        """
+        Processa os MXFs (lista ou gerador assíncrono) com as etapas sobrepostas. on_result(item) recebe cada
+        PipelineItem concluído (item.value['results'] ou item.error); os itens não são acumulados.
+        max_in_flight limita quantos arquivos estão em processamento ao mesmo tempo.
+        """
+        async def finish(item):
+            if isinstance(item.error, (JobCancelled, DeadlineExceeded)):
+                self.cleanup_job(item.value, discard_checkpoint=not item.token.timed_out)
+            elif item.ok:
+                self.record_throughput(item.value, item.timings)
+            if on_result is not None:
+                result = on_result(item)
+                if inspect.isawaitable(result):
+                    await result
+
+        engine = PipelineEngine(self.build_stages(), self.config.PIPELINE_QUEUE_SIZE, self.config.JOB_TIMEOUT)
+        return await engine.run(self._jobs(mxf_paths), finish, max_in_flight)
+
+    @staticmethod
+    async def _jobs(mxf_paths):
+        if hasattr(mxf_paths, '__aiter__'):
+            async for path in mxf_paths:
+                yield Path(path).name, {'mxf_path': Path(path)}
+        else:
+            for path in mxf_paths:
+                yield Path(path).name, {'mxf_path': Path(path)}
@@ -1,4 +1,5 @@
 from pathlib import Path
+from core.cancellation import check_cancelled
 from core.file_processor import MXFProcessor
 from core.logger import Logger
 
@@ -7,6 +8,12 @@ class AudioExtractor:
         self.processor = MXFProcessor()
         self.logger = Logger()
     
+    @staticmethod
+    def output_path(output_dir: Path, mxf_path: Path, stream: dict) -> Path:
+        """WAV de destino de um stream (o nome identifica o MXF, para limpeza de jobs interrompidos)"""
+        return output_dir / (f"audio_{stream.get('index')}_{stream.get('channels', 2)}c_"
+                             f"{stream.get('codec_name', 'unknown')}_{mxf_path.stem}.wav")
+    
     def extract_all_audio_streams(self, mxf_path: Path):
         """Extrai todos os streams de áudio do MXF"""
         try:
@@ -21,12 +28,12 @@ class AudioExtractor:
             
             extracted_files = []
             for stream in audio_streams:
+                check_cancelled()
                 stream_index = stream.get('index')
                 codec = stream.get('codec_name', 'unknown')
                 channels = stream.get('channels', 2)
                 
-                output_filename = f"audio_{stream_index}_{channels}c_{codec}_{mxf_path.stem}.wav"
-                output_path = self.processor.config.PASTA_SAIDA / output_filename
+                output_path = self.output_path(self.processor.config.PASTA_SAIDA, mxf_path, stream)
                 
                 try:
                     extracted_path = self.processor.extract_audio_stream(mxf_path, stream_index, output_path)
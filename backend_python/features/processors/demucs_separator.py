@@ -1,91 +1,346 @@
+import shutil
 import subprocess
 import sys
+from importlib import metadata
+import numpy as np
 from pathlib import Path
+from core.cancellation import run_command, DeadlineExceeded
 from core.logger import Logger
 from core.config import Config
+from core.stem_cache import StemCache
+from features.dsp.buffer import AudioBuffer
+from features.dsp.resample import resample_linear
+from features.processors.demucs_service import DemucsService
+from utils.wav_io import read_wav_info, read_frames
 
 class DemucsSeparator:
+    # Comando do CLI descoberto na primeira vez que o fallback é usado (compartilhado entre instâncias)
+    _cli_command = None
+
     def __init__(self):
         self.logger = Logger()
         self.config = Config()
+        self.service = DemucsService()
+        self.cache = StemCache() if self.config.STEM_CACHE_ENABLED else None
         self.demucs_available = self._check_demucs_availability()
     
     def _check_demucs_availability(self):
-        """Verifica se o Demucs está disponível no sistema"""
+        """Verifica se o Demucs está disponível (módulo importável ou executável no PATH), sem subprocessos"""
+        if self.service.is_available():
+            self.logger.info("✅ Demucs disponível em processo (modelo carregado uma vez)")
+            return True
+        if shutil.which("demucs"):
+            self.logger.info("✅ Demucs disponível via CLI")
+            return True
+        
+        self.logger.warning("❌ Demucs não encontrado")
+        return False
+
+    def _resolve_cli_command(self):
+        """Descobre como executar o CLI do Demucs (uma vez por processo)"""
+        if DemucsSeparator._cli_command is not None:
+            return DemucsSeparator._cli_command
+        
+        commands_to_try = [
+            ["demucs"],
+            [sys.executable, "-m", "demucs"],  # Tenta como módulo Python
+            ["python", "-m", "demucs"],
+            ["python3", "-m", "demucs"]
+        ]
+        
+        for cmd in commands_to_try:
+            try:
+                self.logger.info(f"🔍 Testando comando: {' '.join(cmd)}")
+                result = subprocess.run(cmd + ["--help"], capture_output=True, text=True, timeout=10)
+                if result.returncode == 0:
+                    self.logger.info(f"✅ Demucs encontrado via: {' '.join(cmd)}")
+                    DemucsSeparator._cli_command = cmd
+                    return cmd
+            except (FileNotFoundError, subprocess.TimeoutExpired):
+                continue
+        
+        self.logger.warning("❌ Demucs não encontrado em nenhum dos comandos testados")
+        return None
+
+    def _model_id(self):
+        """(modelo, versão) que entram na chave do cache: saídas diferentes, chaves diferentes"""
+        if self.config.DEMUCS_ONNX_PATH:
+            return f"onnx:{Path(self.config.DEMUCS_ONNX_PATH).name}", ""
         try:
-            # Tenta diferentes comandos para verificar o Demucs
-            commands_to_try = [
-                ["demucs", "--help"],
-                [sys.executable, "-m", "demucs", "--help"],  # Tenta como módulo Python
-                ["python", "-m", "demucs", "--help"],
-                ["python3", "-m", "demucs", "--help"]
-            ]
-            
-            for cmd in commands_to_try:
-                try:
-                    self.logger.info(f"🔍 Testando comando: {' '.join(cmd)}")
-                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-                    if result.returncode == 0:
-                        self.logger.info(f"✅ Demucs encontrado via: {' '.join(cmd)}")
-                        return True
-                except (FileNotFoundError, subprocess.TimeoutExpired):
-                    continue
-            
-            self.logger.warning("❌ Demucs não encontrado em nenhum dos comandos testados")
-            return False
+            version = metadata.version("demucs")
+        except metadata.PackageNotFoundError:
+            version = "cli"
+        if self.config.DEMUCS_QUANTIZE:
+            version += "-int8"
+        return self.config.DEMUCS_MODEL, version
+
+    def _cache_key(self, source):
+        if self.cache is None:
+            return None
+        return StemCache.make_key(StemCache.audio_hash(source), *self._model_id())
+
+    def separate_buffers(self, audios: list):
+        """
+        Separa vários buffers em memória com o modelo aquecido do DemucsService;
+        os que não estão no cache são enfileirados juntos para que o serviço
+        monte lotes entre eles.
+        Retorna [{stem: AudioBuffer}] no mesmo formato PCM de cada entrada
+        """
+        results = [None] * len(audios)
+        keys = [self._cache_key(audio) for audio in audios]
+        
+        futures = []
+        for index, (audio, key) in enumerate(zip(audios, keys)):
+            cached = self.cache.get(key) if key else None
+            if cached:
+                results[index] = {
+                    name: audio.with_samples(AudioBuffer.from_wav(path).samples, f"_{name}")
+                    for name, path in cached.items()
+                }
+                continue
             
-        except Exception as e:
-            self.logger.warning(f"⚠️ Erro ao verificar Demucs: {e}")
-            return False
+            scale = np.float32(2 ** (audio.sample_width * 8 - 1))
+            stems = {name: np.empty(audio.samples.shape, dtype=np.float32) for name in self.service.sources}
+            futures.append((index, audio, scale, self.service.submit(audio.samples / scale, audio.frame_rate, out=stems or None)))
+        
+        for index, audio, scale, future in futures:
+            limits = np.iinfo(audio.samples.dtype)
+            results[index] = {
+                name: audio.with_samples(
+                    np.clip(values * scale, limits.min, limits.max).astype(audio.samples.dtype), f"_{name}"
+                )
+                for name, values in future.result().items()
+            }
+            if keys[index]:
+                self.cache.put(keys[index], results[index], " ".join(self._model_id()), audio.name)
+        return results
+
+    def separate_buffer(self, audio: AudioBuffer):
+        """Separa um buffer em memória; retorna {stem: AudioBuffer}"""
+        return self.separate_buffers([audio])[0]
+
+    def _separate_in_process(self, audio_path: Path, model_dir: Path):
+        model_dir.mkdir(parents=True, exist_ok=True)
+        separated_files = {}
+        for name, stem in self.separate_buffer(AudioBuffer.from_wav(audio_path)).items():
+            separated_files[name] = stem.export(model_dir / f"{name}.wav")
+            self.logger.info(f"🎵 Track {name}: {separated_files[name]}")
+        
+        self.logger.info(f"✅ Encontrados {len(separated_files)} tracks separados")
+        return separated_files
 
     def separate_audio(self, audio_path: Path):
         """
         Separa áudio em componentes usando Demucs
-        Retorna dicionário com paths dos arquivos separados
+        Retorna dicionário com paths dos arquivos separados. Com o cache ativo os
+        paths ficam no cache (não devem ser apagados pelo chamador)
         """
         if not self.demucs_available:
             self.logger.warning("🚫 Demucs não disponível - pulando separação")
             return {}
-            
+        
+        key = self._cache_key(audio_path)
+        cached = self.cache.get(key) if key else None
+        if cached:
+            return cached
+        
+        output_dir = self.config.PASTA_SAIDA / "demucs_separated"
+        model_dir = output_dir / self.config.DEMUCS_MODEL / audio_path.stem
+        
+        if self._use_service():
+            try:
+                self.logger.info(f"🎵 Separando áudio com Demucs (em processo): {audio_path.name}")
+                if key:
+                    # separate_buffer já grava no cache
+                    self.separate_buffer(AudioBuffer.from_wav(audio_path))
+                    return self.cache.get(key) or {}
+                return self._separate_in_process(audio_path, model_dir)
+            except Exception as e:
+                self.logger.warning(f"⚠️ Demucs em processo falhou, usando CLI: {e}")
+        
+        separated_files = self._separate_cli(audio_path, output_dir, model_dir)
+        if separated_files and key:
+            cached = self.cache.put(key, separated_files, " ".join(self._model_id()), audio_path.name)
+            for path in separated_files.values():
+                path.unlink(missing_ok=True)
+            return cached
+        return separated_files
+
+    def _use_service(self) -> bool:
+        return self.service.is_available() and self.service.healthy
+
+    def _separate_windows(self, windows: list):
+        """Separa trechos em memória: em lote no modelo aquecido, ou CLI sobre WAVs temporários"""
+        if self._use_service():
+            try:
+                return self.separate_buffers(windows)
+            except Exception as e:
+                self.logger.warning(f"⚠️ Demucs em processo falhou, usando CLI: {e}")
+        
+        return [self._separate_window_cli(window) for window in windows]
+
+    @staticmethod
+    def _conform_stem(window: AudioBuffer, stem: AudioBuffer, name: str) -> AudioBuffer:
+        """
+        Stem do CLI (WAV a 44.1kHz, estéreo) no formato do trecho: mesma taxa,
+        canais, tipo e número de frames, para o recorte por offsets em frames do trecho
+        """
+        source_scale = np.float32(2 ** (stem.sample_width * 8 - 1))
+        values = resample_linear(stem.samples.astype(np.float32) / source_scale,
+                                 stem.frame_rate, window.frame_rate, axis=0)
+        if window.channels == 1 and values.shape[1] > 1:
+            values = values.mean(axis=1, keepdims=True)
+        elif values.shape[1] != window.channels:
+            values = np.repeat(values[:, :1], window.channels, axis=1)
+        
+        frames = len(window.samples)
+        values = values[:frames]
+        if len(values) < frames:
+            values = np.pad(values, ((0, frames - len(values)), (0, 0)))
+        
+        scale = np.float32(2 ** (window.sample_width * 8 - 1))
+        limits = np.iinfo(window.samples.dtype)
+        return window.with_samples(np.clip(values * scale, limits.min, limits.max).astype(window.samples.dtype), f"_{name}")
+
+    def _separate_window_cli(self, window: AudioBuffer):
+        key = self._cache_key(window)
+        cached = self.cache.get(key) if key else None
+        if cached:
+            return {name: self._conform_stem(window, AudioBuffer.from_wav(path), name) for name, path in cached.items()}
+        
+        output_dir = self.config.PASTA_SAIDA / "demucs_separated"
+        temp_path = window.export(self.config.PASTA_SAIDA / f"{window.name}.wav")
+        model_dir = output_dir / self.config.DEMUCS_MODEL / temp_path.stem
+        try:
+            stem_files = self._separate_cli(temp_path, output_dir, model_dir)
+            stems = {name: self._conform_stem(window, AudioBuffer.from_wav(path), name) for name, path in stem_files.items()}
+            if stems and key:
+                self.cache.put(key, stems, " ".join(self._model_id()), window.name)
+        finally:
+            for path in [temp_path, *model_dir.glob("*.wav")]:
+                path.unlink(missing_ok=True)
+        return stems
+
+    def _range_reader(self, source):
+        """(frame_rate, total_frames, read(frame_inicial, frame_final) -> AudioBuffer) para Path ou AudioBuffer"""
+        if isinstance(source, AudioBuffer):
+            return source.frame_rate, len(source.samples), lambda start, end: source.with_samples(source.samples[start:end])
+        
+        info = read_wav_info(source)
+        def read(start, end):
+            frames = read_frames(source, info, start, end - start)
+            return AudioBuffer.from_frames(frames, info.channels, info.sample_width, info.frame_rate, source.stem)
+        return info.frame_rate, info.n_frames, read
+
+    @staticmethod
+    def _merge_ranges(ranges, duration_ms: int, padding_ms: int):
+        """Ordena, limita ao áudio e une faixas cujas janelas com padding se sobrepõem"""
+        merged = []
+        for start, end in sorted((max(0, int(s)), min(duration_ms, int(e))) for s, e in ranges):
+            if end <= start:
+                continue
+            if merged and start <= merged[-1][1] + 2 * padding_ms:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return merged
+
+    def separate_ranges(self, source, ranges, padding_ms: int = None):
+        """
+        Separa só os trechos [início, fim] em ms (ex.: segmentos que o reconhecimento
+        direto não identificou). Cada trecho é lido com padding de contexto, que é
+        descartado depois; trechos longos são separados em pedaços de
+        DEMUCS_MAX_CHUNK_DURATION. Faixas próximas são unidas.
+        Retorna [{'start': ms, 'end': ms, 'stems': {stem: AudioBuffer}}]
+        """
+        if not self.demucs_available:
+            self.logger.warning("🚫 Demucs não disponível - pulando separação")
+            return []
+        
         try:
-            output_dir = self.config.PASTA_SAIDA / "demucs_separated"
-            output_dir.mkdir(exist_ok=True)
+            padding_ms = self.config.DEMUCS_RANGE_PADDING if padding_ms is None else padding_ms
+            max_chunk_ms = self.config.DEMUCS_MAX_CHUNK_DURATION
+            frame_rate, total_frames, read = self._range_reader(source)
+            duration_ms = int(total_frames * 1000 / frame_rate)
+            to_frame = lambda ms: min(total_frames, ms * frame_rate // 1000)
             
-            self.logger.info(f"🎵 Separando áudio com Demucs: {audio_path.name}")
+            base_name = source.name if isinstance(source, AudioBuffer) else source.stem
+            merged = self._merge_ranges(ranges, duration_ms, padding_ms)
+            self.logger.info(
+                f"🎵 Demucs em {len(merged)} trechos: {sum(e - s for s, e in merged) / 1000:.0f}s "
+                f"de {duration_ms / 1000:.0f}s"
+            )
             
-            # Tenta diferentes formas de executar o Demucs
-            cmd_versions = [
-                ["demucs", "-n", "htdemucs", "-o", str(output_dir), str(audio_path)],
-                [sys.executable, "-m", "demucs", "-n", "htdemucs", "-o", str(output_dir), str(audio_path)],
-                ["python", "-m", "demucs", "-n", "htdemucs", "-o", str(output_dir), str(audio_path)],
-                ["python3", "-m", "demucs", "-n", "htdemucs", "-o", str(output_dir), str(audio_path)]
+            # Todos os pedaços são enviados juntos para o serviço montar lotes
+            windows, placements = [], []
+            for index, (start, end) in enumerate(merged):
+                for chunk_start in range(start, end, max_chunk_ms):
+                    chunk_end = min(chunk_start + max_chunk_ms, end)
+                    window_start = max(0, chunk_start - padding_ms)
+                    window_end = min(duration_ms, chunk_end + padding_ms)
+                    
+                    window = read(to_frame(window_start), to_frame(window_end))
+                    window.name = f"{base_name}_{window_start}ms"
+                    windows.append(window)
+                    placements.append((
+                        index,
+                        to_frame(chunk_start) - to_frame(window_start),
+                        to_frame(chunk_end) - to_frame(chunk_start)
+                    ))
+            
+            pieces = [{} for _ in merged]
+            for (index, offset, length), stems in zip(placements, self._separate_windows(windows)):
+                for name, stem in stems.items():
+                    pieces[index].setdefault(name, []).append(stem.samples[offset:offset + length])
+            
+            separated = [
+                {
+                    'start': start,
+                    'end': end,
+                    'stems': {
+                        name: AudioBuffer(np.concatenate(parts), frame_rate, f"{base_name}_{start}ms_{name}")
+                        for name, parts in range_pieces.items()
+                    }
+                }
+                for (start, end), range_pieces in zip(merged, pieces)
             ]
             
-            for cmd in cmd_versions:
-                try:
-                    self.logger.info(f"🔧 Executando: {' '.join(cmd)}")
-                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=3600)  # 1 hora timeout
-                    
-                    if result.returncode == 0:
-                        self.logger.info("✅ Separação Demucs concluída com sucesso")
-                        break
-                    else:
-                        self.logger.error(f"❌ Erro no Demucs: {result.stderr}")
-                        continue
-                        
-                except subprocess.TimeoutExpired:
-                    self.logger.error("⏰ Timeout - Demucs está demorando muito")
-                    return {}
-                except FileNotFoundError:
-                    continue
-            else:
+            self.logger.info(f"✅ {len(separated)} trechos separados com Demucs")
+            return separated
+            
+        except Exception as e:
+            self.logger.error(f"❌ Erro na separação Demucs por trechos: {e}")
+            return []
+
+    def _separate_cli(self, audio_path: Path, output_dir: Path, model_dir: Path):
+        """Fallback: um subprocesso do CLI do Demucs por arquivo"""
+        try:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            
+            cmd = self._resolve_cli_command()
+            if cmd is None:
                 self.logger.error("❌ Não foi possível executar o Demucs em nenhum formato")
                 return {}
             
+            self.logger.info(f"🎵 Separando áudio com Demucs: {audio_path.name}")
+            cmd = cmd + ["-n", self.config.DEMUCS_MODEL, "-o", str(output_dir), str(audio_path)]
+            
+            try:
+                self.logger.info(f"🔧 Executando: {' '.join(cmd)}")
+                # Morto junto com o job se ele for cancelado ou passar do prazo
+                result = run_command(cmd, self.config.DEMUCS_CLI_TIMEOUT)
+            except DeadlineExceeded:
+                self.logger.error("⏰ Timeout - Demucs está demorando muito")
+                return {}
+            
+            if result.returncode != 0:
+                self.logger.error(f"❌ Erro no Demucs: {result.stderr}")
+                return {}
+            
+            self.logger.info("✅ Separação Demucs concluída com sucesso")
+            
             # Encontra os arquivos resultantes
             separated_files = {}
-            model_dir = output_dir / "htdemucs" / audio_path.stem
-            
             if model_dir.exists():
                 for track_file in model_dir.glob("*.wav"):
                     track_name = track_file.stem
@@ -0,0 +1,306 @@
+import importlib.util
+import queue
+import threading
+import numpy as np
+from concurrent.futures import Future
+from core.logger import Logger
+from core.config import Config
+from features.dsp.resample import resample_linear
+
+# Contexto (s) lido de cada lado dos pedaços e descartado depois, para não haver emendas
+CHUNK_CONTEXT_SECONDS = 1.0
+
+
+class _Job:
+    """Separação pendente: áudio normalizado na taxa do modelo, dividido em pedaços"""
+
+    def __init__(self, samples: np.ndarray, frame_rate: int, out: dict, future: Future):
+        self.samples = samples
+        self.frame_rate = frame_rate
+        self.out = out
+        self.future = future
+        self.wav = None
+        self.mean = 0.0
+        self.std = 1.0
+        self.estimates = None
+
+
+class DemucsService:
+    """
+    Modelo Demucs carregado uma única vez por processo e mantido aquecido.
+
+    Os jobs entram numa fila em memória e são executados por uma thread dedicada
+    (o modelo não é thread-safe); cada job devolve um Future. O custo de carregar
+    os pesos do htdemucs é pago uma vez por worker, não uma vez por arquivo.
+
+    Jobs que chegam juntos são cortados em pedaços de mesmo tamanho
+    (DEMUCS_CHUNK_SECONDS + contexto) e empilhados em lotes de DEMUCS_BATCH_SIZE
+    numa única passada do modelo. O backend pode ser torch (opcionalmente com
+    quantização dinâmica int8) ou um modelo ONNX exportado (DEMUCS_ONNX_PATH).
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(DemucsService, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self.logger = Logger()
+        self.config = Config()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._model = None
+        self._session = None
+        self._sources = []
+        self._load_error = None
+        self._initialized = True
+
+    @staticmethod
+    def is_available() -> bool:
+        """Backend configurado importável neste interpretador (sem subprocessos)"""
+        modules = ('onnxruntime',) if Config.DEMUCS_ONNX_PATH else ('demucs', 'torch')
+        return all(importlib.util.find_spec(name) is not None for name in modules)
+
+    @property
+    def healthy(self) -> bool:
+        """False se o carregamento do modelo já falhou neste processo"""
+        return self._load_error is None
+
+    @property
+    def sources(self):
+        """Nomes dos stems do modelo carregado (ex.: drums, bass, other, vocals)"""
+        return list(self._sources)
+
+    @property
+    def _loaded(self) -> bool:
+        return self._model is not None or self._session is not None
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="demucs-service", daemon=True)
+                self._thread.start()
+
+    def _load_model(self):
+        if self.config.DEMUCS_ONNX_PATH:
+            self._load_onnx()
+        else:
+            self._load_torch()
+
+    def _load_torch(self):
+        import torch
+        from demucs.pretrained import get_model
+
+        if self.config.DEMUCS_THREADS > 0:
+            torch.set_num_threads(self.config.DEMUCS_THREADS)
+
+        device = self.config.DEMUCS_DEVICE
+        if device == 'auto':
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+
+        self.logger.info(f"🧠 Carregando modelo Demucs '{self.config.DEMUCS_MODEL}' em {device} "
+                         f"({torch.get_num_threads()} threads)")
+        model = get_model(self.config.DEMUCS_MODEL)
+        model.to(device)
+        model.eval()
+
+        if self.config.DEMUCS_QUANTIZE and device == 'cpu':
+            # Pesos int8 nas camadas lineares/LSTM: menos memória e mais rápido em CPU
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear, torch.nn.LSTM}, dtype=torch.qint8)
+            self.logger.info("⚡ Quantização dinâmica int8 aplicada")
+
+        self._device = device
+        self._model = model
+        self._samplerate = model.samplerate
+        self._audio_channels = model.audio_channels
+        self._chunk_length = int(self.config.DEMUCS_CHUNK_SECONDS * model.samplerate)
+        self._context = int(CHUNK_CONTEXT_SECONDS * model.samplerate)
+        self._sources = list(model.sources)
+        self.logger.info(f"✅ Modelo Demucs pronto: {', '.join(self._sources)}")
+
+    def _load_onnx(self):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if self.config.DEMUCS_THREADS > 0:
+            options.intra_op_num_threads = self.config.DEMUCS_THREADS
+
+        path = self.config.DEMUCS_ONNX_PATH
+        self.logger.info(f"🧠 Carregando modelo Demucs ONNX: {path}")
+        session = onnxruntime.InferenceSession(str(path), options, providers=['CPUExecutionProvider'])
+
+        self._samplerate = self.config.DEMUCS_ONNX_SAMPLERATE
+        self._audio_channels = 2
+        self._context = int(CHUNK_CONTEXT_SECONDS * self._samplerate)
+        # Modelos exportados costumam ter comprimento fixo: o pedaço útil é o que sobra do contexto
+        length = session.get_inputs()[0].shape[-1]
+        if isinstance(length, int):
+            self._chunk_length = length - 2 * self._context
+        else:
+            self._chunk_length = int(self.config.DEMUCS_CHUNK_SECONDS * self._samplerate)
+        self._session = session
+        self._sources = list(self.config.DEMUCS_ONNX_SOURCES)
+        self.logger.info(f"✅ Modelo Demucs ONNX pronto: {', '.join(self._sources)}")
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        """(lote, canais, amostras) -> (lote, stems, canais, amostras)"""
+        if self._session is not None:
+            name = self._session.get_inputs()[0].name
+            return self._session.run(None, {name: batch})[0]
+
+        import torch
+        from demucs.apply import apply_model
+        with torch.no_grad():
+            estimates = apply_model(self._model, torch.from_numpy(batch), device=self._device,
+                                    split=True, overlap=0.25, progress=False)
+        return estimates.cpu().numpy()
+
+    @staticmethod
+    def _resample(values: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+        """Reamostra no último eixo (torchaudio quando disponível, senão interpolação linear)"""
+        if source_rate == target_rate:
+            return values
+        try:
+            import torch
+            import torchaudio
+            return torchaudio.functional.resample(torch.from_numpy(np.ascontiguousarray(values)),
+                                                  source_rate, target_rate).numpy()
+        except ImportError:
+            return resample_linear(values, source_rate, target_rate)
+
+    def _prepare(self, job: _Job):
+        """Canais/taxa do modelo e a mesma normalização do CLI do Demucs"""
+        wav = np.ascontiguousarray(job.samples.T, dtype=np.float32)
+        channels = wav.shape[0]
+        # O modelo é estéreo: duplica mono e usa os dois primeiros canais de multicanal
+        if channels == 1:
+            wav = np.repeat(wav, self._audio_channels, axis=0)
+        elif channels > self._audio_channels:
+            wav = wav[:self._audio_channels]
+        wav = self._resample(wav, job.frame_rate, self._samplerate)
+
+        reference = wav.mean(0)
+        job.mean, job.std = float(reference.mean()), float(reference.std()) + 1e-8
+        job.wav = (wav - job.mean) / job.std
+        job.estimates = np.zeros((len(self._sources),) + job.wav.shape, dtype=np.float32)
+
+    def _pieces(self, job: _Job):
+        """Pedaços de tamanho fixo (núcleo + contexto dos dois lados, zeros fora do sinal)"""
+        total = job.wav.shape[1]
+        span = self._chunk_length + 2 * self._context
+        for start in range(0, total, self._chunk_length):
+            piece = np.zeros((job.wav.shape[0], span), dtype=np.float32)
+            lo, hi = max(0, start - self._context), min(total, start + self._chunk_length + self._context)
+            offset = lo - (start - self._context)
+            piece[:, offset:offset + hi - lo] = job.wav[:, lo:hi]
+            yield job, start, piece
+
+    def _finish(self, job: _Job) -> dict:
+        estimates = self._resample(job.estimates * job.std + job.mean, self._samplerate, job.frame_rate)
+        channels = job.samples.shape[1]
+
+        result = {}
+        for name, estimate in zip(self._sources, estimates):
+            stem = estimate.T[:len(job.samples)]
+            if channels == 1:
+                stem = stem.mean(axis=1, keepdims=True)
+            elif channels > stem.shape[1]:
+                stem = np.pad(stem, ((0, 0), (0, channels - stem.shape[1])))
+
+            if job.out is not None and name in job.out:
+                # Escreve direto no buffer do chamador
+                np.copyto(job.out[name][:len(stem)], stem, casting='unsafe')
+                result[name] = job.out[name]
+            else:
+                result[name] = np.ascontiguousarray(stem, dtype=np.float32)
+        return result
+
+    def _run_jobs(self, jobs: list):
+        """Separa vários jobs juntos, empilhando pedaços de jobs diferentes no mesmo lote"""
+        for job in jobs:
+            self._prepare(job)
+
+        pending = [piece for job in jobs for piece in self._pieces(job)]
+        batch_size = max(1, self.config.DEMUCS_BATCH_SIZE)
+        for index in range(0, len(pending), batch_size):
+            group = pending[index:index + batch_size]
+            estimates = self._forward(np.stack([piece for _, _, piece in group]))
+            for (job, start, _), estimate in zip(group, estimates):
+                length = min(self._chunk_length, job.wav.shape[1] - start)
+                job.estimates[:, :, start:start + length] = estimate[:, :, self._context:self._context + length]
+
+        self.logger.info(f"🎛️ Demucs: {len(jobs)} job(s), {len(pending)} pedaços em lotes de {batch_size}")
+        for job in jobs:
+            job.future.set_result(self._finish(job))
+            job.wav = job.estimates = None
+
+    def _next_jobs(self):
+        """Bloqueia pelo próximo job e junta os que já estiverem na fila"""
+        jobs = [self._queue.get()]
+        while jobs[-1] is not None and len(jobs) < max(1, self.config.DEMUCS_BATCH_SIZE):
+            try:
+                jobs.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return jobs
+
+    def _worker(self):
+        running = True
+        while running:
+            jobs = self._next_jobs()
+            if jobs[-1] is None:
+                running = False
+                jobs = jobs[:-1]
+
+            jobs = [job for job in jobs if job.future.set_running_or_notify_cancel()]
+            if not jobs:
+                continue
+            try:
+                if self._load_error is not None:
+                    raise self._load_error
+                if not self._loaded:
+                    try:
+                        self._load_model()
+                    except Exception as e:
+                        # Não tenta recarregar a cada job: quem chama cai no CLI
+                        self._load_error = e
+                        raise
+                self._run_jobs(jobs)
+            except Exception as e:
+                for job in jobs:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+
+    def submit(self, samples: np.ndarray, frame_rate: int, out: dict = None) -> Future:
+        """
+        Enfileira uma separação. samples: (frames, canais) float em [-1, 1].
+        out (opcional): {stem: array (frames, canais)} pré-alocado que recebe o resultado.
+        """
+        future = Future()
+        self._ensure_worker()
+        self._queue.put(_Job(samples, frame_rate, out, future))
+        return future
+
+    def separate(self, samples: np.ndarray, frame_rate: int, out: dict = None) -> dict:
+        """Versão bloqueante de submit()"""
+        return self.submit(samples, frame_rate, out).result()
+
+    def separate_many(self, items: list) -> list:
+        """Enfileira vários (samples, frame_rate) de uma vez para que sejam separados em lote"""
+        futures = [self.submit(samples, frame_rate) for samples, frame_rate in items]
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        """Encerra a thread do serviço depois dos jobs já enfileirados"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._queue.put(None)
+                self._thread.join()
+            self._thread = None
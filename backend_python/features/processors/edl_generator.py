@@ -1,3 +1,4 @@
+import os
 from datetime import datetime
 from pathlib import Path
 from core.logger import Logger
@@ -131,10 +132,14 @@ class EDLGenerator:
         return "\n".join(metadata_lines)
     
     def save_edl(self, edl_content, output_path: Path):
-        """Salva conteúdo EDL em arquivo"""
+        """Salva conteúdo EDL em arquivo (temporário + rename: nunca fica um EDL pela metade)"""
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
+            temp_path = output_path.with_name(f".{output_path.name}.tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
                 f.write(edl_content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, output_path)
             self.logger.info(f"EDL salvo: {output_path}")
             return True
         except Exception as e:
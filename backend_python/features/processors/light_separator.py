@@ -1,118 +1,104 @@
-import numpy as np
-from pydub import AudioSegment
-from pydub.effects import low_pass_filter, high_pass_filter
 from pathlib import Path
 from core.logger import Logger
 from core.config import Config
+from features.dsp.buffer import AudioBuffer
+from features.dsp.chain import DSPChain, BandPass, HighPass, Gain, Normalize
+from features.dsp.parallel import SharedMemoryDSPExecutor
+from features.dsp.streaming import StreamingDSPRunner
 
 class LightSeparator:
     def __init__(self):
         self.logger = Logger()
         self.config = Config()
-    
-    def separate_vocals_light(self, audio_path: Path):
+        self.executor = SharedMemoryDSPExecutor()
+
+    def vocals_chain(self):
+        """Frequências típicas de vocais humanos (300Hz - 3000Hz) + boost de 3dB"""
+        return DSPChain('vocals_light', [
+            BandPass(300, 3000),
+            Gain(3)
+        ])
+
+    def enhancement_chain(self):
+        """Normaliza, remove graves abaixo de 100Hz e aplica +2dB"""
+        return DSPChain('enhanced', [
+            Normalize(target_dbfs=-20.0, max_change_db=10.0),
+            HighPass(100),
+            Gain(2)
+        ])
+
+    def separate_vocals_buffer(self, audio: AudioBuffer):
         """
-        Separa vocais usando filtros de frequência leves
+        Separa vocais usando filtros de frequência leves, inteiramente em memória
         Método rápido mas menos preciso que Demucs
         """
         try:
-            self.logger.info(f"🎵 Separando vocais (método leve): {audio_path.name}")
-            
-            # Carrega o áudio
-            audio = AudioSegment.from_wav(str(audio_path))
-            
-            # Método 1: Filtro passa-alta para isolar vocais (300Hz - 3000Hz)
-            vocals = self._extract_vocals_bandpass(audio)
-            
-            # Método 2: Redução de ruído básica
-            cleaned_vocals = self._reduce_noise(vocals)
-            
-            # Salva os vocais processados
+            self.logger.info(f"🎵 Separando vocais (método leve): {audio.name}")
+
+            vocals = self.executor.run_chain(self.vocals_chain(), audio)
+
+            self.logger.info(f"✅ Vocais leves extraídos: {vocals.name}")
+            return {
+                'vocals': vocals,
+                'method': 'light_bandpass'
+            }
+
+        except Exception as e:
+            self.logger.error(f"❌ Erro na separação leve: {e}")
+            return {}
+
+    def separate_vocals_light(self, audio_path: Path):
+        """
+        Versão em arquivo: processa em blocos a partir do disco (memória constante)
+        e grava _vocals_light.wav
+        """
+        try:
+            self.logger.info(f"🎵 Separando vocais em blocos (método leve): {audio_path.name}")
+
             output_path = self.config.PASTA_SAIDA / f"{audio_path.stem}_vocals_light.wav"
-            cleaned_vocals.export(str(output_path), format="wav")
-            
+            StreamingDSPRunner(self.vocals_chain()).run_to_file(audio_path, output_path)
+
             self.logger.info(f"✅ Vocais leves extraídos: {output_path.name}")
-            
             return {
                 'vocals': output_path,
                 'method': 'light_bandpass'
             }
-            
+
         except Exception as e:
             self.logger.error(f"❌ Erro na separação leve: {e}")
             return {}
-    
-    def _extract_vocals_bandpass(self, audio_segment):
-        """Extrai vocais usando filtro bandpass"""
-        # Frequências típicas de vocais humanos
-        low_freq = 300   # Hz
-        high_freq = 3000 # Hz
-        
-        # Aplica filtro passa-banda
-        vocals = audio_segment.low_pass_filter(high_freq)
-        vocals = vocals.high_pass_filter(low_freq)
-        
-        return vocals
-    
-    def _reduce_noise(self, audio_segment):
-        """Redução básica de ruído"""
+
+    def enhance_buffer(self, audio: AudioBuffer):
+        """
+        Melhora o áudio para reconhecimento do Shazam, inteiramente em memória
+        Retorna o buffer original em caso de erro
+        """
         try:
-            # Aumenta um pouco o volume para compensar a filtragem
-            boosted = audio_segment + 3  # +3dB
-            
-            # Compressão leve para uniformizar o áudio
-            # (simulação básica de compressor)
-            return boosted
-            
+            self.logger.info(f"🎵 Otimizando áudio para reconhecimento: {audio.name}")
+
+            enhanced = self.executor.run_chain(self.enhancement_chain(), audio)
+
+            self.logger.info(f"✅ Áudio otimizado: {enhanced.name}")
+            return enhanced
+
         except Exception as e:
-            self.logger.warning(f"⚠️ Erro na redução de ruído: {e}")
-            return audio_segment
-    
+            self.logger.error(f"❌ Erro na otimização de áudio: {e}")
+            return audio
+
     def enhance_audio_for_recognition(self, audio_path: Path):
         """
-        Melhora o áudio para reconhecimento do Shazam
-        sem separação complexa
+        Versão em arquivo: processa em blocos a partir do disco (memória constante)
+        e grava _enhanced.wav. Retorna o arquivo original em caso de erro
         """
         try:
-            self.logger.info(f"🎵 Otimizando áudio para reconhecimento: {audio_path.name}")
-            
-            audio = AudioSegment.from_wav(str(audio_path))
-            
-            # 1. Normaliza o volume
-            normalized = self._normalize_audio(audio)
-            
-            # 2. Aplica filtro para reduzir graves muito altos
-            filtered = normalized.high_pass_filter(100)  # Remove frequências abaixo de 100Hz
-            
-            # 3. Pequeno boost nos médios (onde geralmente estão vocais)
-            # Simulado aumentando um pouco o volume geral
-            enhanced = filtered + 2  # +2dB
-            
+            self.logger.info(f"🎵 Otimizando áudio em blocos: {audio_path.name}")
+
             output_path = self.config.PASTA_SAIDA / f"{audio_path.stem}_enhanced.wav"
-            enhanced.export(str(output_path), format="wav")
-            
+            StreamingDSPRunner(self.enhancement_chain()).run_to_file(audio_path, output_path)
+
             self.logger.info(f"✅ Áudio otimizado: {output_path.name}")
             return output_path
-    
+
         except Exception as e:
             self.logger.error(f"❌ Erro na otimização de áudio: {e}")
             return audio_path
-    
-    def _normalize_audio(self, audio_segment):
-        """Normaliza o volume do áudio"""
-        try:
-            # Pega a amplitude máxima
-            max_dBFS = audio_segment.dBFS
-            target_dBFS = -20.0  # Nível alvo
-            
-            # Calcula quanto precisa aumentar/diminuir
-            change_in_dBFS = target_dBFS - max_dBFS
-            
-            # Aplica a normalização (limita a +/- 10dB para não distorcer)
-            change_in_dBFS = max(min(change_in_dBFS, 10), -10)
-            
-            return audio_segment.apply_gain(change_in_dBFS)
-            
-        except Exception as e:
-            self.logger.warning(f"⚠️ Erro na normalização: {e}")
-            return audio_segment
\ No newline at end of file
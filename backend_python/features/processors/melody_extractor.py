@@ -1,86 +1,193 @@
-import subprocess
-import json
-from spleeter.separator import Separator
-#from utils.Logger import Logger
+import errno
+import importlib.util
 import os
+import shutil
+import threading
 import uuid
-from datetime import datetime
-from pathlib import Path  # Importação necessária para trabalhar com paths
-import shutil  # Importação para operações de arquivo/diretório
+import numpy as np
+from importlib import metadata
+from pathlib import Path
+from core.logger import Logger
+from core.config import Config
+from core.stem_cache import StemCache
+from features.dsp.buffer import AudioBuffer
+from features.dsp.resample import resample_linear
 
-#logger = Logger()
+SPLEETER_MODEL = 'spleeter:2stems'
+SPLEETER_SAMPLE_RATE = 44100
+# Erros de os.link em sistemas de arquivos sem hard links (volumes de rede, FAT...)
+_NO_LINK_ERRNOS = {errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EXDEV, errno.EMLINK}
 
-def extrador_de_melodias():
-    # Entrada: arquivo de áudio original
-    # Saída: arquivos de medlodia na pasta files/songs/wav
-    
-    # === 1️⃣ Definição de paths ===
-    audio_file = Path("Pixote - Insegurança (15 Anos)(Ao Vivo)(Vídeo Oficial).mp4")  # Arquivo de entrada - ajuste conforme necessário
-    output_melody_path = Path("files/songs/wav")  # Pasta final para melodias
-    temp_dir = Path(f"temp_{uuid.uuid4()}")  # Pasta temporária para processamento
-    
-    # Cria os diretórios necessários
-    output_melody_path.mkdir(parents=True, exist_ok=True)
-    temp_dir.mkdir(parents=True, exist_ok=True)
-    
-    # === 2️⃣ Separação com Spleeter ===
-    print("🎶 Separando faixas com Spleeter (voz e acompanhamento)...")
-    
-    try:
-        # Inicializa o separador do Spleeter
-        separator = Separator('spleeter:2stems')
-        
-        # Executa a separação - isso cria pasta com mesmo nome do arquivo dentro do temp_dir
-        separator.separate_to_file(str(audio_file), str(temp_dir))
-        
-        # === 3️⃣ Localiza e processa os arquivos separados ===
-        # O Spleeter cria uma pasta com o nome do arquivo dentro do diretório de output
-        audio_filename = audio_file.stem  # Nome do arquivo sem extensão
-        spleeter_output_dir = temp_dir / audio_filename
-        
-        # Verifica se a separação foi bem sucedida
-        if spleeter_output_dir.exists():
-            # Arquivos gerados pelo Spleeter (2stems)
-            accompaniment_file = spleeter_output_dir / "accompaniment.wav"  # Arquivo da melodia/música
-            vocals_file = spleeter_output_dir / "vocals.wav"  # Arquivo da voz
-            
-            # === 4️⃣ Processa apenas a melodia (acompanhamento) ===
-            if accompaniment_file.exists():
-                # Lista arquivos de melodia existentes para determinar o próximo índice
-                existing_songs = list(output_melody_path.glob("song_*.wav"))
-                next_index = len(existing_songs)  # Próximo índice disponível
-                
-                # Nome do novo arquivo de melodia
-                new_melody_name = f"song_{next_index}.wav"
-                melody_output_path = output_melody_path / new_melody_name
-                
-                # Move o arquivo de acompanhamento (melodia) para a pasta final
-                shutil.move(str(accompaniment_file), str(melody_output_path))
-                print(f"✅ Melodia salva como: {new_melody_name}")
-                
-            else:
-                print("❌ Arquivo de acompanhamento não encontrado")
-                return None
-                
-        else:
-            print("❌ Pasta de output do Spleeter não encontrada")
+
+class MelodyExtractor:
+    """
+    Separação voz/acompanhamento com Spleeter (2stems) como processador reutilizável.
+
+    O modelo é carregado uma vez por processo e compartilhado entre instâncias;
+    as saídas ficam em memória (AudioBuffer) e só vão para disco quando pedido,
+    com nomes song_<n>.wav reservados de forma atômica.
+    """
+
+    _separator = None
+    _model_lock = threading.Lock()
+
+    def __init__(self):
+        self.logger = Logger()
+        self.config = Config()
+        self.cache = StemCache() if self.config.STEM_CACHE_ENABLED else None
+
+    @staticmethod
+    def is_available() -> bool:
+        return importlib.util.find_spec('spleeter') is not None
+
+    def _get_separator(self):
+        with MelodyExtractor._model_lock:
+            if MelodyExtractor._separator is None:
+                from spleeter.separator import Separator
+                self.logger.info(f"🧠 Carregando modelo Spleeter '{SPLEETER_MODEL}'")
+                MelodyExtractor._separator = Separator(SPLEETER_MODEL, multiprocess=False)
+            return MelodyExtractor._separator
+
+    def _cache_key(self, source):
+        if self.cache is None:
             return None
-            
-    except Exception as e:
-        print(f"❌ Erro durante a separação: {e}")
-        return None
-        
-    finally:
-        # === 5️⃣ Limpeza: remove pasta temporária e arquivos de voz ===
-        if temp_dir.exists():
-            shutil.rmtree(temp_dir)  # Deleta toda a pasta temporária recursivamente
-            print("🗑️ Pasta temporária removida")
-    
-    print("🏁 Processo finalizado com sucesso!")
-    return output_melody_path  # Retorna o path para as melodias
+        try:
+            version = metadata.version("spleeter")
+        except metadata.PackageNotFoundError:
+            version = ""
+        return StemCache.make_key(StemCache.audio_hash(source), SPLEETER_MODEL, version)
+
+    def _load(self, source):
+        """AudioBuffer de um buffer, WAV ou outro formato (mp4, mp3... via ffmpeg do Spleeter)"""
+        if isinstance(source, AudioBuffer):
+            return source
+        source = Path(source)
+        try:
+            return AudioBuffer.from_wav(source)
+        except ValueError:
+            from spleeter.audio.adapter import AudioAdapter
+            waveform, _ = AudioAdapter.default().load(str(source), sample_rate=SPLEETER_SAMPLE_RATE)
+            samples = (np.clip(waveform, -1.0, 1.0) * 32767).astype(np.int16)
+            return AudioBuffer(samples, SPLEETER_SAMPLE_RATE, source.stem)
+
+    def _separate_buffer(self, audio: AudioBuffer) -> dict:
+        scale = float(2 ** (audio.sample_width * 8 - 1))
+        waveform = audio.samples.astype(np.float32) / scale
+        # O modelo espera estéreo a 44.1kHz
+        if waveform.shape[1] == 1:
+            waveform = np.repeat(waveform, 2, axis=1)
+        elif waveform.shape[1] > 2:
+            waveform = waveform[:, :2]
+        waveform = resample_linear(waveform, audio.frame_rate, SPLEETER_SAMPLE_RATE, axis=0)
+
+        separator = self._get_separator()
+        with MelodyExtractor._model_lock:
+            prediction = separator.separate(waveform)
+
+        limits = np.iinfo(audio.samples.dtype)
+        stems = {}
+        for name, values in prediction.items():
+            values = resample_linear(values, SPLEETER_SAMPLE_RATE, audio.frame_rate, axis=0)[:len(audio.samples)]
+            if audio.channels == 1:
+                values = values.mean(axis=1, keepdims=True)
+            stems[name] = audio.with_samples(
+                np.clip(values * scale, limits.min, limits.max).astype(audio.samples.dtype), f"_{name}"
+            )
+        return stems
+
+    def separate(self, source):
+        """
+        Separa uma entrada (Path ou AudioBuffer) em memória.
+        Retorna {'accompaniment': AudioBuffer, 'vocals': AudioBuffer, 'method': ...} ou {} em erro
+        """
+        try:
+            audio = self._load(source)
+            key = self._cache_key(audio)
+            cached = self.cache.get(key) if key else None
+            if cached:
+                stems = {name: audio.with_samples(AudioBuffer.from_wav(path).samples, f"_{name}")
+                         for name, path in cached.items()}
+            else:
+                self.logger.info(f"🎶 Separando voz e acompanhamento (Spleeter): {audio.name}")
+                stems = self._separate_buffer(audio)
+                if key:
+                    self.cache.put(key, stems, SPLEETER_MODEL, audio.name)
+
+            stems['method'] = 'spleeter_2stems'
+            return stems
+
+        except Exception as e:
+            self.logger.error(f"❌ Erro na separação com Spleeter: {e}")
+            return {}
+
+    def separate_batch(self, sources: list) -> list:
+        """Separa várias entradas com o mesmo modelo carregado; um resultado por entrada"""
+        self.logger.info(f"🎶 Separação em lote (Spleeter): {len(sources)} entradas")
+        return [self.separate(source) for source in sources]
+
+    def save_melody(self, accompaniment: AudioBuffer, output_dir: Path) -> Path:
+        """
+        Grava o acompanhamento como song_<n>.wav. O nome é reservado com os.link,
+        que falha se o arquivo já existir, então processos concorrentes nunca
+        sobrescrevem a mesma melodia. Em sistemas de arquivos sem hard links o
+        nome é reservado criando o arquivo com O_EXCL e o conteúdo é copiado.
+        """
+        output_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = accompaniment.export(output_dir / f".song_{uuid.uuid4().hex}.tmp")
+        try:
+            index = len(list(output_dir.glob("song_*.wav")))
+            use_link = True
+            while True:
+                candidate = output_dir / f"song_{index}.wav"
+                try:
+                    if use_link:
+                        os.link(temp_path, candidate)
+                    else:
+                        self._copy_exclusive(temp_path, candidate)
+                    return candidate
+                except FileExistsError:
+                    index += 1
+                except OSError as e:
+                    if not use_link or e.errno not in _NO_LINK_ERRNOS:
+                        raise
+                    self.logger.warning(f"⚠️ Hard link indisponível em {output_dir}, usando O_EXCL: {e}")
+                    use_link = False
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _copy_exclusive(source: Path, target: Path):
+        """Cria `target` só se ainda não existir (FileExistsError caso contrário) e copia `source` para ele"""
+        fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            with os.fdopen(fd, 'wb') as out, open(source, 'rb') as src:
+                shutil.copyfileobj(src, out)
+        except Exception:
+            target.unlink(missing_ok=True)
+            raise
+
+    def extract_melodies(self, sources: list, output_dir: Path = Path("files/songs/wav")) -> list:
+        """Separa em lote e grava só os acompanhamentos (melodias); retorna os paths gravados"""
+        saved = []
+        for result in self.separate_batch(sources):
+            if result.get('accompaniment') is None:
+                continue
+            melody_path = self.save_melody(result['accompaniment'], output_dir)
+            self.logger.info(f"✅ Melodia salva como: {melody_path.name}")
+            saved.append(melody_path)
+        return saved
+
+
+def extrador_de_melodias(audio_file: Path, output_melody_path: Path = Path("files/songs/wav")):
+    # Entrada: arquivo de áudio original
+    # Saída: arquivos de melodia na pasta files/songs/wav
+    saved = MelodyExtractor().extract_melodies([Path(audio_file)], output_melody_path)
+    return output_melody_path if saved else None
+
 
 # Exemplo de uso
 if __name__ == "__main__":
-    resultado = extrador_de_melodias()
-    if resultado:
-        print(f"🎵 Músicas disponíveis em: {resultado}")
\ No newline at end of file
+    import sys
+    resultado = MelodyExtractor().extract_melodies([Path(arg) for arg in sys.argv[1:]])
+    for melodia in resultado:
+        print(f"🎵 Melodia disponível em: {melodia}")
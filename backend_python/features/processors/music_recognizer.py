@@ -1,46 +1,81 @@
 import asyncio
+import numpy as np
 from shazamio import Shazam
-from pydub import AudioSegment, silence
 from pathlib import Path
 from core.logger import Logger
 from core.config import Config
+from core.cancellation import check_cancelled
 from datetime import datetime
+from features.dsp.buffer import AudioBuffer
+from features.dsp.parallel import SharedMemoryDSPExecutor
+from features.dsp.silence import SilenceAnalyzer
+from features.dsp.stream_stats import StreamStats, StreamStatsAccumulator
+from features.dsp.correlation import fingerprint, FINGERPRINT_WINDOW_MS
+from utils.wav_io import read_wav_info, read_frames, iter_frames
 
 class MusicRecognizer:
     def __init__(self):
         self.shazam = Shazam()
         self.config = Config()
         self.logger = Logger()
+        self.executor = SharedMemoryDSPExecutor()
     
-    async def recognize_song(self, audio_path: Path):
-        """Reconhece uma música usando Shazam e retorna metadados completos"""
+    async def recognize_song(self, audio_path: Path, raise_errors: bool = False):
+        """
+        Reconhece uma música usando Shazam e retorna metadados completos.
+        None é "sem música"; falhas (erro ou timeout do Shazam) também viram None,
+        a menos que raise_errors, quando a exceção é propagada.
+        """
         try:
             if not audio_path.exists():
                 self.logger.error(f"Arquivo não encontrado: {audio_path}")
                 return None
             
             self.logger.info(f"Reconhecendo música: {audio_path}")
-            result = await self.shazam.recognize(str(audio_path))
+            return await self._recognize(str(audio_path), audio_path.name)
             
-            if result and 'track' in result:
-                track = result['track']
-                title = track.get('title', 'Desconhecido')
-                artist = track.get('subtitle', 'Desconhecido')
-                
-                self.logger.info(f"Música reconhecida: {artist} - {title}")
-                
-                # Extrai metadados completos
-                metadata = self._extract_complete_metadata(result, audio_path)
-                return metadata
-            
-            self.logger.warning(f"Música não reconhecida: {audio_path}")
+        except Exception as e:
+            if not isinstance(e, asyncio.TimeoutError):  # o timeout já foi registrado em _recognize
+                self.logger.error(f"Erro no reconhecimento Shazam: {e}")
+            if raise_errors:
+                raise
             return None
+    
+    async def recognize_bytes(self, wav_data: bytes, audio_name: str, raise_errors: bool = False):
+        """Reconhece uma música a partir de um WAV em memória (falhas como em recognize_song)"""
+        try:
+            self.logger.info(f"Reconhecendo trecho em memória: {audio_name}")
+            return await self._recognize(wav_data, audio_name)
             
         except Exception as e:
-            self.logger.error(f"Erro no reconhecimento Shazam: {e}")
+            if not isinstance(e, asyncio.TimeoutError):  # o timeout já foi registrado em _recognize
+                self.logger.error(f"Erro no reconhecimento Shazam: {e}")
+            if raise_errors:
+                raise
             return None
     
-    def _extract_complete_metadata(self, shazam_result, audio_path):
+    async def _recognize(self, source, audio_name: str):
+        """Envia o áudio (path ou bytes) ao Shazam e extrai os metadados"""
+        try:
+            result = await asyncio.wait_for(self.shazam.recognize(source), self.config.SHAZAM_TIMEOUT or None)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"⏰ Shazam não respondeu em {self.config.SHAZAM_TIMEOUT:.0f}s: {audio_name}")
+            raise
+        
+        if result and 'track' in result:
+            track = result['track']
+            title = track.get('title', 'Desconhecido')
+            artist = track.get('subtitle', 'Desconhecido')
+            
+            self.logger.info(f"Música reconhecida: {artist} - {title}")
+            
+            # Extrai metadados completos
+            return self._extract_complete_metadata(result, audio_name)
+        
+        self.logger.warning(f"Música não reconhecida: {audio_name}")
+        return None
+    
+    def _extract_complete_metadata(self, shazam_result, audio_name: str):
         """Extrai metadados completos do resultado do Shazam"""
         track = shazam_result.get('track', {})
         matches = shazam_result.get('matches', [])
@@ -50,7 +85,7 @@ class MusicRecognizer:
             'title': track.get('title', 'Desconhecido'),
             'artist': track.get('subtitle', 'Desconhecido'),
             'shazam_data': shazam_result,
-            'audio_file': audio_path.name,
+            'audio_file': audio_name,
             'recognition_time': datetime.now().isoformat()
         }
         
@@ -114,60 +149,231 @@ class MusicRecognizer:
         self.logger.info(f"Metadados extraídos: {metadata['artist']} - {metadata['title']} (ISRC: {metadata.get('isrc', 'N/A')})")
         return metadata
     
-    def split_audio_segments(self, audio_path: Path, min_duration: int = None):
-        """Divide áudio em segmentos baseado em silêncio - OTIMIZADO"""
+    def valid_ranges(self, analyzer: SilenceAnalyzer):
+        """Segmentos (i, início, fim) em ms que vão ao Shazam: trechos com som de mais de 10s"""
+        # Configurações mais agressivas para processamento mais rápido
+        ranges = analyzer.split_ranges(
+            silence_thresh=self.config.SILENCE_THRESHOLD,
+            min_silence_len=2000,  # Aumenta para 2 segundos (mais rápido)
+            keep_silence=1000      # Reduz para 1 segundo entre segmentos
+        )
+        
+        self.logger.info(f"Áudio dividido em {len(ranges)} segmentos brutos")
+        
+        # Aumenta o mínimo para 10 segundos para evitar segmentos muito curtos
+        valid = [(i, start, end) for i, (start, end) in enumerate(ranges, start=1) if end - start > 10000]
+        self.logger.info(f"{len(valid)} segmentos válidos")
+        return valid
+    
+    def detect_segment_ranges(self, source):
+        """
+        Faixas [início, fim] em ms delimitadas por silêncio, para Path ou AudioBuffer.
+        Arquivos são lidos em blocos: só a energia por ms fica em memória.
+        """
         try:
-            if min_duration is None:
-                min_duration = self.config.MIN_SEGMENT_DURATION
+            name = source.name if isinstance(source, AudioBuffer) else source.stem
+            self.logger.info(f"Dividindo áudio em segmentos: {name}")
             
-            self.logger.info(f"Dividindo áudio em segmentos: {audio_path.name}")
-            audio = AudioSegment.from_wav(str(audio_path))
+            if isinstance(source, AudioBuffer):
+                analyzer = self.executor.analyze_silence(source)
+            else:
+                info = read_wav_info(source)
+                analyzer = SilenceAnalyzer(info.frame_rate, info.channels, info.sample_width)
+                for frames in iter_frames(source, info, self.config.DSP_BLOCK_FRAMES):
+                    analyzer.feed(AudioBuffer.from_frames(frames, info.channels, info.sample_width, info.frame_rate).samples)
             
-            # Configurações mais agressivas para processamento mais rápido
-            segments = silence.split_on_silence(
-                audio,
-                silence_thresh=self.config.SILENCE_THRESHOLD,
-                min_silence_len=2000,  # Aumenta para 2 segundos (mais rápido)
-                keep_silence=1000      # Reduz para 1 segundo entre segmentos
-            )
-            
-            self.logger.info(f"Áudio dividido em {len(segments)} segmentos brutos")
-            
-            segment_files = []
-            for i, segment in enumerate(segments, start=1):
-                # Aumenta o mínimo para 10 segundos para evitar segmentos muito curtos
-                if len(segment) > 10000:  # 10 segundos mínimo
-                    output_path = self.config.PASTA_SAIDA / f"{audio_path.stem}_segment_{i}.wav"
-                    segment.export(str(output_path), format="wav")
-                    segment_files.append(output_path)
-                    self.logger.info(f"Segmento exportado: {output_path.name} ({len(segment)/1000:.1f}s)")
-            
-            self.logger.info(f"Exportados {len(segment_files)} segmentos válidos")
-            return segment_files
+            return self.valid_ranges(analyzer)
             
         except Exception as e:
             self.logger.error(f"Erro na divisão de áudio: {e}")
             return []
     
-    async def recognize_audio_with_segments(self, audio_path: Path):
-        """Reconhece áudio completo e seus segmentos"""
+    def analyze_stream(self, audio_path: Path):
+        """
+        Uma leitura do WAV para segmentos, estatísticas do planejador (nível,
+        pico, correlação entre canais) e a impressão digital usada para achar
+        tracks duplicadas. Retorna (ranges, StreamStats, fingerprint).
+        """
+        try:
+            self.logger.info(f"Analisando stream: {audio_path.stem}")
+            info = read_wav_info(audio_path)
+            analyzer = SilenceAnalyzer(info.frame_rate, info.channels, info.sample_width)
+            stats = StreamStatsAccumulator(info.frame_rate, info.channels, info.sample_width)
+            for frames in iter_frames(audio_path, info, self.config.DSP_BLOCK_FRAMES):
+                samples = AudioBuffer.from_frames(frames, info.channels, info.sample_width, info.frame_rate).samples
+                analyzer.feed(samples)
+                stats.feed(samples)
+            
+            return self.valid_ranges(analyzer), stats.result(), fingerprint(analyzer.envelope(FINGERPRINT_WINDOW_MS))
+            
+        except Exception as e:
+            self.logger.error(f"Erro na análise do stream: {e}")
+            return [], StreamStats(0, -120.0, -120.0, 1.0), np.zeros(0, np.float32)
+    
+    def split_buffer_segments(self, audio: AudioBuffer):
+        """Divide o áudio em memória em segmentos baseado em silêncio (views, sem cópia)"""
+        return [
+            audio.slice_ms(start, end - start, f"{audio.name}_segment_{i}")
+            for i, start, end in self.detect_segment_ranges(audio)
+        ]
+    
+    def split_audio_segments(self, audio_path: Path):
+        """Divide áudio em segmentos baseado em silêncio e exporta cada um como WAV"""
+        _, _, read = self._excerpt_reader(audio_path)
+        segment_files = []
+        for i, start, end in self.detect_segment_ranges(audio_path):
+            output_path = self.config.PASTA_SAIDA / f"{audio_path.stem}_segment_{i}.wav"
+            segment_files.append(read(start, end - start).export(output_path))
+            self.logger.info(f"Segmento exportado: {output_path.name} ({(end - start)/1000:.1f}s)")
+        return segment_files
+    
+    def _excerpt_reader(self, source):
+        """Retorna (nome, duração em ms, leitor de trechos) para um Path ou AudioBuffer"""
+        if isinstance(source, AudioBuffer):
+            return source.name, source.duration_ms, source.slice_ms
+        
+        info = read_wav_info(source)
+        
+        def read(start_ms, duration_ms):
+            frames = read_frames(
+                source, info,
+                int(start_ms * info.frame_rate / 1000),
+                int(duration_ms * info.frame_rate / 1000)
+            )
+            return AudioBuffer.from_frames(frames, info.channels, info.sample_width, info.frame_rate, source.stem)
+        
+        return source.stem, int(info.n_frames * 1000 / info.frame_rate), read
+    
+    def _select_excerpts(self, read, duration_ms: int):
+        """Escolhe as janelas representativas (início, meio, mais alta) do áudio"""
+        excerpt_ms = min(self.config.RECOGNITION_EXCERPT_DURATION, duration_ms)
+        windows = []
+        
+        for name in self.config.RECOGNITION_EXCERPTS:
+            if name == 'start':
+                start_ms = 0
+            elif name == 'middle':
+                start_ms = (duration_ms - excerpt_ms) // 2
+            elif name == 'loudest':
+                start_ms = self._find_loudest_window(read, duration_ms, excerpt_ms)
+            else:
+                self.logger.warning(f"Trecho de reconhecimento desconhecido: {name}")
+                continue
+            
+            # Evita mandar ao Shazam duas janelas praticamente iguais
+            if any(abs(start_ms - other) < excerpt_ms // 2 for _, other in windows):
+                continue
+            windows.append((name, start_ms))
+        
+        return windows, excerpt_ms
+    
+    def _find_loudest_window(self, read, duration_ms: int, excerpt_ms: int):
+        """Amostra um número fixo de pontos do áudio e retorna o início da janela mais alta"""
+        probes = max(1, self.config.LOUDEST_SCAN_PROBES)
+        probe_ms = 1000  # 1s por sonda
+        
+        last_start = max(0, duration_ms - excerpt_ms)
+        best_start, best_rms = 0, -1.0
+        for i in range(probes):
+            start_ms = last_start * i // max(1, probes - 1)
+            center_ms = start_ms + excerpt_ms // 2
+            samples = read(max(0, center_ms - probe_ms // 2), probe_ms).samples.astype(np.float64)
+            if samples.size == 0:
+                continue
+            rms = float(np.sqrt(np.mean(samples * samples)))
+            if rms > best_rms:
+                best_start, best_rms = start_ms, rms
+        
+        return best_start
+    
+    async def _recognize_once(self, checkpoint, segment_key: str, recognize):
+        """
+        Executa recognize() (que chama o Shazam e propaga falhas) uma vez por segmento:
+        com checkpoint, a resposta do Shazam, inclusive "sem música", é gravada e
+        reaproveitada na retomada. Uma falha conta como "sem música" nesta execução,
+        mas não é gravada: o segmento volta ao Shazam na retomada.
+        """
+        check_cancelled()
+        if checkpoint is not None and checkpoint.has_segment(segment_key):
+            return checkpoint.get_segment(segment_key)
+        try:
+            result = await recognize()
+        except Exception:
+            return None
+        if checkpoint is not None:
+            checkpoint.put_segment(segment_key, result)
+        return result
+    
+    async def recognize_excerpts(self, source, checkpoint=None):
+        """Reconhece trechos representativos do áudio (Path ou AudioBuffer) em tempo constante"""
+        results = []
+        seen_tracks = set()
+        
+        name, duration_ms, read = self._excerpt_reader(source)
+        windows, excerpt_ms = self._select_excerpts(read, duration_ms)
+        self.logger.info(f"Reconhecendo {len(windows)} trechos de {excerpt_ms/1000:.1f}s: {name}")
+        
+        for excerpt, start_ms in windows:
+            recognition = await self._recognize_once(
+                checkpoint, f"{name}:excerpt:{start_ms}:{excerpt_ms}",
+                lambda: self.recognize_bytes(read(start_ms, excerpt_ms).to_wav_bytes(), f"{name}_{excerpt}.wav", raise_errors=True)
+            )
+            if not recognition:
+                continue
+            
+            track_key = (recognition['title'], recognition['artist'])
+            if track_key in seen_tracks:
+                continue
+            seen_tracks.add(track_key)
+            
+            recognition['segment_type'] = 'excerpt'
+            recognition['excerpt'] = excerpt
+            recognition['segment_start'] = start_ms
+            recognition['segment_duration'] = excerpt_ms
+            results.append(recognition)
+        
+        return results
+    
+    async def recognize_audio_with_segments(self, source, segment_ranges=None, checkpoint=None):
+        """
+        Reconhece áudio completo (ou trechos representativos) e seus segmentos.
+        Aceita um Path de WAV ou um AudioBuffer já em memória.
+        segment_ranges: [(i, início, fim)] já calculados (ex.: pela etapa de análise do pipeline)
+        checkpoint: JobCheckpoint onde cada reconhecimento é gravado (retomada após queda)
+        """
         results = []
+        name, duration_ms, _ = self._excerpt_reader(source)
+        
+        if duration_ms <= self.config.FULL_RECOGNITION_MAX_DURATION or not self.config.RECOGNITION_EXCERPTS:
+            # Reconhecimento do áudio completo (arquivos curtos)
+            if isinstance(source, AudioBuffer):
+                recognize = lambda: self.recognize_bytes(source.to_wav_bytes(), f"{name}.wav", raise_errors=True)
+            else:
+                recognize = lambda: self.recognize_song(source, raise_errors=True)
+            full_recognition = await self._recognize_once(checkpoint, f"{name}:full", recognize)
+            if full_recognition:
+                full_recognition['segment_type'] = 'full'
+                full_recognition['segment_duration'] = duration_ms
+                results.append(full_recognition)
+        else:
+            # Arquivos longos: trechos representativos no lugar da passada completa
+            results.extend(await self.recognize_excerpts(source, checkpoint))
         
-        # Reconhecimento do áudio completo
-        full_recognition = await self.recognize_song(audio_path)
-        if full_recognition:
-            full_recognition['segment_type'] = 'full'
-            full_recognition['segment_duration'] = len(AudioSegment.from_wav(str(audio_path)))
-            results.append(full_recognition)
-        
-        # Reconhecimento por segmentos
-        segments = self.split_audio_segments(audio_path)
-        for segment_path in segments:
-            segment_recognition = await self.recognize_song(segment_path)
+        # Reconhecimento por segmentos: cada trecho é lido só quando vai ao Shazam
+        _, _, read = self._excerpt_reader(source)
+        if segment_ranges is None:
+            segment_ranges = self.detect_segment_ranges(source)
+        for i, start_ms, end_ms in segment_ranges:
+            segment_name = f"{name}_segment_{i}.wav"
+            segment_recognition = await self._recognize_once(
+                checkpoint, f"{name}:segment:{start_ms}:{end_ms}",
+                lambda: self.recognize_bytes(read(start_ms, end_ms - start_ms).to_wav_bytes(), segment_name, raise_errors=True)
+            )
             if segment_recognition:
                 segment_recognition['segment_type'] = 'partial'
-                segment_recognition['segment_file'] = segment_path.name
-                segment_recognition['segment_duration'] = len(AudioSegment.from_wav(str(segment_path)))
+                segment_recognition['segment_file'] = segment_name
+                segment_recognition['segment_start'] = start_ms
+                segment_recognition['segment_duration'] = end_ms - start_ms
                 results.append(segment_recognition)
         
-        return results
\ No newline at end of file
+        return results
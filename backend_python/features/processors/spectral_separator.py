@@ -0,0 +1,111 @@
+import numpy as np
+from pathlib import Path
+from core.logger import Logger
+from core.config import Config
+from features.dsp.buffer import AudioBuffer
+from features.dsp.hpss import HPSSMasker
+from utils.wav_io import read_wav_info, read_frames, WavWriter
+
+
+class SpectralSeparator:
+    """
+    Separação intermediária entre o LightSeparator (passa-faixa) e o Demucs:
+    HPSS por mediana do espectrograma com máscaras suaves, só com NumPy.
+    Processa em blocos de DSP_BLOCK_FRAMES, em memória ou a partir do disco.
+    """
+
+    METHOD = 'hpss_mask'
+
+    def __init__(self):
+        self.logger = Logger()
+        self.config = Config()
+
+    def _block_frames(self, masker: HPSSMasker) -> int:
+        return max(masker.hop, self.config.DSP_BLOCK_FRAMES // masker.hop * masker.hop)
+
+    def _separate_blocks(self, read, total_frames: int, frame_rate: int, stems):
+        """Gera {stem: float32} bloco a bloco; read(início, fim) devolve o trecho com zeros fora do sinal"""
+        masker = HPSSMasker(frame_rate)
+        context = masker.context
+        block_frames = self._block_frames(masker)
+
+        for start in range(0, total_frames, block_frames):
+            end = min(start + block_frames, total_frames)
+            segment = read(start - context, end + context)
+            yield masker.separate_segment(segment, end - start, stems)
+
+    @staticmethod
+    def _padded(samples: np.ndarray, start: int, end: int) -> np.ndarray:
+        """samples[start:end] completando com zeros o que cai fora do sinal"""
+        segment = np.zeros((end - start, samples.shape[1]), dtype=samples.dtype)
+        lo, hi = max(start, 0), min(end, len(samples))
+        if hi > lo:
+            segment[lo - start:hi - start] = samples[lo:hi]
+        return segment
+
+    @staticmethod
+    def _to_pcm(values: np.ndarray, dtype) -> np.ndarray:
+        limits = np.iinfo(dtype)
+        return np.trunc(np.clip(values, limits.min, limits.max)).astype(dtype)
+
+    def separate_buffer(self, audio: AudioBuffer, stems=HPSSMasker.STEMS):
+        """Separa um buffer em memória; retorna {stem: AudioBuffer, 'method': ...}"""
+        try:
+            self.logger.info(f"🎚️ Separação espectral (HPSS): {audio.name}")
+
+            parts = {stem: [] for stem in stems}
+            read = lambda start, end: self._padded(audio.samples, start, end)
+            for block in self._separate_blocks(read, len(audio.samples), audio.frame_rate, stems):
+                for stem, values in block.items():
+                    parts[stem].append(self._to_pcm(values, audio.samples.dtype))
+
+            result = {
+                stem: audio.with_samples(np.concatenate(blocks) if blocks else audio.samples[:0], f"_{stem}_hpss")
+                for stem, blocks in parts.items()
+            }
+            result['method'] = self.METHOD
+
+            self.logger.info(f"✅ Separação espectral concluída: {', '.join(stems)}")
+            return result
+
+        except Exception as e:
+            self.logger.error(f"❌ Erro na separação espectral: {e}")
+            return {}
+
+    def separate_audio(self, audio_path: Path, stems=HPSSMasker.STEMS):
+        """
+        Versão em arquivo: lê blocos do disco e grava <nome>_<stem>_hpss.wav
+        incrementalmente (memória limitada ao bloco)
+        """
+        writers = {}
+        try:
+            self.logger.info(f"🎚️ Separação espectral em blocos (HPSS): {audio_path.name}")
+
+            info = read_wav_info(audio_path)
+            dtype = AudioBuffer.from_frames(b'', info.channels, info.sample_width, info.frame_rate).samples.dtype
+
+            def read(start, end):
+                frames = read_frames(audio_path, info, max(start, 0), end - max(start, 0))
+                samples = AudioBuffer.from_frames(frames, info.channels, info.sample_width, info.frame_rate).samples
+                return self._padded(samples, start - max(start, 0), end - max(start, 0))
+
+            outputs = {stem: self.config.PASTA_SAIDA / f"{audio_path.stem}_{stem}_hpss.wav" for stem in stems}
+            for stem, output_path in outputs.items():
+                writers[stem] = WavWriter(output_path, info.channels, info.sample_width, info.frame_rate)
+
+            for block in self._separate_blocks(read, info.n_frames, info.frame_rate, stems):
+                for stem, values in block.items():
+                    writers[stem].write(self._to_pcm(values, dtype).tobytes())
+
+            self.logger.info(f"✅ Separação espectral concluída: {', '.join(p.name for p in outputs.values())}")
+            result = dict(outputs)
+            result['method'] = self.METHOD
+            return result
+
+        except Exception as e:
+            self.logger.error(f"❌ Erro na separação espectral: {e}")
+            return {}
+
+        finally:
+            for writer in writers.values():
+                writer.close()
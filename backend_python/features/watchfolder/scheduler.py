@@ -1,99 +1,159 @@
 import asyncio
 from pathlib import Path
+from core.cancellation import JobCancelled
 from core.config import Config
 from core.logger import Logger
 from core.file_processor import MXFProcessor
-from features.workflows.unmixed_audio import UnmixedAudioWorkflow
-from features.workflows.mixed_audio import MixedAudioWorkflow
+from core.job_queue import JobQueue, priority_level
+from features.pipeline.mxf_pipeline import MXFPipeline
 from features.processors.edl_generator import EDLGenerator
+from features.watchfolder.watcher import FileWatcher
+from utils.helpers import move_file
 
 class WatchFolderScheduler:
     def __init__(self):
         self.config = Config()
         self.logger = Logger()
-        self.workflows = [
-            UnmixedAudioWorkflow(),
-            MixedAudioWorkflow()
-        ]
+        self.pipeline = MXFPipeline()
         self.edl_generator = EDLGenerator()
-    
+        self.processor = MXFProcessor()
+
+    def _input_dirs(self):
+        """Pasta de entrada e subpastas de WATCHFOLDER_PRIORITY_DIRS, com a prioridade de cada uma"""
+        dirs = [(self.config.WATCHFOLDER_INPUT, self.config.WATCHFOLDER_PRIORITY)]
+        dirs += [(self.config.WATCHFOLDER_INPUT / name, priority)
+                 for name, priority in self.config.WATCHFOLDER_PRIORITY_DIRS.items()]
+        return dirs
+
+    async def _durations(self, paths: list) -> dict:
+        durations = await asyncio.gather(*(asyncio.to_thread(self.processor.get_duration, path) for path in paths))
+        return dict(zip(paths, durations))
+
     async def process_pending_files(self):
-        """Processa todos os MXFs na pasta de entrada UMA VEZ"""
+        """
+        Processa todos os MXFs das pastas de entrada UMA VEZ, por prioridade da
+        pasta e, dentro dela, os mais curtos primeiro.
+        Até SCHEDULER_MAX_IN_FLIGHT arquivos ficam em processamento ao mesmo tempo;
+        a falha de um arquivo não afeta os outros.
+        """
         try:
-            mxf_files = list(self.config.WATCHFOLDER_INPUT.glob("*.mxf"))
-            
+            priorities = {path: priority for directory, priority in self._input_dirs()
+                          for path in sorted(directory.glob("*.mxf"))}
+            durations = await self._durations(list(priorities))
+            mxf_files = sorted(priorities, key=lambda path: (
+                priority_level(priorities[path]),
+                float('inf') if durations[path] is None else durations[path]
+            ))
+
             if not mxf_files:
                 self.logger.info("📭 Nenhum arquivo MXF encontrado para processamento")
-                return
-            
-            self.logger.info(f"📥 Encontrados {len(mxf_files)} arquivos MXF para processar")
-            
-            processed_count = 0
-            for mxf_path in mxf_files:
-                try:
-                    success = await self.process_single_file(mxf_path)
-                    if success:
-                        processed_count += 1
-                    else:
-                        self.logger.error(f"❌ Falha no processamento: {mxf_path.name}")
-                        
-                except Exception as e:
-                    self.logger.error(f"❌ Erro processando {mxf_path.name}: {e}")
-                    # Move para pasta de erro
-                    error_path = self.config.WATCHFOLDER_INPUT / "error" / mxf_path.name
-                    error_path.parent.mkdir(exist_ok=True)
-                    mxf_path.rename(error_path)
-            
+                return 0
+
+            max_in_flight = self.config.SCHEDULER_MAX_IN_FLIGHT
+            self.logger.info(f"📥 Encontrados {len(mxf_files)} arquivos MXF para processar "
+                             f"({max_in_flight} em paralelo)")
+
+            finalized = []
+            await self.pipeline.run(mxf_files, lambda item: self._finalize(item, finalized), max_in_flight)
+            processed_count = len(finalized)
+
             self.logger.info(f"✅ Processamento concluído: {processed_count}/{len(mxf_files)} arquivos processados com sucesso")
             return processed_count
-            
+
         except Exception as e:
             self.logger.error(f"💥 Erro no processamento em lote: {e}")
             return 0
-    
+
+    async def watch(self):
+        """
+        Modo residente: processa os MXFs que já estão nas entradas e cada novo arquivo
+        assim que ele termina de ser copiado, sem esperar o próximo lote.
+        Os arquivos prontos esperam numa JobQueue (prioridade da pasta, mais curtos
+        primeiro, com envelhecimento); o próximo só é escolhido quando há vaga.
+        """
+        queue = JobQueue()
+        arrived = asyncio.Event()
+        watchers, started = {}, {}
+
+        async def collect(directory: Path, priority: str):
+            watcher = FileWatcher(directory)
+            async for path in watcher.ready_files():
+                watchers[path] = watcher
+                duration = await asyncio.to_thread(self.processor.get_duration, path)
+                queue.put(path, priority, duration)
+                arrived.set()
+
+        collectors = [asyncio.create_task(collect(directory, priority)) for directory, priority in self._input_dirs()]
+
+        async def scheduled():
+            while True:
+                job = queue.pop()
+                if job is not None:
+                    started[job.job_id] = job
+                    yield job.job_id
+                    continue
+                arrived.clear()
+                waiter = asyncio.create_task(arrived.wait())
+                done, _ = await asyncio.wait({waiter, *collectors}, return_when=asyncio.FIRST_COMPLETED)
+                if waiter not in done:
+                    waiter.cancel()
+                    for task in done:
+                        task.result()
+                    return
+
+        async def finalize(item):
+            mxf_path = item.value['mxf_path']
+            try:
+                await self._finalize(item)
+            finally:
+                watchers.pop(mxf_path).done(mxf_path)
+                job = started.pop(mxf_path)
+                queue.finished(job)
+                stats = queue.metrics()[job.priority]
+                self.logger.info(f"⏱️ Prioridade {job.priority}: latência média {stats['avg_latency_seconds']}s,"
+                                 f" p95 {stats['p95_latency_seconds']}s ({stats['finished']} arquivos)")
+
+        self.logger.info(f"🔁 Modo contínuo ativo ({self.config.SCHEDULER_MAX_IN_FLIGHT} arquivos em paralelo)")
+        try:
+            await self.pipeline.run(scheduled(), finalize, self.config.SCHEDULER_MAX_IN_FLIGHT)
+        finally:
+            for task in collectors:
+                task.cancel()
+
     async def process_single_file(self, mxf_path: Path):
         """Processa um único arquivo MXF"""
+        finalized = []
+        await self.pipeline.run([mxf_path], lambda item: self._finalize(item, finalized))
+        return bool(finalized)
+
+    async def _finalize(self, item, finalized: list = None):
+        """
+        Chamado um arquivo por vez, na ordem de conclusão. O EDL é gravado de forma
+        atômica antes de o MXF sair da entrada: se o processo cair no meio, o MXF
+        continua na entrada e é reprocessado na próxima execução.
+        """
+        mxf_path = item.value['mxf_path']
         try:
-            self.logger.info(f"🔄 Processando arquivo: {mxf_path.name}")
-            
-            processor = MXFProcessor()
-            streams = processor.get_streams(mxf_path)
-            
-            if not streams:
-                self.logger.warning(f"⚠️ Nenhum stream encontrado em {mxf_path.name}")
-                return False
-            
-            # Encontra workflow apropriado
-            workflow = None
-            for wf in self.workflows:
-                if wf.can_handle(streams):
-                    workflow = wf
-                    break
-            
-            if not workflow:
-                self.logger.warning(f"⚠️ Nenhum workflow adequado para {mxf_path.name}")
-                return False
-            
-            self.logger.info(f"🔧 Usando workflow: {workflow.get_workflow_name()}")
-            
-            # Processa o arquivo
-            results = await workflow.process(mxf_path)
-            
-            # Gera EDL
-            edl_content = self.edl_generator.generate_edl(results, mxf_path.name)
-            
-            # Salva EDL
-            edl_filename = f"{mxf_path.stem}.edl"
-            edl_path = self.config.WATCHFOLDER_OUTPUT / edl_filename
-            self.edl_generator.save_edl(edl_content, edl_path)
-            
-            # Move MXF processado
-            processed_path = self.config.WATCHFOLDER_PROCESSED / mxf_path.name
-            mxf_path.rename(processed_path)
+            if not item.ok:
+                raise item.error
+            await asyncio.to_thread(self._write_edl, mxf_path, item.value['results'])
+            processed_path = await asyncio.to_thread(move_file, mxf_path, self.config.WATCHFOLDER_PROCESSED)
+            self.pipeline.complete(item)
+            item.value['finalized'] = True
+            if finalized is not None:
+                finalized.append(item.key)
             self.logger.info(f"✅ Arquivo processado e movido: {processed_path}")
-            
-            return True
-            
-        except Exception as e:
+
+        except (Exception, JobCancelled) as e:
             self.logger.error(f"❌ Erro processando {mxf_path.name}: {e}")
-            return False
\ No newline at end of file
+            try:
+                error_path = await asyncio.to_thread(move_file, mxf_path, self.config.WATCHFOLDER_ERROR)
+                self.logger.info(f"📦 Arquivo movido para erro: {error_path}")
+            except Exception as move_error:
+                self.logger.error(f"❌ Não foi possível mover {mxf_path.name} para erro: {move_error}")
+
+    def _write_edl(self, mxf_path: Path, results):
+        edl_content = self.edl_generator.generate_edl(results, mxf_path.name)
+        edl_path = self.config.WATCHFOLDER_OUTPUT / f"{mxf_path.stem}.edl"
+        if not self.edl_generator.save_edl(edl_content, edl_path):
+            raise IOError(f"Falha ao salvar EDL: {edl_path}")
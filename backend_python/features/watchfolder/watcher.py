@@ -0,0 +1,197 @@
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+from pathlib import Path
+from core.config import Config
+from core.logger import Logger
+
+# Constantes de <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class _InotifyBackend:
+    """Eventos de arquivo fechado após escrita / movido para a pasta via inotify (ctypes, só Linux)"""
+
+    def __init__(self, directory: Path):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError("libc não encontrada")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify indisponível nesta plataforma")
+
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch falhou para {directory}")
+
+        self.directory = directory
+        self._queue = asyncio.Queue()
+        self._loop = None
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b'\0')
+            offset += _EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                # Eventos perdidos: quem consome refaz a varredura da pasta
+                self._queue.put_nowait(None)
+            elif name:
+                self._queue.put_nowait(self.directory / os.fsdecode(name))
+
+    async def changes(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self.fd, self._on_readable)
+        try:
+            while True:
+                yield await self._queue.get()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.fd is None:
+            return
+        if self._loop is not None:
+            self._loop.remove_reader(self.fd)
+        os.close(self.fd)
+        self.fd = None
+
+
+class _PollingBackend:
+    """Fallback: varre a pasta a cada intervalo (qualquer SO, montagens de rede)"""
+
+    def __init__(self, directory: Path, interval: float):
+        self.directory = directory
+        self.interval = interval
+
+    async def changes(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            yield None
+
+    def close(self):
+        pass
+
+
+class FileWatcher:
+    """
+    Observa uma pasta e entrega cada arquivo novo quando ele para de crescer.
+
+    Usa inotify (IN_CLOSE_WRITE/IN_MOVED_TO) quando disponível e cai para
+    varredura periódica caso contrário (WATCH_BACKEND=auto|inotify|polling).
+    Um arquivo só é entregue depois de tamanho e mtime ficarem iguais por
+    WATCH_STABLE_SECONDS: cópias lentas (SMB, FTP) não começam pela metade.
+    Cada arquivo é entregue uma vez até quem consome chamar done(path).
+    """
+
+    def __init__(self, directory: Path, pattern: str = "*.mxf"):
+        self.config = Config()
+        self.logger = Logger()
+        self.directory = Path(directory)
+        self.pattern = pattern
+        self._pending = set()
+        self._backend = self._make_backend()
+
+    def _make_backend(self):
+        backend = self.config.WATCH_BACKEND
+        if backend in ('auto', 'inotify'):
+            try:
+                watcher = _InotifyBackend(self.directory)
+                self.logger.info(f"👀 Observando {self.directory} via inotify")
+                return watcher
+            except (OSError, AttributeError) as e:
+                if backend == 'inotify':
+                    raise
+                self.logger.warning(f"⚠️ inotify indisponível ({e}), usando varredura periódica")
+        self.logger.info(f"👀 Observando {self.directory} a cada {self.config.WATCH_POLL_INTERVAL}s")
+        return _PollingBackend(self.directory, self.config.WATCH_POLL_INTERVAL)
+
+    def _matches(self, path: Path) -> bool:
+        return path.match(self.pattern) and path.parent == self.directory
+
+    def _scan(self):
+        return sorted(path for path in self.directory.glob(self.pattern) if path.is_file())
+
+    async def wait_until_stable(self, path: Path) -> bool:
+        """True quando o arquivo parou de crescer; False se ele sumiu"""
+        interval = min(self.config.WATCH_POLL_INTERVAL, self.config.WATCH_STABLE_SECONDS) or 1
+        last = None
+        stable_since = None
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                return False
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != last:
+                last, stable_since = current, loop.time()
+            elif loop.time() - stable_since >= self.config.WATCH_STABLE_SECONDS:
+                return True
+            await asyncio.sleep(interval)
+
+    def done(self, path: Path):
+        """Libera o arquivo para ser entregue de novo caso reapareça na pasta"""
+        self._pending.discard(Path(path))
+
+    async def ready_files(self):
+        """Gerador assíncrono infinito de arquivos estáveis (inclui os que já estavam na pasta)"""
+        ready = asyncio.Queue()
+        waiting = set()
+
+        async def settle(path: Path):
+            try:
+                if await self.wait_until_stable(path):
+                    await ready.put(path)
+                else:
+                    self._pending.discard(path)
+            finally:
+                waiting.discard(asyncio.current_task())
+
+        def track(paths):
+            for path in paths:
+                if path in self._pending or not self._matches(path):
+                    continue
+                self._pending.add(path)
+                waiting.add(asyncio.create_task(settle(path)))
+
+        async def listen():
+            async for path in self._backend.changes():
+                # None = varredura completa (polling ou overflow da fila do inotify)
+                track(self._scan() if path is None else [path])
+
+        track(self._scan())
+        listener = asyncio.create_task(listen())
+        try:
+            while True:
+                getter = asyncio.create_task(ready.get())
+                done, _ = await asyncio.wait({getter, listener}, return_when=asyncio.FIRST_COMPLETED)
+                if getter not in done:
+                    getter.cancel()
+                    listener.result()
+                    return
+                path = getter.result()
+                self.logger.info(f"📬 Arquivo pronto para processamento: {path.name}")
+                yield path
+        finally:
+            listener.cancel()
+            for pending_task in list(waiting):
+                pending_task.cancel()
+            self._backend.close()
@@ -0,0 +1,256 @@
+import threading
+import time
+from itertools import count
+from core.config import Config
+from core.logger import Logger
+from core.job_queue import PRIORITIES, DEFAULT_PRIORITY, priority_level
+
+
+class RedisStreamBackend:
+    """
+    Operações de Redis Streams usadas pela fila distribuída (XADD, XREADGROUP,
+    XACK, XAUTOCLAIM, XPENDING). O cliente redis só é importado aqui: quem
+    roda com JOB_BACKEND=local não precisa do pacote.
+    """
+
+    def __init__(self, url: str = None):
+        import redis
+        self.client = redis.Redis.from_url(url or Config().REDIS_URL, decode_responses=True)
+
+    def create_group(self, stream: str, group: str):
+        import redis
+        try:
+            self.client.xgroup_create(stream, group, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def add(self, stream: str, fields: dict) -> str:
+        return self.client.xadd(stream, {key: str(value) for key, value in fields.items()})
+
+    def read(self, streams: list, group: str, consumer: str, count: int = 1, block_ms: int = None) -> list:
+        """Mensagens novas [(stream, id, campos)]; block_ms None = não bloqueia"""
+        response = self.client.xreadgroup(group, consumer, {stream: '>' for stream in streams},
+                                          count=count, block=block_ms)
+        return [(stream, message_id, fields)
+                for stream, messages in response or [] for message_id, fields in messages]
+
+    def autoclaim(self, stream: str, group: str, consumer: str, min_idle_ms: int, count: int = 1) -> list:
+        """Mensagens pendentes paradas há min_idle_ms (consumidor caiu), agora deste consumidor"""
+        response = self.client.xautoclaim(stream, group, consumer, min_idle_ms, start_id='0-0', count=count)
+        return [(message_id, fields) for message_id, fields in response[1] if fields]
+
+    def touch(self, stream: str, group: str, consumer: str, message_id: str):
+        """Zera o tempo ocioso de uma mensagem em processamento (sem contar nova entrega)"""
+        self.client.xclaim(stream, group, consumer, 0, [message_id], justid=True)
+
+    def deliveries(self, stream: str, group: str, message_id: str) -> int:
+        pending = self.client.xpending_range(stream, group, min=message_id, max=message_id, count=1)
+        return pending[0]['times_delivered'] if pending else 0
+
+    def ack(self, stream: str, group: str, message_id: str):
+        self.client.xack(stream, group, message_id)
+
+    def length(self, stream: str) -> int:
+        return self.client.xlen(stream)
+
+    def pending(self, stream: str, group: str) -> int:
+        return self.client.xpending(stream, group)['pending']
+
+    def set_flag(self, key: str, ttl_seconds: int):
+        self.client.set(key, '1', ex=ttl_seconds)
+
+    def has_flag(self, key: str) -> bool:
+        return bool(self.client.exists(key))
+
+
+class FakeStreamBackend:
+    """
+    Implementação em memória com a mesma semântica de entrega do Redis Streams
+    (grupos, pendentes por consumidor, contagem de entregas, claim por tempo
+    ocioso), para testes e execução local sem Redis. Thread-safe.
+    """
+
+    def __init__(self):
+        self._ids = count(1)
+        self._streams = {}
+        # (stream, group) -> {'next': posição da próxima mensagem nova, 'pending': {id: [consumidor, entregue_em, entregas]}}
+        self._groups = {}
+        self._flags = {}
+        self._condition = threading.Condition()
+
+    def create_group(self, stream: str, group: str):
+        with self._condition:
+            self._streams.setdefault(stream, [])
+            self._groups.setdefault((stream, group), {'next': 0, 'pending': {}})
+
+    def add(self, stream: str, fields: dict) -> str:
+        with self._condition:
+            message_id = f"{int(time.time() * 1000)}-{next(self._ids)}"
+            self._streams.setdefault(stream, []).append((message_id, {key: str(value) for key, value in fields.items()}))
+            self._condition.notify_all()
+            return message_id
+
+    def _read_once(self, streams: list, group: str, consumer: str, count: int) -> list:
+        messages = []
+        for stream in streams:
+            state = self._groups[(stream, group)]
+            entries = self._streams[stream]
+            while state['next'] < len(entries) and len(messages) < count:
+                message_id, fields = entries[state['next']]
+                state['next'] += 1
+                state['pending'][message_id] = [consumer, time.monotonic(), 1]
+                messages.append((stream, message_id, dict(fields)))
+        return messages
+
+    def read(self, streams: list, group: str, consumer: str, count: int = 1, block_ms: int = None) -> list:
+        with self._condition:
+            messages = self._read_once(streams, group, consumer, count)
+            if messages or block_ms is None:
+                return messages
+            deadline = time.monotonic() + block_ms / 1000
+            while not messages and time.monotonic() < deadline:
+                self._condition.wait(deadline - time.monotonic())
+                messages = self._read_once(streams, group, consumer, count)
+            return messages
+
+    def autoclaim(self, stream: str, group: str, consumer: str, min_idle_ms: int, count: int = 1) -> list:
+        with self._condition:
+            pending = self._groups[(stream, group)]['pending']
+            fields_by_id = dict(self._streams[stream])
+            now = time.monotonic()
+            claimed = []
+            for message_id, entry in pending.items():
+                if len(claimed) >= count:
+                    break
+                if (now - entry[1]) * 1000 >= min_idle_ms:
+                    entry[0], entry[1], entry[2] = consumer, now, entry[2] + 1
+                    claimed.append((message_id, dict(fields_by_id[message_id])))
+            return claimed
+
+    def touch(self, stream: str, group: str, consumer: str, message_id: str):
+        with self._condition:
+            entry = self._groups[(stream, group)]['pending'].get(message_id)
+            if entry:
+                entry[0], entry[1] = consumer, time.monotonic()
+
+    def deliveries(self, stream: str, group: str, message_id: str) -> int:
+        with self._condition:
+            entry = self._groups[(stream, group)]['pending'].get(message_id)
+            return entry[2] if entry else 0
+
+    def ack(self, stream: str, group: str, message_id: str):
+        with self._condition:
+            self._groups[(stream, group)]['pending'].pop(message_id, None)
+
+    def length(self, stream: str) -> int:
+        with self._condition:
+            return len(self._streams.get(stream, []))
+
+    def pending(self, stream: str, group: str) -> int:
+        with self._condition:
+            return len(self._groups[(stream, group)]['pending'])
+
+    def set_flag(self, key: str, ttl_seconds: int):
+        with self._condition:
+            self._flags[key] = time.monotonic() + ttl_seconds
+
+    def has_flag(self, key: str) -> bool:
+        with self._condition:
+            return self._flags.get(key, 0) > time.monotonic()
+
+    def messages(self, stream: str) -> list:
+        """Todas as mensagens do stream (inspeção em testes, ex.: dead-letter)"""
+        with self._condition:
+            return [(message_id, dict(fields)) for message_id, fields in self._streams.get(stream, [])]
+
+
+def make_backend():
+    """Backend de JOB_STREAM_BACKEND: 'redis' (padrão) ou 'fake' (em memória, mesmo processo)"""
+    if Config().JOB_STREAM_BACKEND == 'fake':
+        return FakeStreamBackend()
+    return RedisStreamBackend()
+
+
+class JobStream:
+    """
+    Fila distribuída de MXFs em Redis Streams: um stream por prioridade
+    (JOB_STREAM:high/normal/low) e um grupo de consumidores compartilhado por
+    todos os workers. Mesma interface do JobExecutor (submit/metrics/shutdown)
+    para o lado da API; o consumo fica com o StreamWorker.
+    """
+
+    def __init__(self, backend=None):
+        self.config = Config()
+        self.logger = Logger()
+        self.backend = backend or make_backend()
+        self.group = self.config.JOB_STREAM_GROUP
+        self.dead_letter_stream = f"{self.config.JOB_STREAM}:dead"
+        for stream in self.streams:
+            self.backend.create_group(stream, self.group)
+
+    @property
+    def streams(self) -> list:
+        """Streams em ordem de prioridade (o mais urgente primeiro)"""
+        return [f"{self.config.JOB_STREAM}:{name}" for name in sorted(PRIORITIES, key=priority_level)]
+
+    def stream_for(self, priority: str) -> str:
+        priority_level(priority)
+        return f"{self.config.JOB_STREAM}:{priority}"
+
+    def submit(self, job_id, priority: str = DEFAULT_PRIORITY, cost: float = None) -> bool:
+        """
+        Publica o job no stream da prioridade. A ordem dentro do stream é a de
+        chegada: o custo vai na mensagem, mas não reordena.
+        """
+        try:
+            fields = {'mxf_id': job_id, 'priority': priority}
+            if cost is not None:
+                fields['duration'] = round(cost, 3)
+            message_id = self.backend.add(self.stream_for(priority), fields)
+            self.logger.info(f"📤 Job {job_id} publicado em {self.stream_for(priority)} ({message_id})")
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao publicar job {job_id}: {e}")
+            return False
+
+    def _cancel_key(self, job_id) -> str:
+        return f"{self.config.JOB_STREAM}:cancel:{job_id}"
+
+    def cancel(self, job_id) -> bool:
+        """
+        Pede o cancelamento do job a todos os workers: quem for pegar a mensagem
+        a descarta, e quem já está processando o job interrompe. O pedido expira
+        depois de JOB_TIMEOUT (nenhum job roda mais que isso).
+        """
+        try:
+            self.backend.set_flag(self._cancel_key(job_id), int(self.config.JOB_TIMEOUT) or 86400)
+            self.logger.info(f"🛑 Cancelamento do job {job_id} publicado")
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao publicar cancelamento do job {job_id}: {e}")
+            return False
+
+    def is_cancelled(self, job_id) -> bool:
+        try:
+            return self.backend.has_flag(self._cancel_key(job_id))
+        except Exception as e:
+            self.logger.warning(f"⚠️ Erro ao consultar cancelamento do job {job_id}: {e}")
+            return False
+
+    def metrics(self) -> dict:
+        """Tamanho e pendentes (entregues sem ack) de cada stream, mais a dead-letter"""
+        try:
+            streams = {
+                stream: {'length': self.backend.length(stream), 'pending': self.backend.pending(stream, self.group)}
+                for stream in self.streams
+            }
+            streams[self.dead_letter_stream] = {'length': self.backend.length(self.dead_letter_stream)}
+            return {'backend': 'redis-stream', 'group': self.group, 'streams': streams}
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao ler métricas da fila: {e}")
+            return {'backend': 'redis-stream', 'error': str(e)}
+
+    def shutdown(self, timeout: float = None) -> bool:
+        """Nada a drenar no lado da API: os jobs ficam no stream para os workers"""
+        return True
@@ -0,0 +1,179 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+from core.config import Config
+from core.logger import Logger
+from features.worker.job_stream import JobStream
+
+
+class StreamWorker:
+    """
+    Consome a fila distribuída (JobStream) com WORKER_CONCURRENCY consumidores,
+    cada um numa thread com event loop próprio.
+
+    - Lê primeiro os streams mais urgentes; só bloqueia quando todos estão vazios.
+    - Ack só depois que o handler termina sem exceção (sucesso, cancelamento ou
+      erro definitivo); uma exceção é erro que pode passar numa nova tentativa.
+      Sem ack (exceção ou worker que caiu no meio), a mensagem fica pendente e,
+      depois de WORKER_CLAIM_IDLE_MS sem sinal de vida, outro worker a assume
+      (XAUTOCLAIM). Enquanto processa, o consumidor renova a mensagem
+      periodicamente para jobs longos não serem tomados.
+    - Uma mensagem entregue WORKER_MAX_DELIVERIES vezes sem ack (arquivo que
+      derruba o worker, erro que sempre se repete) vai para a dead-letter e
+      on_dead_letter(job_id) marca o job como erro.
+    - Cancelamento (JobStream.cancel): uma mensagem de job cancelado recebe ack
+      sem rodar (on_cancelled(job_id) marca o status); durante o processamento
+      o heartbeat consulta o pedido a cada WORKER_CANCEL_POLL_SECONDS e chama
+      on_cancel(job_id) para interromper o job em andamento.
+    """
+
+    def __init__(self, handler, on_dead_letter=None, stream: JobStream = None, concurrency: int = None,
+                 on_cancel=None, on_cancelled=None):
+        """handler: função assíncrona handler(job_id); uma exceção deixa a mensagem para nova tentativa"""
+        self.config = Config()
+        self.logger = Logger()
+        self.handler = handler
+        self.on_dead_letter = on_dead_letter
+        self.on_cancel = on_cancel
+        self.on_cancelled = on_cancelled
+        self.stream = stream or JobStream()
+        self.concurrency = max(1, concurrency or self.config.WORKER_CONCURRENCY)
+        self.name = f"{socket.gethostname()}-{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads = []
+
+    @property
+    def backend(self):
+        return self.stream.backend
+
+    def _next_message(self, consumer: str):
+        """(stream, id, campos) de uma mensagem abandonada por outro worker ou nova, por prioridade"""
+        group = self.stream.group
+        for stream in self.stream.streams:
+            claimed = self.backend.autoclaim(stream, group, consumer, self.config.WORKER_CLAIM_IDLE_MS)
+            if claimed:
+                message_id, fields = claimed[0]
+                self.logger.warning(f"♻️ {consumer} assumiu {message_id} de {stream} (pendente sem ack: nova tentativa)")
+                return stream, message_id, fields
+        for stream in self.stream.streams:
+            messages = self.backend.read([stream], group, consumer)
+            if messages:
+                return messages[0]
+        messages = self.backend.read(self.stream.streams, group, consumer, block_ms=self.config.WORKER_BLOCK_MS)
+        return messages[0] if messages else None
+
+    def _dead_letter(self, stream: str, message_id: str, fields: dict, deliveries: int, error: str):
+        job_id = fields.get('mxf_id')
+        self.backend.add(self.stream.dead_letter_stream, {
+            **fields, 'source_stream': stream, 'source_id': message_id,
+            'deliveries': deliveries, 'error': error, 'consumer': self.name
+        })
+        self.backend.ack(stream, self.stream.group, message_id)
+        self.logger.error(f"☠️ Job {job_id} enviado para dead-letter após {deliveries} entregas: {error}")
+        if self.on_dead_letter is not None and job_id is not None:
+            try:
+                self.on_dead_letter(int(job_id))
+            except Exception as e:
+                self.logger.error(f"❌ Erro ao marcar job {job_id} como erro: {e}")
+
+    def _heartbeat(self, stream: str, message_id: str, consumer: str, job_id: int, done: threading.Event):
+        touch_interval = self.config.WORKER_CLAIM_IDLE_MS / 3000
+        poll_interval = min(touch_interval, self.config.WORKER_CANCEL_POLL_SECONDS or touch_interval)
+        next_touch = time.monotonic() + touch_interval
+        cancel_sent = False
+        while not done.wait(poll_interval):
+            if time.monotonic() >= next_touch:
+                next_touch = time.monotonic() + touch_interval
+                try:
+                    self.backend.touch(stream, self.stream.group, consumer, message_id)
+                except Exception as e:
+                    self.logger.warning(f"⚠️ Falha ao renovar {message_id}: {e}")
+            if not cancel_sent and self.on_cancel is not None and self.stream.is_cancelled(job_id):
+                cancel_sent = True
+                self.logger.info(f"🛑 {consumer}: cancelando job {job_id} em andamento")
+                try:
+                    self.on_cancel(job_id)
+                except Exception as e:
+                    self.logger.error(f"❌ Erro ao cancelar job {job_id}: {e}")
+
+    def _handle(self, loop, consumer: str, stream: str, message_id: str, fields: dict):
+        group = self.stream.group
+        deliveries = self.backend.deliveries(stream, group, message_id)
+        if deliveries > self.config.WORKER_MAX_DELIVERIES:
+            self._dead_letter(stream, message_id, fields, deliveries - 1, "worker interrompido em todas as tentativas")
+            return
+
+        job_id = int(fields['mxf_id'])
+        if self.stream.is_cancelled(job_id):
+            self.logger.info(f"🛑 {consumer}: job {job_id} cancelado antes de começar, descartado")
+            self.backend.ack(stream, group, message_id)
+            if self.on_cancelled is not None:
+                try:
+                    self.on_cancelled(job_id)
+                except Exception as e:
+                    self.logger.error(f"❌ Erro ao marcar job {job_id} como cancelado: {e}")
+            return
+
+        self.logger.info(f"🛠️ {consumer}: job {job_id} ({stream}, entrega {deliveries})")
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(stream, message_id, consumer, job_id, done),
+                                     daemon=True)
+        heartbeat.start()
+        try:
+            loop.run_until_complete(self.handler(job_id))
+        except Exception as e:
+            self.logger.error(f"❌ Job {job_id} falhou na entrega {deliveries}: {e}")
+            if deliveries >= self.config.WORKER_MAX_DELIVERIES:
+                self._dead_letter(stream, message_id, fields, deliveries, str(e))
+            # Senão fica pendente e volta por XAUTOCLAIM depois de WORKER_CLAIM_IDLE_MS
+            return
+        finally:
+            done.set()
+            heartbeat.join()
+        self.backend.ack(stream, group, message_id)
+
+    def _consume(self, index: int):
+        consumer = f"{self.name}-{index}"
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            while not self._stop.is_set():
+                try:
+                    message = self._next_message(consumer)
+                except Exception as e:
+                    self.logger.error(f"❌ {consumer}: erro lendo a fila: {e}")
+                    self._stop.wait(self.config.WORKER_BLOCK_MS / 1000)
+                    continue
+                if message is not None:
+                    self._handle(loop, consumer, *message)
+        finally:
+            loop.close()
+
+    def start(self):
+        self.logger.info(f"👷 Worker {self.name}: {self.concurrency} consumidores no grupo "
+                         f"'{self.stream.group}' ({', '.join(self.stream.streams)})")
+        for index in range(self.concurrency):
+            thread = threading.Thread(target=self._consume, args=(index,), name=f"worker-{index}")
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = None):
+        """Para de pegar mensagens e espera os jobs em andamento (sem ack, voltam para a fila se o prazo estourar)"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def run(self):
+        """Bloqueia até Ctrl+C/SIGTERM e então encerra de forma graciosa"""
+        import signal
+        signal.signal(signal.SIGTERM, lambda *_: self._stop.set())
+        self.start()
+        try:
+            while not self._stop.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+        self.logger.info(f"🛑 Worker {self.name} encerrando: aguardando jobs em andamento")
+        self.stop(self.config.JOB_DRAIN_TIMEOUT)
@@ -1,21 +1,55 @@
+import copy
 from abc import ABC, abstractmethod
 from pathlib import Path
 from core.logger import Logger
+from features.processors.audio_extractor import AudioExtractor
 
 class BaseWorkflow(ABC):
+    # Estratégias que o workflow sabe executar (escolhidas pelo WorkflowPlanner)
+    STRATEGIES = ()
+    
     def __init__(self):
         self.logger = Logger()
     
+    def extract(self, mxf_path: Path):
+        """Etapa de extração: streams de áudio do MXF em WAV"""
+        return AudioExtractor().extract_all_audio_streams(mxf_path)
+    
     @abstractmethod
-    async def process(self, mxf_path: Path):
-        """Processa arquivo MXF e retorna resultados"""
+    async def recognize_stream(self, mxf_path: Path, file_info: dict, strategy: str,
+                               segment_ranges: list = None, checkpoint=None):
+        """
+        Reconhece um stream extraído com a estratégia planejada.
+        segment_ranges: [(i, início, fim)] já calculados, ou None para detectar aqui
+        checkpoint: JobCheckpoint que guarda cada reconhecimento (retomada após queda)
+        """
         pass
     
     @abstractmethod
-    def can_handle(self, streams) -> bool:
-        """Verifica se pode processar os streams"""
+    async def recognize(self, mxf_path: Path, extracted_files: list, segment_ranges: dict = None, checkpoint=None):
+        """
+        Etapa de reconhecimento sobre os áudios extraídos, sem planejamento.
+        segment_ranges: {str(path): [(i, início, fim)]} já calculados, ou None para detectar aqui
+        """
         pass
     
+    async def process(self, mxf_path: Path):
+        """Processa arquivo MXF e retorna resultados (extração + reconhecimento em sequência)"""
+        extracted_files = self.extract(mxf_path)
+        return await self.recognize(mxf_path, extracted_files)
+    
+    @staticmethod
+    def fan_out(results: list, file_info: dict) -> list:
+        """Cópia dos resultados do representante de um grupo de tracks duplicadas para outro stream do grupo"""
+        copies = []
+        for result in results:
+            duplicate = copy.deepcopy(result)
+            duplicate['duplicate_of'] = result.get('stream_index')
+            duplicate['stream_index'] = file_info['stream_index']
+            duplicate['channels'] = file_info['channels']
+            copies.append(duplicate)
+        return copies
+    
     def get_workflow_name(self):
         """Retorna nome do workflow"""
-        return self.__class__.__name__
\ No newline at end of file
+        return self.__class__.__name__
@@ -1,90 +1,180 @@
+import asyncio
 from features.workflows.base_workflow import BaseWorkflow
-from features.processors.audio_extractor import AudioExtractor
 from features.processors.music_recognizer import MusicRecognizer
 from features.processors.light_separator import LightSeparator
-from core.file_processor import MXFProcessor
+from features.processors.spectral_separator import SpectralSeparator
+from features.processors.demucs_separator import DemucsSeparator
+from features.processors.melody_extractor import MelodyExtractor
+from features.dsp.buffer import AudioBuffer
+from core.config import Config
+from utils.wav_io import get_duration_ms, read_wav_info, read_frames
 from pathlib import Path
+import numpy as np
 
 class MixedAudioWorkflow(BaseWorkflow):
     """Processa MXFs mixados usando métodos leves de separação"""
     
+    STRATEGIES = ('direct', 'enhanced', 'separated')
+    
     def __init__(self):
         super().__init__()
+        self.config = Config()
         self.light_separator = LightSeparator()
+        self.spectral_separator = SpectralSeparator()
+        self.demucs_separator = DemucsSeparator()
+        self.melody_extractor = MelodyExtractor()
         self.recognizer = MusicRecognizer()  # ← ADICIONAR ESTA LINHA
     
-    def can_handle(self, streams) -> bool:
-        audio_streams = [s for s in streams if s.get('codec_type') == 'audio']
-        is_likely_mixed = len(audio_streams) <= 2
+    async def recognize_stream(self, mxf_path: Path, file_info: dict, strategy: str = 'separated',
+                               segment_ranges: list = None, checkpoint=None):
+        """
+        direct: só o áudio original; enhanced: só o áudio otimizado;
+        separated: cascata completa (direto → otimizado → separações)
+        """
+        audio_path = file_info['path']
+        self.logger.info(f"🎵 Stream {file_info['stream_index']} ({strategy}): {audio_path.name}")
         
-        if is_likely_mixed:
-            self.logger.info(f"🎵 Workflow MixedAudio: {len(audio_streams)} tracks - provavelmente mixado")
+        if strategy == 'direct':
+            results = await self._process_direct(await asyncio.to_thread(self._load, audio_path), mxf_path, file_info, segment_ranges, checkpoint)
+        elif strategy == 'enhanced':
+            enhanced_audio = await asyncio.to_thread(lambda: self._enhance(self._load(audio_path)))
+            results = await self._process_enhanced(enhanced_audio, mxf_path, file_info, checkpoint)
+            self._discard(enhanced_audio, audio_path)
         else:
-            self.logger.info(f"🎵 Workflow MixedAudio: {len(audio_streams)} tracks - muito para ser mixado")
+            results = await self._try_processing_strategies(audio_path, mxf_path, file_info, segment_ranges, checkpoint)
+        
+        # Limpeza
+        self._cleanup_temp_files(audio_path)
         
-        return is_likely_mixed
+        self.logger.info(f"✅ Stream {file_info['stream_index']} concluído. {len(results)} resultados encontrados")
+        return results
     
-    async def process(self, mxf_path: Path):
+    async def recognize(self, mxf_path: Path, extracted_files: list, segment_ranges: dict = None, checkpoint=None):
         self.logger.info(f"🎵 Iniciando processamento MXF mixado (LEVE): {mxf_path.name}")
         
-        processor = MXFProcessor()
-        extractor = AudioExtractor()
-        
-        streams = processor.get_streams(mxf_path)
-        all_results = []
-        
-        # Extrai o áudio mixado
-        extracted_files = extractor.extract_all_audio_streams(mxf_path)
         if not extracted_files:
             self.logger.error("❌ Nenhum áudio extraído para processamento")
-            return all_results
+            return []
         
+        # Estratégia: Tentar métodos progressivamente mais complexos no áudio mixado
         mixed_audio_info = extracted_files[0]
-        mixed_audio_path = mixed_audio_info['path']
-        
-        self.logger.info(f"🎵 Áudio mixado extraído: {mixed_audio_path.name}")
-        
-        # Estratégia: Tentar métodos progressivamente mais complexos
-        results = await self._try_processing_strategies(mixed_audio_path, mxf_path, mixed_audio_info)
-        all_results.extend(results)
-        
-        # Limpeza
-        self._cleanup_temp_files(mixed_audio_path)
-        
-        self.logger.info(f"✅ Processamento mixado concluído. {len(all_results)} resultados encontrados")
-        return all_results
+        ranges = (segment_ranges or {}).get(str(mixed_audio_info['path']))
+        return await self.recognize_stream(mxf_path, mixed_audio_info, 'separated', ranges, checkpoint)
+    
+    def _load(self, audio_path: Path):
+        # Programas curtos são lidos uma vez e tratados em memória; os longos
+        # ficam no disco e são processados em blocos (memória constante)
+        if get_duration_ms(audio_path) <= self.config.DSP_IN_MEMORY_MAX_DURATION:
+            return AudioBuffer.from_wav(audio_path)
+        self.logger.info("📼 Programa longo: processamento em blocos a partir do disco")
+        return audio_path
     
-    async def _try_processing_strategies(self, mixed_audio_path: Path, mxf_path: Path, audio_info: dict):
+    async def _try_processing_strategies(self, mixed_audio_path: Path, mxf_path: Path, audio_info: dict, segment_ranges=None, checkpoint=None):
         """Tenta diferentes estratégias de processamento"""
         all_results = []
+        mixed_audio = await asyncio.to_thread(self._load, mixed_audio_path)
         
         # Estratégia 1: Reconhecimento direto no áudio original
         self.logger.info("🎯 Estratégia 1: Reconhecimento direto")
-        direct_results = await self._process_direct(mixed_audio_path, mxf_path, audio_info)
+        direct_results = await self._process_direct(mixed_audio, mxf_path, audio_info, segment_ranges, checkpoint)
         all_results.extend(direct_results)
         
         if len(direct_results) < 2:  # Se poucas músicas foram detectadas
             # Estratégia 2: Áudio otimizado
             self.logger.info("🎯 Estratégia 2: Áudio otimizado")
-            enhanced_path = self.light_separator.enhance_audio_for_recognition(mixed_audio_path)
-            enhanced_results = await self._process_enhanced(enhanced_path, mxf_path, audio_info)
+            enhanced_audio = await asyncio.to_thread(self._enhance, mixed_audio)
+            enhanced_results = await self._process_enhanced(enhanced_audio, mxf_path, audio_info, checkpoint)
             all_results.extend(enhanced_results)
+            self._discard(enhanced_audio, mixed_audio_path)
             
             if len(enhanced_results) < 2:
                 # Estratégia 3: Separação leve de vocais
                 self.logger.info("🎯 Estratégia 3: Separação leve de vocais")
-                separation_result = self.light_separator.separate_vocals_light(mixed_audio_path)
-                if separation_result:
-                    vocals_path = separation_result.get('vocals')
-                    if vocals_path and vocals_path.exists():
-                        vocals_results = await self._process_vocals(vocals_path, mxf_path, audio_info, separation_result)
-                        all_results.extend(vocals_results)
+                vocals_results = []
+                separation_result = await asyncio.to_thread(self._separate_vocals, mixed_audio)
+                if separation_result.get('vocals') is not None:
+                    vocals_results = await self._process_vocals(separation_result['vocals'], mxf_path, audio_info, separation_result, checkpoint)
+                    all_results.extend(vocals_results)
+                    self._discard(separation_result['vocals'], mixed_audio_path)
+                
+                if len(vocals_results) < 2:
+                    # Estratégia 4: Separação espectral (HPSS), bem mais barata que o Demucs
+                    self.logger.info("🎯 Estratégia 4: Separação espectral harmônica")
+                    spectral_result = await asyncio.to_thread(self._separate_spectral, mixed_audio)
+                    if spectral_result.get('harmonic') is not None:
+                        spectral_results = await self._process_spectral(spectral_result['harmonic'], mxf_path, audio_info, spectral_result, checkpoint)
+                        all_results.extend(spectral_results)
+                        self._discard(spectral_result['harmonic'], mixed_audio_path)
+        
+        if len(all_results) < 2 and (self.demucs_separator.demucs_available or self.melody_extractor.is_available()):
+            ranges = await asyncio.to_thread(self._unrecognized_ranges, mixed_audio, all_results)
+            if ranges and self.demucs_separator.demucs_available:
+                # Estratégia 5: Demucs só nos segmentos que nenhuma estratégia reconheceu
+                self.logger.info("🎯 Estratégia 5: Demucs nos trechos não reconhecidos")
+                demucs_results = await self._process_demucs_ranges(mixed_audio, ranges, mxf_path, audio_info, checkpoint)
+                all_results.extend(demucs_results)
+            elif ranges:
+                # Estratégia 6: sem Demucs, acompanhamento do Spleeter nos mesmos trechos
+                self.logger.info("🎯 Estratégia 6: Acompanhamento (Spleeter) nos trechos não reconhecidos")
+                accompaniment_results = await self._process_accompaniment(mixed_audio, ranges, mxf_path, audio_info, checkpoint)
+                all_results.extend(accompaniment_results)
         
         return all_results
     
-    async def _process_direct(self, audio_path: Path, mxf_path: Path, audio_info: dict):
+    def _enhance(self, audio):
+        if isinstance(audio, AudioBuffer):
+            return self.light_separator.enhance_buffer(audio)
+        return self.light_separator.enhance_audio_for_recognition(audio)
+    
+    def _separate_vocals(self, audio):
+        if isinstance(audio, AudioBuffer):
+            return self.light_separator.separate_vocals_buffer(audio)
+        return self.light_separator.separate_vocals_light(audio)
+    
+    def _separate_spectral(self, audio):
+        if isinstance(audio, AudioBuffer):
+            return self.spectral_separator.separate_buffer(audio, stems=('harmonic',))
+        return self.spectral_separator.separate_audio(audio, stems=('harmonic',))
+    
+    def _unrecognized_ranges(self, audio, results: list):
+        """Segmentos (delimitados por silêncio) que não se sobrepõem a nenhum resultado"""
+        recognized = [
+            (r['segment_start'], r['segment_start'] + r.get('segment_duration', 0))
+            for r in results if 'segment_start' in r
+        ]
+        return [
+            (start, end) for _, start, end in self.recognizer.detect_segment_ranges(audio)
+            if not any(start < rec_end and rec_start < end for rec_start, rec_end in recognized)
+        ]
+    
+    @staticmethod
+    def _read_range(audio, start_ms: int, end_ms: int) -> AudioBuffer:
+        """Trecho [início, fim] em ms de um buffer ou WAV em disco (só o trecho é lido)"""
+        if isinstance(audio, AudioBuffer):
+            to_frame = lambda ms: int(ms) * audio.frame_rate // 1000
+            return audio.with_samples(audio.samples[to_frame(start_ms):to_frame(end_ms)], f"_{int(start_ms)}ms")
+        
+        info = read_wav_info(audio)
+        to_frame = lambda ms: min(info.n_frames, int(ms) * info.frame_rate // 1000)
+        start = to_frame(start_ms)
+        frames = read_frames(audio, info, start, to_frame(end_ms) - start)
+        return AudioBuffer.from_frames(frames, info.channels, info.sample_width, info.frame_rate,
+                                       f"{audio.stem}_{int(start_ms)}ms")
+    
+    def _discard(self, audio, mixed_audio_path: Path):
+        """Remove arquivos intermediários do modo em blocos (buffers só saem de escopo)"""
+        if not isinstance(audio, Path) or audio == mixed_audio_path:
+            return
+        try:
+            if audio.exists():
+                audio.unlink()
+                self.logger.info(f"🧹 Arquivo intermediário removido: {audio.name}")
+        except Exception as e:
+            self.logger.warning(f"⚠️ Não foi possível remover {audio.name}: {e}")
+    
+    async def _process_direct(self, audio, mxf_path: Path, audio_info: dict, segment_ranges=None, checkpoint=None):
         """Processa o áudio original diretamente"""
-        results = await self.recognizer.recognize_audio_with_segments(audio_path)
+        results = await self.recognizer.recognize_audio_with_segments(audio, segment_ranges, checkpoint)
         for result in results:
             result.update({
                 'source_file': mxf_path.name,
@@ -95,9 +185,9 @@ class MixedAudioWorkflow(BaseWorkflow):
             })
         return results
     
-    async def _process_enhanced(self, enhanced_path: Path, mxf_path: Path, audio_info: dict):
-        """Processa áudio otimizado"""
-        results = await self.recognizer.recognize_audio_with_segments(enhanced_path)
+    async def _process_enhanced(self, enhanced_audio, mxf_path: Path, audio_info: dict, checkpoint=None):
+        """Processa áudio otimizado (buffer em memória ou arquivo em blocos)"""
+        results = await self.recognizer.recognize_audio_with_segments(enhanced_audio, checkpoint=checkpoint)
         for result in results:
             result.update({
                 'source_file': mxf_path.name,
@@ -106,20 +196,11 @@ class MixedAudioWorkflow(BaseWorkflow):
                 'workflow': 'mixed_enhanced',
                 'processing_strategy': 'enhanced'
             })
-        
-        # Limpa arquivo temporário enhanced (se for diferente do original)
-        try:
-            if enhanced_path != audio_path and enhanced_path.exists():
-                enhanced_path.unlink()
-                self.logger.info(f"🧹 Arquivo enhanced removido: {enhanced_path.name}")
-        except Exception as e:
-            self.logger.warning(f"⚠️ Não foi possível remover enhanced: {e}")
-            
         return results
     
-    async def _process_vocals(self, vocals_path: Path, mxf_path: Path, audio_info: dict, separation_result: dict):
-        """Processa vocais separados"""
-        results = await self.recognizer.recognize_audio_with_segments(vocals_path)
+    async def _process_vocals(self, vocals_audio, mxf_path: Path, audio_info: dict, separation_result: dict, checkpoint=None):
+        """Processa vocais separados (buffer em memória ou arquivo em blocos)"""
+        results = await self.recognizer.recognize_audio_with_segments(vocals_audio, checkpoint=checkpoint)
         for result in results:
             result.update({
                 'source_file': mxf_path.name,
@@ -129,15 +210,76 @@ class MixedAudioWorkflow(BaseWorkflow):
                 'processing_strategy': 'vocals_separation',
                 'separation_method': separation_result.get('method', 'light')
             })
-        
-        # Limpa arquivo temporário de vocais
-        try:
-            if vocals_path.exists():
-                vocals_path.unlink()
-                self.logger.info(f"🧹 Arquivo vocals removido: {vocals_path.name}")
-        except Exception as e:
-            self.logger.warning(f"⚠️ Não foi possível remover vocals: {e}")
+        return results
+    
+    async def _process_spectral(self, harmonic_audio, mxf_path: Path, audio_info: dict, separation_result: dict, checkpoint=None):
+        """Processa a componente harmônica da separação espectral"""
+        results = await self.recognizer.recognize_audio_with_segments(harmonic_audio, checkpoint=checkpoint)
+        for result in results:
+            result.update({
+                'source_file': mxf_path.name,
+                'stream_index': 'harmonic_hpss',
+                'channels': audio_info['channels'],
+                'workflow': 'mixed_spectral_separation',
+                'processing_strategy': 'harmonic_separation',
+                'separation_method': separation_result.get('method', 'hpss_mask')
+            })
+        return results
+    
+    async def _process_accompaniment(self, audio, ranges: list, mxf_path: Path, audio_info: dict, checkpoint=None):
+        """Separa os trechos com o MelodyExtractor e reconhece o acompanhamento (sem voz)"""
+        results = []
+        for start, end in ranges:
+            separation_result = await asyncio.to_thread(
+                lambda: self.melody_extractor.separate(self._read_range(audio, start, end))
+            )
+            if separation_result.get('accompaniment') is None:
+                continue
+            
+            range_results = await self.recognizer.recognize_audio_with_segments(separation_result['accompaniment'], checkpoint=checkpoint)
+            for result in range_results:
+                result.update({
+                    'source_file': mxf_path.name,
+                    'stream_index': 'accompaniment_spleeter',
+                    'channels': audio_info['channels'],
+                    'workflow': 'mixed_accompaniment_separation',
+                    'processing_strategy': 'accompaniment_separation',
+                    'separation_method': separation_result.get('method', 'spleeter_2stems'),
+                    # Posições relativas ao trecho passam a ser relativas ao programa
+                    'segment_start': start + result.get('segment_start', 0)
+                })
+            results.extend(range_results)
+        return results
+    
+    async def _process_demucs_ranges(self, audio, ranges: list, mxf_path: Path, audio_info: dict, checkpoint=None):
+        """Separa só os trechos indicados e reconhece o acompanhamento (tudo menos a voz)"""
+        results = []
+        for separated in await asyncio.to_thread(self.demucs_separator.separate_ranges, audio, ranges):
+            stems = separated['stems']
+            accompaniment = [stem.samples.astype(np.int32) for name, stem in stems.items() if name != 'vocals']
+            if not accompaniment:
+                continue
+            
+            reference = next(iter(stems.values()))
+            limits = np.iinfo(reference.samples.dtype)
+            mixed = np.clip(np.sum(accompaniment, axis=0), limits.min, limits.max).astype(reference.samples.dtype)
             
+            range_results = await self.recognizer.recognize_audio_with_segments(
+                AudioBuffer(mixed, reference.frame_rate, f"{mxf_path.stem}_{separated['start']}ms_accompaniment"),
+                checkpoint=checkpoint
+            )
+            for result in range_results:
+                result.update({
+                    'source_file': mxf_path.name,
+                    'stream_index': 'accompaniment_demucs',
+                    'channels': audio_info['channels'],
+                    'workflow': 'mixed_demucs_ranges',
+                    'processing_strategy': 'demucs_ranges',
+                    'separation_method': 'demucs',
+                    # Posições relativas ao trecho passam a ser relativas ao programa
+                    'segment_start': separated['start'] + result.get('segment_start', 0)
+                })
+            results.extend(range_results)
         return results
     
     def _cleanup_temp_files(self, mixed_audio_path: Path):
@@ -0,0 +1,195 @@
+from core.config import Config
+from core.logger import Logger
+from features.dsp.stream_stats import StreamStats
+
+DIRECT = 'direct'
+ENHANCED = 'enhanced'
+SEPARATED = 'separated'
+SKIP = 'skip'
+# Mesmo conteúdo de outro stream: não vai ao Shazam, recebe os resultados do representante
+DUPLICATE = 'duplicate'
+
+# Qualidade esperada (0-1) de cada estratégia: trilhas isoladas (MXF com várias
+# tracks) reconhecem bem direto; numa mixagem a música disputa com a voz
+_EXPECTED_QUALITY = {
+    'isolated': {DIRECT: 0.90, ENHANCED: 0.88, SEPARATED: 0.90},
+    'mixed': {DIRECT: 0.55, ENHANCED: 0.65, SEPARATED: 0.85},
+}
+# Rodadas de Shazam por estratégia (a separação reconhece o original e os stems)
+_API_PASSES = {DIRECT: 1, ENHANCED: 1, SEPARATED: 3}
+QUIET_LOUDNESS_DB = -35.0
+WIDE_STEREO_CORRELATION = 0.6
+
+
+class StreamPlan:
+    """Estratégia escolhida para um stream, com custo previsto e o workflow que a executa"""
+
+    def __init__(self, stream_index, path: str, strategy: str, workflow: str = None,
+                 predicted_seconds: float = 0.0, api_calls: int = 0, quality: float = 0.0, reason: str = "",
+                 duplicate_of: str = None):
+        self.stream_index = stream_index
+        self.path = path
+        self.strategy = strategy
+        self.workflow = workflow
+        self.predicted_seconds = predicted_seconds
+        self.api_calls = api_calls
+        self.quality = quality
+        self.reason = reason
+        self.duplicate_of = duplicate_of
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**data)
+
+
+class ExecutionPlan:
+    """Planos de todos os streams de um MXF e o custo total previsto"""
+
+    def __init__(self, streams: list):
+        self.streams = streams
+
+    @property
+    def active(self) -> list:
+        return [plan for plan in self.streams if plan.strategy not in (SKIP, DUPLICATE)]
+
+    @property
+    def predicted_seconds(self) -> float:
+        return round(sum(plan.predicted_seconds for plan in self.streams), 1)
+
+    @property
+    def api_calls(self) -> int:
+        return sum(plan.api_calls for plan in self.streams)
+
+    def to_dict(self) -> dict:
+        return {'streams': [plan.to_dict() for plan in self.streams]}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls([StreamPlan.from_dict(plan) for plan in data['streams']])
+
+
+class WorkflowPlanner:
+    """
+    Escolhe, por stream, a estratégia mais barata que atinge PLANNER_QUALITY_BAR.
+
+    Entradas: o resultado do probe e estatísticas baratas de cada stream extraído
+    (duração, nível, correlação entre canais, segmentos). O custo previsto é o
+    tempo de processamento (fator por segundo de áudio de cada estratégia) mais
+    as chamadas ao Shazam. Nenhum arquivo fica sem plano: o número de tracks só
+    decide se os streams são tratados como trilhas isoladas ou como mixagem.
+    Streams com o mesmo conteúdo de um anterior (group_duplicates) viram
+    'duplicate' e herdam os resultados dele, sem custo.
+    """
+
+    def __init__(self, workflows: dict = None):
+        """workflows: {nome: estratégias suportadas}, na ordem de preferência"""
+        self.config = Config()
+        self.logger = Logger()
+        if workflows is None:
+            from features.workflows.unmixed_audio import UnmixedAudioWorkflow
+            from features.workflows.mixed_audio import MixedAudioWorkflow
+            workflows = {cls.__name__: cls.STRATEGIES for cls in (UnmixedAudioWorkflow, MixedAudioWorkflow)}
+        self.workflows = workflows
+
+    def _context(self, streams: list) -> str:
+        audio_streams = [s for s in streams if s.get('codec_type') == 'audio']
+        return 'mixed' if len(audio_streams) <= self.config.PLANNER_MIXED_MAX_STREAMS else 'isolated'
+
+    def _workflow_for(self, strategy: str, context: str):
+        names = list(self.workflows)
+        # Trilhas isoladas preferem o primeiro workflow (não mixado), mixagens o último
+        if context == 'mixed':
+            names.reverse()
+        return next((name for name in names if strategy in self.workflows[name]), None)
+
+    def _api_calls(self, strategy: str, stats: StreamStats, segment_count: int) -> int:
+        if stats.duration_ms <= self.config.FULL_RECOGNITION_MAX_DURATION or not self.config.RECOGNITION_EXCERPTS:
+            base = 1
+        else:
+            base = len(self.config.RECOGNITION_EXCERPTS)
+        return (base + segment_count) * _API_PASSES[strategy]
+
+    def _quality(self, strategy: str, context: str, stats: StreamStats) -> float:
+        quality = _EXPECTED_QUALITY[context][strategy]
+        if stats.loudness_db < QUIET_LOUDNESS_DB and strategy == DIRECT:
+            # A otimização normaliza o nível; o áudio cru baixo reconhece pior
+            quality -= 0.15
+        if context == 'mixed' and stats.channel_correlation < WIDE_STEREO_CORRELATION and strategy != SEPARATED:
+            # Estéreo largo: a música costuma dominar as laterais, a voz fica no centro
+            quality += 0.10
+        return round(min(1.0, max(0.0, quality)), 2)
+
+    def _skip_reason(self, context: str, is_primary: bool, stats: StreamStats):
+        if stats.duration_ms < self.config.MIN_SEGMENT_DURATION:
+            return f"curto demais ({stats.duration_ms}ms)"
+        if stats.loudness_db < self.config.PLANNER_MIN_LOUDNESS_DB:
+            return f"silencioso ({stats.loudness_db:.1f} dBFS)"
+        if context == 'mixed' and not is_primary:
+            return "mixagem secundária (o primeiro stream já contém o programa)"
+        return None
+
+    def plan_stream(self, file_info: dict, stats: StreamStats, segment_count: int,
+                    context: str, is_primary: bool) -> StreamPlan:
+        path = str(file_info['path'])
+        stream_index = file_info['stream_index']
+
+        reason = self._skip_reason(context, is_primary, stats)
+        if reason:
+            return StreamPlan(stream_index, path, SKIP, reason=reason)
+
+        candidates = []
+        for strategy in (DIRECT, ENHANCED, SEPARATED):
+            workflow = self._workflow_for(strategy, context)
+            if workflow is None:
+                continue
+            api_calls = self._api_calls(strategy, stats, segment_count)
+            seconds = (stats.duration_ms / 1000 * self.config.PLANNER_STRATEGY_COST.get(strategy, 0.0)
+                       + api_calls * self.config.PLANNER_API_CALL_SECONDS)
+            candidates.append(StreamPlan(stream_index, path, strategy, workflow, round(seconds, 1),
+                                         api_calls, self._quality(strategy, context, stats)))
+
+        acceptable = [plan for plan in candidates if plan.quality >= self.config.PLANNER_QUALITY_BAR]
+        if acceptable:
+            chosen = min(acceptable, key=lambda plan: plan.predicted_seconds)
+            chosen.reason = f"mais barata com qualidade >= {self.config.PLANNER_QUALITY_BAR}"
+        else:
+            chosen = min(candidates, key=lambda plan: (-plan.quality, plan.predicted_seconds))
+            chosen.reason = "nenhuma atinge a qualidade mínima: maior qualidade prevista"
+        return chosen
+
+    def plan(self, streams: list, extracted_files: list, stats: dict, segment_ranges: dict,
+             duplicates: dict = None) -> ExecutionPlan:
+        """
+        streams: saída do probe; stats/segment_ranges: {str(path): StreamStats / [(i, início, fim)]}
+        duplicates: {str(path): (path do representante, correlação)} de group_duplicates
+        """
+        context = self._context(streams)
+        duplicates = duplicates or {}
+        plans = []
+        by_path = {}
+        for position, file_info in enumerate(extracted_files):
+            key = str(file_info['path'])
+            stream_stats = StreamStats(*(stats.get(key) or StreamStats(0, -120.0, -120.0, 1.0)))
+            representative = by_path.get(duplicates.get(key, (None,))[0])
+
+            if representative is not None and representative.strategy not in (SKIP, DUPLICATE) \
+                    and not self._skip_reason(context, position == 0, stream_stats):
+                plan = StreamPlan(file_info['stream_index'], key, DUPLICATE, duplicate_of=representative.path,
+                                  reason=f"duplicata do stream {representative.stream_index} (r={duplicates[key][1]})")
+            else:
+                plan = self.plan_stream(file_info, stream_stats, len(segment_ranges.get(key, [])),
+                                        context, position == 0)
+            plans.append(plan)
+            by_path[key] = plan
+
+        plan = ExecutionPlan(plans)
+        for stream_plan in plans:
+            self.logger.info(f"🧭 Stream {stream_plan.stream_index}: {stream_plan.strategy}"
+                             f"{f' via {stream_plan.workflow}' if stream_plan.workflow else ''}"
+                             f" (~{stream_plan.predicted_seconds}s, {stream_plan.api_calls} chamadas,"
+                             f" qualidade {stream_plan.quality}) - {stream_plan.reason}")
+        self.logger.info(f"🧭 Plano ({context}): ~{plan.predicted_seconds}s, {plan.api_calls} chamadas ao Shazam")
+        return plan
@@ -1,55 +1,45 @@
 from features.workflows.base_workflow import BaseWorkflow
-from features.processors.audio_extractor import AudioExtractor
 from features.processors.music_recognizer import MusicRecognizer
-from core.file_processor import MXFProcessor
 from pathlib import Path
 
 class UnmixedAudioWorkflow(BaseWorkflow):
     """Processa MXFs não mixados (trilhas separadas por tracks)"""
     
-    def can_handle(self, streams) -> bool:
-        audio_streams = [s for s in streams if s.get('codec_type') == 'audio']
-        has_multiple_tracks = len(audio_streams) >= 4
+    STRATEGIES = ('direct',)
+    
+    def __init__(self):
+        super().__init__()
+        self.recognizer = MusicRecognizer()
+    
+    async def recognize_stream(self, mxf_path: Path, file_info: dict, strategy: str = 'direct',
+                               segment_ranges: list = None, checkpoint=None):
+        stream_index = file_info['stream_index']
+        file_path = file_info['path']
+        
+        self.logger.info(f"Processando stream {stream_index}: {file_path.name}")
         
-        if has_multiple_tracks:
-            self.logger.info(f"Workflow UnmixedAudio: {len(audio_streams)} tracks de áudio detectadas")
-        else:
-            self.logger.info(f"Workflow UnmixedAudio: Apenas {len(audio_streams)} tracks - insuficiente")
+        # Reconhecimento musical
+        stream_results = await self.recognizer.recognize_audio_with_segments(file_path, segment_ranges, checkpoint)
         
-        return has_multiple_tracks
+        # Adiciona metadados do stream
+        for result in stream_results:
+            result.update({
+                'source_file': mxf_path.name,
+                'stream_index': stream_index,
+                'channels': file_info['channels'],
+                'workflow': 'unmixed'
+            })
+        return stream_results
     
-    async def process(self, mxf_path: Path):
+    async def recognize(self, mxf_path: Path, extracted_files: list, segment_ranges: dict = None, checkpoint=None):
         self.logger.info(f"Iniciando processamento MXF não mixado: {mxf_path.name}")
         
-        processor = MXFProcessor()
-        extractor = AudioExtractor()
-        recognizer = MusicRecognizer()
-        
-        streams = processor.get_streams(mxf_path)
         all_results = []
         
-        # Extrai todos os streams de áudio
-        extracted_files = extractor.extract_all_audio_streams(mxf_path)
-        
         # Processa cada stream extraído
         for file_info in extracted_files:
-            stream_index = file_info['stream_index']
-            file_path = file_info['path']
-            
-            self.logger.info(f"Processando stream {stream_index}: {file_path.name}")
-            
-            # Reconhecimento musical
-            stream_results = await recognizer.recognize_audio_with_segments(file_path)
-            
-            # Adiciona metadados do stream
-            for result in stream_results:
-                result.update({
-                    'source_file': mxf_path.name,
-                    'stream_index': stream_index,
-                    'channels': file_info['channels'],
-                    'workflow': 'unmixed'
-                })
-                all_results.append(result)
+            ranges = (segment_ranges or {}).get(str(file_info['path']))
+            all_results.extend(await self.recognize_stream(mxf_path, file_info, 'direct', ranges, checkpoint))
         
         self.logger.info(f"Processamento concluído. {len(all_results)} resultados encontrados")
-        return all_results
\ No newline at end of file
+        return all_results
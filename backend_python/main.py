@@ -6,11 +6,12 @@ Execução sob demanda via script batch + API FastAPI
 
 import asyncio
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.controllers.mxf_controller import router as mxf_router
+from app.controllers.mxf_controller import router as mxf_router, service as mxf_service
 from app.controllers.edl_controller import router as edl_router
 from app.model.edl import EDLEntry
 
@@ -19,7 +20,7 @@ sys.path.append(str(Path(__file__).parent))
 import logging
 from core.config import Config
 from core.logger import Logger
-from core.database import Base, engine
+from core.database import create_schema
 from features.watchfolder.scheduler import WatchFolderScheduler
 from features.watchfolder.sharepoint_scheduler import SharePointScheduler
 from app.model.audio_track import AudioTrack
@@ -29,7 +30,14 @@ from app.model.mxf import MXFFile
 # ------------------------------
 # Criação automática das tabelas
 # ------------------------------
-Base.metadata.create_all(bind=engine)
+create_schema()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Retoma os uploads que ficaram pendentes e, no fim, espera os jobs em execução
+    await asyncio.to_thread(mxf_service.recover_pending_jobs)
+    yield
+    await asyncio.to_thread(mxf_service.shutdown, Config().JOB_DRAIN_TIMEOUT)
 
 # ------------------------------
 # Inicializa FastAPI
@@ -39,7 +47,8 @@ app = FastAPI(
     description="API para Análise de Áudio em Arquivos MXF",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 app.include_router(mxf_router)
@@ -58,7 +67,7 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-async def main_async():
+async def main_async(watch: bool = False):
     logger = Logger()
     config = Config()
     
@@ -75,7 +84,10 @@ async def main_async():
             
         logger.info("=" * 60)
         
-        await scheduler.process_pending_files()
+        if watch:
+            await scheduler.watch()
+        else:
+            await scheduler.process_pending_files()
         
         logger.info("✅ Processamento concluído com sucesso!")
         
@@ -84,9 +96,42 @@ async def main_async():
         sys.exit(1)
 
 
+def run_worker():
+    """Worker da fila distribuída: consome os jobs publicados pela API (JOB_BACKEND=redis)"""
+    from app.repository.mxf_repository import MXFRepository
+    from app.service.mxf_service import MXFService
+    from features.worker.stream_worker import StreamWorker
+
+    service = MXFService(MXFRepository())
+    StreamWorker(service.process_job, on_dead_letter=service.mark_failed,
+                 on_cancel=service.cancel_running, on_cancelled=service.mark_cancelled).run()
+
+
+def run_estimate(paths: list):
+    """Estimativa prévia de tempo e chamadas ao Shazam (padrão: a pasta de entrada), em JSON na saída padrão"""
+    import json
+    from features.pipeline.cost_estimator import CostEstimator
+
+    report = CostEstimator().estimate(paths or [Config().WATCHFOLDER_INPUT])
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
 def main():
-    """Função principal"""
-    asyncio.run(main_async())
+    """
+    Função principal (--watch: modo contínuo, reage a cada arquivo novo na entrada;
+    --worker: consome a fila distribuída no Redis;
+    --estimate [caminhos...]: só estima o custo de processar os MXFs)
+    """
+    if "--worker" in sys.argv[1:]:
+        run_worker()
+        return
+    if "--estimate" in sys.argv[1:]:
+        run_estimate([arg for arg in sys.argv[1:] if not arg.startswith("--")])
+        return
+    try:
+        asyncio.run(main_async(watch="--watch" in sys.argv[1:]))
+    except KeyboardInterrupt:
+        Logger().info("🛑 Modo contínuo encerrado")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,147 @@
+import asyncio
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import delete, select
+from app.model.mxf import MXFFile
+from app.model.audio_track import AudioTrack
+from app.model.time_range import TimeRange
+from app.model.edl import EDLEntry
+from app.repository.edl_repository import EDLRepository
+from app.repository.mxf_repository import MXFRepository
+from app.service.edl_service import EDLService
+from core.database import SessionLocal, async_session, async_engine, engine, create_schema
+
+# Marca dos registros criados aqui (removidos no fim)
+PREFIX = "benchmark_edl"
+# Tamanho do job medido e de cada MXF de "histórico" usado para crescer as tabelas
+JOB_TRACKS, JOB_MATCHES = 50, 4
+HISTORY_TRACKS, HISTORY_MATCHES = 20, 5
+
+
+def fake_results(tracks: int, matches: int) -> list:
+    return [
+        {
+            "title": f"Música {i}",
+            "artist": "Artista",
+            "segment_start": i * 30000,
+            "segment_duration": 15000,
+            "shazam_data": {"matches": [{"offset": m * 2.5} for m in range(matches)]},
+        }
+        for i in range(tracks)
+    ]
+
+
+class EDLTimestampBenchmark:
+    """
+    Mede o tempo de montar o EDL de um job de tamanho fixo enquanto time_range
+    cresce com o histórico de outros jobs. Com a consulta por mxf_id (join +
+    índices) o tempo deve ficar estável; a consulta antiga (tabela inteira)
+    aparece ao lado para comparação.
+    """
+
+    def __init__(self, sizes: list, runs: int = 5):
+        self.sizes = sizes
+        self.runs = runs
+        self.repository = MXFRepository()
+        self.edl_service = EDLService(EDLRepository())
+        # Os .edl do benchmark vão para uma pasta temporária, não para a saída real do watchfolder
+        self.output_dir = Path(tempfile.mkdtemp(prefix=f"{PREFIX}_"))
+        self.edl_service.config.WATCHFOLDER_OUTPUT = self.output_dir
+        self.history_rows = 0
+
+    def _create_mxf(self, db, name: str, tracks: int, matches: int) -> MXFFile:
+        mxf = MXFFile(file_name=f"{PREFIX}_{name}.mxf", path=f"/tmp/{PREFIX}_{name}.mxf", status="processed")
+        db.add(mxf)
+        db.flush()
+        self.repository.save_audio_tracks_sync(db, mxf, fake_results(tracks, matches))
+        return mxf
+
+    def grow_history(self, target_rows: int):
+        """Adiciona MXFs de histórico até time_range ter ~target_rows linhas deste benchmark"""
+        per_mxf = HISTORY_TRACKS * HISTORY_MATCHES
+        with SessionLocal() as db:
+            while self.history_rows < target_rows:
+                self._create_mxf(db, f"history_{self.history_rows // per_mxf}", HISTORY_TRACKS, HISTORY_MATCHES)
+                self.history_rows += per_mxf
+
+    async def time_build(self, mxf_id: int, results: list) -> float:
+        """Mediana (ms) de create_and_store_edl para o job"""
+        durations = []
+        for run in range(self.runs):
+            async with async_session() as db:
+                started = time.perf_counter()
+                await self.edl_service.create_and_store_edl(db, f"{PREFIX}_{run}", "job.mxf", results, mxf_id=mxf_id)
+                durations.append((time.perf_counter() - started) * 1000)
+        return statistics.median(durations)
+
+    async def time_full_scan(self) -> float:
+        """Mediana (ms) da consulta antiga, que lê time_range inteira"""
+        durations = []
+        for _ in range(self.runs):
+            async with async_session() as db:
+                started = time.perf_counter()
+                await self.edl_service.repository.get_all_timestamps(db)
+                durations.append((time.perf_counter() - started) * 1000)
+        return statistics.median(durations)
+
+    def cleanup(self):
+        with SessionLocal() as db:
+            mxf_ids = select(MXFFile.id).where(MXFFile.file_name.like(f"{PREFIX}_%")).scalar_subquery()
+            track_ids = select(AudioTrack.id).where(AudioTrack.mxf_id.in_(mxf_ids)).scalar_subquery()
+            db.execute(delete(TimeRange).where(TimeRange.audio_track_id.in_(track_ids)))
+            db.execute(delete(AudioTrack).where(AudioTrack.mxf_id.in_(mxf_ids)))
+            db.execute(delete(MXFFile).where(MXFFile.id.in_(mxf_ids)))
+            db.execute(delete(EDLEntry).where(EDLEntry.process_id.like(f"{PREFIX}_%")))
+            db.commit()
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+        print("🧹 Registros e arquivos do benchmark removidos")
+
+    async def run(self):
+        create_schema()
+        with SessionLocal() as db:
+            job = self._create_mxf(db, "job", JOB_TRACKS, JOB_MATCHES)
+            job_id = job.id
+        results = fake_results(JOB_TRACKS, JOB_MATCHES)
+
+        print(f"📐 Job: {JOB_TRACKS} faixas x {JOB_MATCHES} ocorrências; {self.runs} execuções por tamanho")
+        print(f"{'time_range (histórico)':>24} | {'EDL por mxf_id (ms)':>20} | {'tabela inteira (ms)':>20}")
+        rows = []
+        try:
+            for size in self.sizes:
+                self.grow_history(size)
+                scoped = await self.time_build(job_id, results)
+                full = await self.time_full_scan()
+                rows.append((self.history_rows, scoped, full))
+                print(f"{self.history_rows:>24} | {scoped:>20.1f} | {full:>20.1f}")
+        finally:
+            self.cleanup()
+
+        if len(rows) > 1:
+            growth = rows[-1][1] / max(rows[0][1], 1e-6)
+            print(f"📊 EDL por mxf_id: {growth:.2f}x do menor para o maior histórico "
+                  f"(tabela inteira: {rows[-1][2] / max(rows[0][2], 1e-6):.2f}x)")
+
+
+async def main():
+    """
+    Uso: python tests/benchmark_edl_timestamps.py [tamanhos...]
+    Tamanhos = linhas de time_range de histórico (padrão 0 10000 100000 500000).
+    Precisa do mesmo Postgres da API (variáveis POSTGRES_*).
+    """
+    sizes = [int(arg) for arg in sys.argv[1:]] or [0, 10_000, 100_000, 500_000]
+    engine.echo = False
+    async_engine.echo = False
+    print("🎵 BENCHMARK - MONTAGEM DO EDL x TAMANHO DO HISTÓRICO")
+    await EDLTimestampBenchmark(sizes).run()
+    print("✅ Benchmark concluído!")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
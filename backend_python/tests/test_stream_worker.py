@@ -0,0 +1,135 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from core.config import Config
+from features.worker.job_stream import JobStream, FakeStreamBackend
+from features.worker.stream_worker import StreamWorker
+
+# Prazos curtos: mensagem sem ack volta depois de 200ms, dead-letter na 3ª entrega
+CLAIM_IDLE_MS = 200
+MAX_DELIVERIES = 3
+
+
+@pytest.fixture(autouse=True)
+def fast_worker(monkeypatch):
+    monkeypatch.setattr(Config, 'WORKER_CLAIM_IDLE_MS', CLAIM_IDLE_MS)
+    monkeypatch.setattr(Config, 'WORKER_MAX_DELIVERIES', MAX_DELIVERIES)
+    monkeypatch.setattr(Config, 'WORKER_BLOCK_MS', 50)
+    monkeypatch.setattr(Config, 'WORKER_CANCEL_POLL_SECONDS', 0.05)
+    monkeypatch.setattr(Config, 'WORKER_CONCURRENCY', 1)
+
+
+class Recorder:
+    """Handler e callbacks do StreamWorker que só registram as chamadas"""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = []
+        self.call_times = []
+        self.dead = []
+        self.cancelled = []
+        self._lock = threading.Lock()
+
+    async def handler(self, job_id: int):
+        with self._lock:
+            self.calls.append(job_id)
+            self.call_times.append(time.monotonic())
+            attempt = self.calls.count(job_id)
+        if attempt <= self.failures:
+            raise RuntimeError(f"falha na tentativa {attempt}")
+
+    def on_dead_letter(self, job_id: int):
+        self.dead.append(job_id)
+
+    def on_cancelled(self, job_id: int):
+        self.cancelled.append(job_id)
+
+
+def wait_until(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def run_worker(stream: JobStream, recorder: Recorder, until, timeout: float = 5.0) -> bool:
+    worker = StreamWorker(recorder.handler, on_dead_letter=recorder.on_dead_letter, stream=stream,
+                          on_cancelled=recorder.on_cancelled)
+    worker.start()
+    try:
+        return wait_until(until, timeout)
+    finally:
+        worker.stop(5)
+
+
+def stream_metrics(stream: JobStream, priority: str = 'normal') -> dict:
+    return stream.metrics()['streams'][stream.stream_for(priority)]
+
+
+def test_failed_job_is_retried_after_idle_and_then_succeeds():
+    stream = JobStream(FakeStreamBackend())
+    recorder = Recorder(failures=1)
+    stream.submit(1)
+
+    assert run_worker(stream, recorder, lambda: len(recorder.calls) == 2 and stream_metrics(stream)['pending'] == 0)
+
+    assert recorder.calls == [1, 1]
+    # A nova entrega só vem depois de a mensagem ficar WORKER_CLAIM_IDLE_MS sem ack
+    assert recorder.call_times[1] - recorder.call_times[0] >= CLAIM_IDLE_MS / 1000
+    assert recorder.dead == []
+    assert stream_metrics(stream) == {'length': 1, 'pending': 0}
+    assert stream.metrics()['streams'][stream.dead_letter_stream] == {'length': 0}
+
+
+def test_job_failing_every_delivery_goes_to_dead_letter():
+    stream = JobStream(FakeStreamBackend())
+    recorder = Recorder(failures=MAX_DELIVERIES + 1)
+    stream.submit(7)
+
+    assert run_worker(stream, recorder, lambda: recorder.dead == [7])
+
+    assert recorder.calls == [7] * MAX_DELIVERIES
+    assert stream_metrics(stream) == {'length': 1, 'pending': 0}
+    assert stream.metrics()['streams'][stream.dead_letter_stream] == {'length': 1}
+    (_, fields), = stream.backend.messages(stream.dead_letter_stream)
+    assert fields['mxf_id'] == '7'
+    assert fields['deliveries'] == str(MAX_DELIVERIES)
+    assert fields['error'] == f"falha na tentativa {MAX_DELIVERIES}"
+
+
+def test_streams_are_consumed_in_priority_order():
+    stream = JobStream(FakeStreamBackend())
+    recorder = Recorder()
+    for job_id, priority in [(1, 'low'), (2, 'normal'), (3, 'high'), (4, 'normal')]:
+        stream.submit(job_id, priority)
+
+    assert run_worker(stream, recorder, lambda: len(recorder.calls) == 4)
+
+    assert recorder.calls == [3, 2, 4, 1]
+    metrics = stream.metrics()['streams']
+    assert all(metrics[stream.stream_for(p)]['pending'] == 0 for p in ('high', 'normal', 'low'))
+
+
+def test_cancelled_job_is_acked_without_running():
+    stream = JobStream(FakeStreamBackend())
+    recorder = Recorder()
+    stream.submit(5)
+    stream.submit(6)
+    stream.cancel(5)
+
+    assert run_worker(stream, recorder, lambda: recorder.cancelled == [5] and recorder.calls == [6])
+
+    assert recorder.dead == []
+    assert stream_metrics(stream) == {'length': 2, 'pending': 0}
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
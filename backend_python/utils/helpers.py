@@ -26,4 +26,20 @@ def cleanup_old_files(directory: Path, max_age_days: int = 7):
     
     for file_path in directory.glob("*"):
         if file_path.is_file() and file_path.stat().st_mtime < cutoff_time:
-            safe_delete(file_path)
\ No newline at end of file
+            safe_delete(file_path)
+
+
+def move_file(file_path: Path, target_dir: Path) -> Path:
+    """
+    Move arquivo com os.replace (atômico no mesmo filesystem): ou o arquivo está
+    na origem ou no destino, nunca pela metade. Não sobrescreve um arquivo de
+    mesmo nome já existente no destino (usa nome_1.ext, nome_2.ext...).
+    """
+    target_dir.mkdir(parents=True, exist_ok=True)
+    target = target_dir / file_path.name
+    index = 1
+    while target.exists():
+        target = target_dir / f"{file_path.stem}_{index}{file_path.suffix}"
+        index += 1
+    os.replace(file_path, target)
+    return target
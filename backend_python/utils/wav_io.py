@@ -0,0 +1,119 @@
+import io
+import struct
+from collections import namedtuple
+from pathlib import Path
+
+WavInfo = namedtuple('WavInfo', ['channels', 'sample_width', 'frame_rate', 'n_frames', 'data_offset'])
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def read_wav_info(file_path: Path) -> WavInfo:
+    """Lê apenas o cabeçalho RIFF do WAV (PCM ou EXTENSIBLE, como o ffmpeg gera)"""
+    with open(file_path, 'rb') as f:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError(f"Arquivo não é WAV: {file_path}")
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"Chunk 'data' não encontrado: {file_path}")
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                if chunk_size % 2:
+                    f.seek(1, 1)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise ValueError(f"Chunk 'fmt ' ausente: {file_path}")
+                format_tag, channels, frame_rate, _, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+                if format_tag not in (_WAVE_FORMAT_PCM, _WAVE_FORMAT_EXTENSIBLE):
+                    raise ValueError(f"Formato WAV não suportado ({format_tag:#x}): {file_path}")
+
+                data_offset = f.tell()
+                # ffmpeg pode deixar o tamanho zerado/inválido em arquivos muito longos
+                available = Path(file_path).stat().st_size - data_offset
+                data_size = chunk_size if 0 < chunk_size <= available else available
+                return WavInfo(channels, bits // 8, frame_rate, data_size // block_align, data_offset)
+            else:
+                f.seek(chunk_size + (chunk_size % 2), 1)
+
+
+def get_duration_ms(file_path: Path) -> int:
+    """Duração do WAV em milissegundos sem decodificar o áudio"""
+    info = read_wav_info(file_path)
+    return int(info.n_frames * 1000 / info.frame_rate)
+
+
+def read_frames(file_path: Path, info: WavInfo, start_frame: int, n_frames: int) -> bytes:
+    """Lê um intervalo de frames PCM intercalados direto do disco"""
+    start_frame = max(0, min(start_frame, info.n_frames))
+    n_frames = max(0, min(n_frames, info.n_frames - start_frame))
+    frame_size = info.channels * info.sample_width
+
+    with open(file_path, 'rb') as f:
+        f.seek(info.data_offset + start_frame * frame_size)
+        return f.read(n_frames * frame_size)
+
+
+def to_wav_bytes(frames: bytes, channels: int, sample_width: int, frame_rate: int) -> bytes:
+    """Empacota frames PCM em um WAV completo em memória"""
+    buffer = io.BytesIO()
+    block_align = channels * sample_width
+    buffer.write(struct.pack('<4sI4s', b'RIFF', 36 + len(frames), b'WAVE'))
+    buffer.write(struct.pack('<4sIHHIIHH', b'fmt ', 16, _WAVE_FORMAT_PCM, channels,
+                             frame_rate, frame_rate * block_align, block_align, sample_width * 8))
+    buffer.write(struct.pack('<4sI', b'data', len(frames)))
+    buffer.write(frames)
+    return buffer.getvalue()
+
+
+def iter_frames(file_path: Path, info: WavInfo, block_frames: int, start_frame: int = 0, n_frames: int = None):
+    """Gera blocos de frames PCM em sequência, com memória limitada ao tamanho do bloco"""
+    end_frame = info.n_frames if n_frames is None else min(info.n_frames, start_frame + n_frames)
+    frame_size = info.channels * info.sample_width
+
+    with open(file_path, 'rb') as f:
+        f.seek(info.data_offset + start_frame * frame_size)
+        position = start_frame
+        while position < end_frame:
+            count = min(block_frames, end_frame - position)
+            frames = f.read(count * frame_size)
+            if not frames:
+                break
+            yield frames
+            position += len(frames) // frame_size
+
+
+class WavWriter:
+    """Escreve um WAV PCM incrementalmente; os tamanhos do cabeçalho são ajustados no close()"""
+
+    def __init__(self, file_path: Path, channels: int, sample_width: int, frame_rate: int):
+        self.file_path = Path(file_path)
+        self._file = open(self.file_path, 'wb')
+        self._data_size = 0
+        # Cabeçalho provisório com tamanhos zerados
+        self._file.write(to_wav_bytes(b'', channels, sample_width, frame_rate))
+
+    def write(self, frames: bytes):
+        self._file.write(frames)
+        self._data_size += len(frames)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.seek(4)
+        self._file.write(struct.pack('<I', min(36 + self._data_size, 0xFFFFFFFF)))
+        self._file.seek(40)
+        self._file.write(struct.pack('<I', min(self._data_size, 0xFFFFFFFF)))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()